@@ -0,0 +1,208 @@
+"""
+Analysis Export: Versioned Arrow / Parquet Datasets for BI Tools
+=================================================================
+This module exports analysis results (the script_04 DataFrames, the
+correlation matrix, OLAP cube slices) as typed columnar datasets so
+dashboards can read them without re-querying MySQL:
+
+  • <name>.arrow   - Arrow IPC file, uncompressed, memory-mappable with
+                     zero copies (load_result)
+  • <name>.parquet - compressed Parquet for tools without Arrow IPC support
+  • manifest.json  - version tag, creation time and per-dataset schema,
+                     row count and file sizes
+
+Every export is written to a temporary directory and renamed into place as
+analysis_exports/<version>/, then the LATEST pointer is replaced
+atomically, so readers never see a half-written version. The last
+KEEP_VERSIONS versions are kept.
+
+pyarrow is optional: without it the pipeline runs and skips the export.
+"""
+
+import os
+import json
+import time
+import shutil
+from datetime import datetime, timezone
+import pandas as pd
+import warnings
+warnings.filterwarnings('ignore')
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:          # exports are skipped; see ARROW_AVAILABLE
+    pa = None
+
+ARROW_AVAILABLE = pa is not None
+EXPORT_DIR = os.environ.get('ROSSMANN_EXPORT_DIR', 'analysis_exports')
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+KEEP_VERSIONS = 5
+FORMATS = ('arrow', 'parquet')
+
+
+def _require_arrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow / Parquet exports "
+                          "(pip install pyarrow)")
+
+
+def _prepare(df):
+    """
+    Frame with Arrow-friendly columns: a named index becomes a column (e.g.
+    the correlation matrix), MySQL Decimal objects become floats and other
+    mixed object columns become strings.
+    """
+    if df.index.name is not None or not isinstance(df.index, pd.RangeIndex):
+        df = df.rename_axis(df.index.name or 'Variable').reset_index()
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            numeric = pd.to_numeric(df[col], errors='coerce')
+            if numeric.notna().sum() == df[col].notna().sum():
+                df[col] = numeric
+            else:
+                df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    df.columns = [str(c) for c in df.columns]
+    return df
+
+
+def new_version():
+    """Version tag: UTC timestamp, sortable."""
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+
+def export_results(results, version=None, base_dir=EXPORT_DIR, formats=FORMATS,
+                   keep=KEEP_VERSIONS):
+    """
+    Write {name: DataFrame} as one versioned dataset directory and point
+    LATEST at it. Returns the version tag.
+    """
+    _require_arrow()
+    version = version or new_version()
+    os.makedirs(base_dir, exist_ok=True)
+    final_dir = os.path.join(base_dir, version)
+    if os.path.exists(final_dir):
+        raise FileExistsError(f"Export version '{version}' already exists")
+    tmp_dir = os.path.join(base_dir, f'.tmp-{version}-{os.getpid()}')
+    os.makedirs(tmp_dir)
+
+    manifest = {'version': version,
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'datasets': {}}
+    try:
+        for name, df in results.items():
+            table = pa.Table.from_pandas(_prepare(df), preserve_index=False)
+            files = {}
+            if 'arrow' in formats:
+                path = os.path.join(tmp_dir, f'{name}.arrow')
+                with pa.OSFile(path, 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                files['arrow'] = {'file': f'{name}.arrow', 'bytes': os.path.getsize(path)}
+            if 'parquet' in formats:
+                path = os.path.join(tmp_dir, f'{name}.parquet')
+                pq.write_table(table, path, compression='snappy')
+                files['parquet'] = {'file': f'{name}.parquet', 'bytes': os.path.getsize(path)}
+            manifest['datasets'][name] = {
+                'rows': table.num_rows,
+                'schema': [{'name': f.name, 'type': str(f.type), 'nullable': f.nullable}
+                           for f in table.schema],
+                'files': files,
+            }
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(tmp_dir, final_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Swap the LATEST pointer in one rename
+    pointer_tmp = os.path.join(base_dir, f'.{LATEST_FILE}.{os.getpid()}')
+    with open(pointer_tmp, 'w') as f:
+        f.write(version + '\n')
+    os.replace(pointer_tmp, os.path.join(base_dir, LATEST_FILE))
+    prune_versions(base_dir, keep)
+    return version
+
+
+def prune_versions(base_dir=EXPORT_DIR, keep=KEEP_VERSIONS):
+    """Delete all but the newest `keep` versions (never the one LATEST points to)."""
+    latest = latest_version(base_dir)
+    versions = sorted(d for d in os.listdir(base_dir)
+                      if not d.startswith('.') and os.path.isdir(os.path.join(base_dir, d)))
+    for old in versions[:-keep] if keep else []:
+        if old != latest:
+            shutil.rmtree(os.path.join(base_dir, old), ignore_errors=True)
+
+
+def latest_version(base_dir=EXPORT_DIR):
+    path = os.path.join(base_dir, LATEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip()
+
+
+def read_manifest(version=None, base_dir=EXPORT_DIR):
+    version = version or latest_version(base_dir)
+    with open(os.path.join(base_dir, version, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def load_result(name, version=None, base_dir=EXPORT_DIR):
+    """Memory-map one Arrow dataset (zero-copy pyarrow.Table)."""
+    _require_arrow()
+    version = version or latest_version(base_dir)
+    source = pa.memory_map(os.path.join(base_dir, version, f'{name}.arrow'), 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def cube_results(cube):
+    """The script_04 analyses plus a few drill-downs as cube slices."""
+    slices = {
+        'cube_overall': (),
+        'cube_store_type': ('StoreType',),
+        'cube_promo': ('Promo',),
+        'cube_monthly_trend': ('Year', 'Month'),
+        'cube_day_of_week': ('DayOfWeek',),
+        'cube_competition': ('CompetitionCategory',),
+        'cube_store_type_promo': ('StoreType', 'Promo'),
+        'cube_store_type_month': ('StoreType', 'Year', 'Month'),
+    }
+    return {name: cube.rollup(*by) for name, by in slices.items()}
+
+
+if __name__ == '__main__':
+    from olap_cube import SalesCube, load_fact_frame
+
+    print("="*80)
+    print("ROSSMANN STORE SALES - COLUMNAR ANALYSIS EXPORT")
+    print("="*80)
+    _require_arrow()
+
+    print("\n[1/3] Building cube slices...")
+    start = time.perf_counter()
+    fact_df = load_fact_frame()
+    cube = SalesCube.from_frame(fact_df)
+    results = cube_results(cube)
+    results['correlation_matrix'] = fact_df[['Sales', 'Customers', 'SalesPerCustomer', 'Promo',
+                                             'IsWeekend', 'SchoolHoliday']].corr()
+    print(f"✓ {len(results)} result tables in {time.perf_counter() - start:.2f}s")
+
+    print(f"\n[2/3] Exporting to '{EXPORT_DIR}'...")
+    start = time.perf_counter()
+    version = export_results(results)
+    manifest = read_manifest(version)
+    total_bytes = sum(f['bytes'] for d in manifest['datasets'].values() for f in d['files'].values())
+    print(f"✓ Version {version}: {len(manifest['datasets'])} datasets, "
+          f"{total_bytes / 1024:,.1f} KB in {time.perf_counter() - start:.2f}s")
+
+    print("\n[3/3] Reading back through a memory map...")
+    start = time.perf_counter()
+    table = load_result('cube_store_type_month')
+    print(f"✓ cube_store_type_month: {table.num_rows:,} rows mapped in "
+          f"{(time.perf_counter() - start) * 1000:.2f}ms")
+    print(f"   Schema: {', '.join(f'{f.name}:{f.type}' for f in table.schema)}")
@@ -0,0 +1,259 @@
+"""
+Approximate Analytics: Sketch-Based Interactive Queries
+========================================================
+This module answers questions that do not need exact results - median and
+p95 daily sales, distinct active stores, top stores by sales - from small
+mergeable sketches instead of a full fact table pull:
+
+  • KLLSketch      - quantiles of daily Sales and Customers
+  • HyperLogLog    - distinct active stores
+  • CountMinSketch - Sales per store, for heavy hitters
+
+One set of sketches is kept per (StoreType, Year, Month) partition. They are
+built when the data is loaded (script_03 writes them to approx_sketches.pkl)
+and merged at query time for whatever partitions a query selects.
+
+Error bounds: quantile rank error ~ 1.7 / k, distinct-count standard error
+~ 1.04 / sqrt(2^p). A count-min estimate of a store's Sales can be off by up
+to e / width of the partition's total Sales, more than a typical store sells,
+so each partition also keeps exact Sales of its candidate stores (the
+stores with the largest totals) and top stores are ranked on those. A
+partition built in one pass (script_03) has exact candidates; a store that
+becomes a candidate in a later micro-batch carries the count-min estimate
+of its earlier rows. A store that is not a candidate of a partition sold
+at most the smallest candidate total there (0 while the partition has
+fewer stores than candidates) and at most its count-min estimate, so that
+partition contributes the smaller of the two. top_stores reports the
+resulting overcount bound per store.
+"""
+
+import time
+import pickle
+import pandas as pd
+import numpy as np
+from sketches import KLLSketch, HyperLogLog, CountMinSketch
+from olap_cube import load_fact_frame
+import warnings
+warnings.filterwarnings('ignore')
+
+PARTITION_KEYS = ['StoreType', 'Year', 'Month']
+
+SKETCH_FILE = 'approx_sketches.pkl'
+
+# Heavy-hitter candidates remembered per partition
+CANDIDATES_PER_PARTITION = 50
+
+
+class PartitionSketch:
+    """Sketches of the fact rows of one (StoreType, Year, Month) partition."""
+
+    def __init__(self, k=200, p=14, width=2048, depth=5):
+        self.rows = 0
+        self.sales_total = 0.0
+        self.sales = KLLSketch(k)
+        self.customers = KLLSketch(k)
+        self.stores = HyperLogLog(p)
+        self.store_sales = CountMinSketch(width, depth)
+        self.candidates = np.empty(0, dtype=np.int64)           # sorted StoreIDs
+        self.candidate_sales = np.empty(0, dtype=np.float64)    # exact Sales of each candidate
+        self.candidate_error = np.empty(0, dtype=np.float64)    # overcount bound of each candidate
+        self.ceiling = 0.0                                      # most Sales of any other store
+
+    def update(self, part):
+        sales = part['Sales'].to_numpy(dtype=np.float64)
+        store_ids = part['StoreID'].to_numpy(dtype=np.int64)
+        self.rows += len(part)
+        self.sales_total += float(np.nansum(sales))
+        self.sales.update(sales)
+        self.customers.update(part['Customers'].to_numpy(dtype=np.float64))
+        self.stores.update(store_ids)
+
+        # Exact Sales of the batch per store; stores that were not candidates
+        # start from the bound on their earlier rows (0 when the partition is
+        # built in one pass)
+        batch_ids, inverse = np.unique(store_ids, return_inverse=True)
+        batch_sales = np.bincount(inverse, weights=np.nan_to_num(sales), minlength=len(batch_ids))
+        earlier = np.minimum(self.store_sales.estimate(batch_ids), self.ceiling)
+        self.store_sales.update(store_ids, np.nan_to_num(sales))
+
+        keys = np.union1d(self.candidates, batch_ids)
+        totals, errors = self._candidate_values(keys, earlier_ids=batch_ids, earlier=earlier)
+        totals[np.searchsorted(keys, batch_ids)] += batch_sales
+        top = np.sort(np.argsort(-totals, kind='stable')[:CANDIDATES_PER_PARTITION])
+        self.candidates, self.candidate_sales, self.candidate_error = keys[top], totals[top], errors[top]
+        # Candidate totals only grow and evicted stores ranked below them
+        if len(self.candidates) >= CANDIDATES_PER_PARTITION:
+            self.ceiling = float(self.candidate_sales.min())
+
+    def _candidate_values(self, keys, earlier_ids=None, earlier=None):
+        """
+        (Sales, overcount bound) of sorted `keys`: exact for candidates, else
+        the smaller of the count-min estimate and the ceiling (or `earlier`
+        for earlier_ids), which is also the bound.
+        """
+        position = np.searchsorted(self.candidates, keys)
+        tracked = position < len(self.candidates)
+        tracked[tracked] = self.candidates[position[tracked]] == keys[tracked]
+        if earlier_ids is None:
+            estimate = np.minimum(self.store_sales.estimate(keys), self.ceiling)
+        else:
+            estimate = np.zeros(len(keys))
+            estimate[np.searchsorted(keys, earlier_ids)] = earlier
+        bound = estimate
+        totals = np.where(tracked, self.candidate_sales[np.minimum(position, len(self.candidates) - 1)]
+                          if len(self.candidates) else 0.0, estimate)
+        errors = np.where(tracked, self.candidate_error[np.minimum(position, len(self.candidates) - 1)]
+                          if len(self.candidates) else 0.0, bound)
+        return totals, errors
+
+    def merge(self, other):
+        # Candidates of either side, valued before the count-min tables are added
+        keys = np.union1d(self.candidates, other.candidates)
+        totals, errors = self._candidate_values(keys)
+        other_totals, other_errors = other._candidate_values(keys)
+        self.candidates, self.candidate_sales = keys, totals + other_totals
+        self.candidate_error = errors + other_errors
+        self.ceiling += other.ceiling
+
+        self.rows += other.rows
+        self.sales_total += other.sales_total
+        self.sales.merge(other.sales)
+        self.customers.merge(other.customers)
+        self.stores.merge(other.stores)
+        self.store_sales.merge(other.store_sales)
+        return self
+
+
+class ApproxAnalytics:
+    """Partitioned sketches with query-time merging."""
+
+    def __init__(self, k=200, p=14, width=2048, depth=5):
+        self.params = dict(k=k, p=p, width=width, depth=depth)
+        self.partitions = {}
+
+    @classmethod
+    def from_frame(cls, df, **params):
+        approx = cls(**params)
+        approx.add(df)
+        return approx
+
+    def add(self, df):
+        """Fold fact rows (with a StoreType column) into their partitions."""
+        df = df.dropna(subset=PARTITION_KEYS)
+        for key, part in df.groupby(PARTITION_KEYS, sort=False):
+            key = (str(key[0]), int(key[1]), int(key[2]))
+            if key not in self.partitions:
+                self.partitions[key] = PartitionSketch(**self.params)
+            self.partitions[key].update(part)
+        return self
+
+    def save(self, path=SKETCH_FILE):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    @staticmethod
+    def load(path=SKETCH_FILE):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    # ------------------------------------------------------------------
+    # Query-time merging
+    # ------------------------------------------------------------------
+
+    def _select(self, filters):
+        unknown = set(filters) - set(PARTITION_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown partition keys: {sorted(unknown)}")
+        allowed = {dim: set(v) if isinstance(v, (list, tuple, set)) else {v}
+                   for dim, v in filters.items()}
+        for key, sketch in self.partitions.items():
+            values = dict(zip(PARTITION_KEYS, key))
+            if all(values[dim] in allowed[dim] for dim in allowed):
+                yield values, sketch
+
+    def _merged_by(self, by, filters):
+        groups = {}
+        for values, sketch in self._select(filters):
+            group = tuple(values[dim] for dim in by)
+            if group not in groups:
+                groups[group] = PartitionSketch(**self.params)
+            groups[group].merge(sketch)
+        return dict(sorted(groups.items()))
+
+    def quantiles(self, qs=(0.5, 0.95), by=('StoreType',), measure='Sales', **filters):
+        """Approximate quantiles of daily `measure` per group."""
+        by = list(by)
+        rows = []
+        for group, sketch in self._merged_by(by, filters).items():
+            values = getattr(sketch, measure.lower()).quantile(list(qs))
+            rows.append(list(group) + [sketch.rows] + list(values))
+        return pd.DataFrame(rows, columns=by + ['Count'] + [f'p{round(q * 100):g}' for q in qs])
+
+    def distinct_stores(self, by=('Year', 'Month'), **filters):
+        """Approximate number of distinct active stores per group."""
+        by = list(by)
+        rows = [list(group) + [sketch.stores.count()]
+                for group, sketch in self._merged_by(by, filters).items()]
+        return pd.DataFrame(rows, columns=by + ['ActiveStores'])
+
+    def top_stores(self, k=10, **filters):
+        """Heavy hitters: the k candidate stores with the largest total Sales, with their overcount bound."""
+        merged = self._merged_by([], filters).get(())
+        if merged is None:
+            return pd.DataFrame(columns=['StoreID', 'EstimatedSales', 'ErrorBound'])
+        top = np.argsort(-merged.candidate_sales, kind='stable')[:k]
+        return pd.DataFrame({
+            'StoreID': merged.candidates[top],
+            'EstimatedSales': merged.candidate_sales[top],
+            'ErrorBound': merged.candidate_error[top],
+        })
+
+    @property
+    def nbytes(self):
+        return sum(s.store_sales.table.nbytes + s.stores.registers.nbytes
+                   + sum(l.nbytes for l in s.sales.levels + s.customers.levels)
+                   for s in self.partitions.values())
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - APPROXIMATE ANALYTICS")
+    print("="*80)
+
+    print("\n[1/3] Building partition sketches...")
+    start = time.perf_counter()
+    fact_df = load_fact_frame(store_columns=['StoreType'])
+    approx = ApproxAnalytics.from_frame(fact_df)
+    approx.save()
+    print(f"✓ {len(approx.partitions)} partitions, {approx.nbytes / 1e6:.1f} MB, "
+          f"built in {time.perf_counter() - start:.2f}s (saved to '{SKETCH_FILE}')")
+
+    print("\n[2/3] Approximate vs exact answers...")
+    start = time.perf_counter()
+    approx_q = approx.quantiles((0.5, 0.95), by=['StoreType'])
+    approx_ms = (time.perf_counter() - start) * 1e3
+    exact_q = fact_df.groupby('StoreType')['Sales'].quantile([0.5, 0.95]).unstack()
+    print(f"\n   Median / p95 daily sales by StoreType ({approx_ms:.1f} ms):")
+    for _, row in approx_q.iterrows():
+        exact = exact_q.loc[row['StoreType']]
+        print(f"      {row['StoreType']}: p50 {row['p50']:>9,.0f} (exact {exact[0.5]:>9,.0f})   "
+              f"p95 {row['p95']:>9,.0f} (exact {exact[0.95]:>9,.0f})")
+
+    start = time.perf_counter()
+    approx_d = approx.distinct_stores(by=['Year'])
+    approx_ms = (time.perf_counter() - start) * 1e3
+    exact_d = fact_df.groupby('Year')['StoreID'].nunique()
+    print(f"\n   Distinct active stores by year ({approx_ms:.1f} ms):")
+    for _, row in approx_d.iterrows():
+        print(f"      {row['Year']}: {row['ActiveStores']:,} (exact {exact_d.loc[row['Year']]:,})")
+
+    print("\n[3/3] Top 5 stores by sales...")
+    start = time.perf_counter()
+    top = approx.top_stores(5)
+    approx_ms = (time.perf_counter() - start) * 1e3
+    exact_top = fact_df.groupby('StoreID')['Sales'].sum()
+    print(f"   ({approx_ms:.1f} ms; exact top 5: {list(exact_top.nlargest(5).index)})")
+    for _, row in top.iterrows():
+        print(f"      Store {int(row['StoreID'])}: {row['EstimatedSales']:>14,.0f} "
+              f"(exact {exact_top.loc[int(row['StoreID'])]:>14,.0f}, +{row['ErrorBound']:,.0f} at most)")
@@ -0,0 +1,184 @@
+"""
+Benchmark: Scaled Pipeline Benchmark Suite
+===========================================
+This script generates synthetic Rossmann-shaped inputs at several scales,
+runs each pipeline stage against them, and compares the timings with a
+stored JSON baseline so that performance regressions fail loudly.
+
+Scale 1 is the real dataset size (1,115 stores, 2013-01-01 to 2015-07-31);
+scale 10 is 11,150 stores over the same span, and so on.
+
+Usage:
+    python benchmark_pipeline.py                          # extraction + preprocessing at 0.1x, 1x
+    python benchmark_pipeline.py --scales 1,10 --update-baseline
+    python benchmark_pipeline.py --stages extraction,preprocessing,load,analysis
+
+Timings are machine-specific, so the baseline is not committed: create it
+once per machine with --update-baseline. A comparison run without a baseline
+exits non-zero instead of passing silently.
+
+The load and analysis stages run script_03 / script_04 against the MySQL
+server in db_config.py and re-create the rossmann_analytics database,
+so they are only run when requested explicitly.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from synthetic_data import write_synthetic_dataset
+from perf_metrics import load_metrics
+
+# CONFIGURATION
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STAGES = {
+    'extraction': 'script_01_extraction.py',
+    'preprocessing': 'script_02_preprocessing.py',
+    'load': 'script_03_mysql.py',
+    'analysis': 'script_04_analysis.py',
+}
+
+BASE_STORES = 1115
+START_DATE = '2013-01-01'
+END_DATE = '2015-07-31'
+
+BASELINE_FILE = os.path.join(SCRIPT_DIR, 'benchmark_baseline.json')
+RESULTS_FILE = 'benchmark_results.json'
+
+# A stage regresses when it is slower than baseline * (1 + TOLERANCE)
+TOLERANCE = 0.25
+
+
+def prepare_scale(scale, work_dir, seed=42):
+    """Generate the synthetic inputs for one scale (reused if already present)."""
+    scale_dir = os.path.join(work_dir, f'scale_{scale:g}x')
+    n_stores = max(1, int(round(BASE_STORES * scale)))
+    if not os.path.exists(os.path.join(scale_dir, 'train.csv')):
+        write_synthetic_dataset(scale_dir, n_stores, START_DATE, END_DATE, seed)
+    return scale_dir, n_stores
+
+
+def run_stage(stage, scale_dir):
+    """Run one pipeline script inside scale_dir and return its wall time."""
+    script = os.path.join(SCRIPT_DIR, STAGES[stage])
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, script], cwd=scale_dir,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        print(completed.stdout[-2000:])
+        raise RuntimeError(f"Stage '{stage}' failed in {scale_dir} (exit {completed.returncode})")
+    return elapsed
+
+
+def stage_steps(scale_dir, script_name):
+    """Per-step records of the latest run of a script, from its metrics file."""
+    records = [r for r in load_metrics(os.path.join(scale_dir, 'pipeline_metrics.jsonl'))
+               if r['script'] == script_name]
+    if not records:
+        return []
+    last_run = records[-1]['run_id']
+    return [r for r in records if r['run_id'] == last_run]
+
+
+def compare_to_baseline(results, baseline, tolerance=TOLERANCE):
+    """Return a list of (scale, stage, seconds, baseline_seconds) regressions."""
+    regressions = []
+    for scale, stages in results.items():
+        for stage, result in stages.items():
+            reference = baseline.get(scale, {}).get(stage)
+            if reference is None:
+                continue
+            if result['wall_s'] > reference['wall_s'] * (1 + tolerance):
+                regressions.append((scale, stage, result['wall_s'], reference['wall_s']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline at several data scales')
+    parser.add_argument('--scales', default='0.1,1',
+                        help='comma-separated multiples of the real dataset size')
+    parser.add_argument('--stages', default='extraction,preprocessing',
+                        help=f"comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument('--work-dir', default='benchmark_data')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='store these results as the new baseline')
+    args = parser.parse_args()
+
+    scales = [float(s) for s in args.scales.split(',')]
+    stages = args.stages.split(',')
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stage(s): {unknown}")
+
+    print("="*80)
+    print("ROSSMANN STORE SALES - PIPELINE BENCHMARK")
+    print("="*80)
+
+    results = {}
+    for scale in scales:
+        key = f'{scale:g}x'
+        print(f"\n[{key}] Generating synthetic data...")
+        scale_dir, n_stores = prepare_scale(scale, args.work_dir)
+        print(f"   {n_stores:,} stores, {START_DATE} to {END_DATE} in '{scale_dir}/'")
+        results[key] = {}
+        # Stages depend on the previous stage's output, so always run in pipeline order
+        for stage in [s for s in STAGES if s in stages]:
+            elapsed = run_stage(stage, scale_dir)
+            steps = stage_steps(scale_dir, os.path.splitext(STAGES[stage])[0])
+            rows = max((r['rows_out'] or 0 for r in steps), default=0)
+            peak = max((r['peak_rss_mb'] or 0 for r in steps), default=0)
+            results[key][stage] = {
+                'wall_s': round(elapsed, 3),
+                'rows': rows,
+                'peak_rss_mb': peak,
+                'steps': {r['stage']: r['wall_s'] for r in steps},
+            }
+            print(f"   ✓ {stage:<14} {elapsed:>8.2f}s   {rows:>12,} rows   {peak:>8,.0f} MB peak RSS")
+
+    with open(RESULTS_FILE, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n Saved results to '{RESULTS_FILE}'")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE_FILE):
+            with open(BASELINE_FILE) as f:
+                baseline = json.load(f)
+        for key, stage_results in results.items():
+            baseline.setdefault(key, {}).update(stage_results)
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"✓ Baseline updated: '{BASELINE_FILE}'")
+        exit()
+
+    if not os.path.exists(BASELINE_FILE):
+        print("\n" + "="*80)
+        print(f"✗ NO BASELINE at '{BASELINE_FILE}' - nothing to compare against")
+        print("   Re-run with --update-baseline on this machine to create one.")
+        print("="*80)
+        sys.exit(1)
+
+    with open(BASELINE_FILE) as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    uncovered = [(key, stage) for key, stages in results.items() for stage in stages
+                 if stage not in baseline.get(key, {})]
+    for key, stage in uncovered:
+        print(f"⚠ No baseline for {key} {stage}; not checked (add it with --update-baseline)")
+
+    print("\n" + "="*80)
+    if regressions:
+        print("✗ PERFORMANCE REGRESSIONS DETECTED")
+        print("="*80)
+        for key, stage, seconds, reference in regressions:
+            print(f"   {key} {stage}: {seconds:.2f}s vs baseline {reference:.2f}s "
+                  f"(+{(seconds / reference - 1) * 100:.0f}%)")
+        sys.exit(1)
+    print(f"✓ All stages within {args.tolerance * 100:.0f}% of baseline")
+    print("="*80)
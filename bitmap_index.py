@@ -0,0 +1,177 @@
+"""
+Bitmap Index: Packed Bitsets over Fact Flags
+=============================================
+This module keeps one packed bitset per value of the low-cardinality fact and
+store attributes, so ad-hoc filtered aggregates ("avg sales on promo days
+during school holidays for Type-b stores with Very Close competition") are
+answered with bitwise AND/OR instead of another full scan of fact_sales.
+"""
+
+import time
+import pandas as pd
+import numpy as np
+import warnings
+from olap_cube import load_fact_frame, normalize_state_holiday
+warnings.filterwarnings('ignore')
+
+# INDEX DEFINITION
+
+INDEXED_COLUMNS = ['Promo', 'SchoolHoliday', 'StateHoliday', 'IsWeekend', 'DayOfWeek',
+                   'Year', 'Month', 'StoreType', 'Assortment', 'CompetitionCategory',
+                   'Promo2']
+
+MEASURE_COLUMNS = ['Sales', 'Customers', 'SalesPerCustomer']
+
+
+class Bitset:
+    """A packed row bitset (8 rows per byte) supporting &, | and ~."""
+
+    def __init__(self, bits, n_rows):
+        self.bits = bits
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_mask(cls, mask):
+        return cls(np.packbits(mask), len(mask))
+
+    def __and__(self, other):
+        return Bitset(np.bitwise_and(self.bits, other.bits), self.n_rows)
+
+    def __or__(self, other):
+        return Bitset(np.bitwise_or(self.bits, other.bits), self.n_rows)
+
+    def __invert__(self):
+        inverted = np.invert(self.bits)
+        # Clear the padding bits of the last byte so they never count as rows
+        pad = len(inverted) * 8 - self.n_rows
+        if pad:
+            inverted[-1] &= np.uint8((0xFF << pad) & 0xFF)
+        return Bitset(inverted, self.n_rows)
+
+    def to_mask(self):
+        return np.unpackbits(self.bits, count=self.n_rows).astype(bool)
+
+    def count(self):
+        return int(np.unpackbits(self.bits).sum())
+
+
+class BitmapIndex:
+    """
+    Bitmap index over a fact frame joined with dim_store.
+
+    Filters are given as keyword arguments, one per indexed column, with a
+    single value or a list of values (OR within a column, AND across columns):
+
+        index.aggregate(Promo=1, SchoolHoliday=1, StoreType='b',
+                        CompetitionCategory='Very Close')
+    """
+
+    def __init__(self, fact_df, columns=INDEXED_COLUMNS):
+        self.n_rows = len(fact_df)
+        self.bitmaps = {}
+        for col in columns:
+            if col not in fact_df.columns:
+                continue
+            values = fact_df[col]
+            if col == 'StateHoliday':
+                values = normalize_state_holiday(values.values)
+            values = np.asarray(values)
+            self.bitmaps[col] = {
+                value: Bitset.from_mask(values == value) for value in pd.unique(values)
+            }
+        self.measures = {
+            col: fact_df[col].to_numpy(dtype=np.float64)
+            for col in MEASURE_COLUMNS if col in fact_df.columns
+        }
+
+    def values(self, column):
+        return sorted(self.bitmaps[column].keys())
+
+    def all_rows(self):
+        return ~Bitset(np.zeros((self.n_rows + 7) // 8, dtype=np.uint8), self.n_rows)
+
+    def select(self, **filters):
+        """Evaluate the filters to a Bitset of matching rows."""
+        result = self.all_rows()
+        for col, wanted in filters.items():
+            if col not in self.bitmaps:
+                raise ValueError(f"Column '{col}' is not indexed")
+            if not isinstance(wanted, (list, tuple, set)):
+                wanted = [wanted]
+            if col == 'StateHoliday':
+                wanted = [str(v) for v in wanted]
+            column_bits = Bitset(np.zeros_like(result.bits), self.n_rows)
+            for value in wanted:
+                if value in self.bitmaps[col]:
+                    column_bits = column_bits | self.bitmaps[col][value]
+            result = result & column_bits
+        return result
+
+    def aggregate(self, bitset=None, **filters):
+        """
+        Count, sum and mean of each measure over the matching rows. Either a
+        precomputed Bitset or keyword filters can be passed.
+        """
+        if bitset is None:
+            bitset = self.select(**filters)
+        rows = np.flatnonzero(bitset.to_mask())
+        result = {'Count': len(rows)}
+        for col, values in self.measures.items():
+            selected = values[rows]
+            result[f'Total{col}'] = float(selected.sum())
+            result[f'Avg{col}'] = float(selected.mean()) if len(rows) else np.nan
+        return result
+
+    @property
+    def nbytes(self):
+        return sum(b.bits.nbytes for bitmaps in self.bitmaps.values()
+                   for b in bitmaps.values())
+
+
+# DEMO: AD-HOC FILTERED AGGREGATES
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - BITMAP INDEX")
+    print("="*80)
+    print("\n")
+
+    print("[1/3] Loading processed fact data...")
+    try:
+        fact_df = load_fact_frame(store_columns=['StoreType', 'Assortment',
+                                                 'CompetitionCategory', 'Promo2'])
+    except FileNotFoundError as e:
+        print(f"✗ Error: {e}")
+        print("Please ensure you've run 'script_02_preprocessing.py' first!")
+        exit()
+    print(f"✓ Loaded {len(fact_df):,} fact records")
+    print("\n")
+
+    print("[2/3] Building bitmap index...")
+    start = time.perf_counter()
+    index = BitmapIndex(fact_df)
+    elapsed = time.perf_counter() - start
+    n_bitmaps = sum(len(b) for b in index.bitmaps.values())
+    print(f"✓ Built {n_bitmaps} bitmaps ({index.nbytes / 1e6:.1f} MB) in {elapsed:.2f}s")
+    print("\n")
+
+    print("[3/3] Running ad-hoc queries...")
+    queries = [
+        ('Promo days during school holidays, Type-b, Very Close competition',
+         dict(Promo=1, SchoolHoliday=1, StoreType='b', CompetitionCategory='Very Close')),
+        ('Weekend days in December',
+         dict(IsWeekend=1, Month=12)),
+        ('State holidays for stores running Promo2',
+         dict(StateHoliday=['a', 'b', 'c'], Promo2=1)),
+    ]
+    for title, filters in queries:
+        start = time.perf_counter()
+        result = index.aggregate(**filters)
+        elapsed_ms = (time.perf_counter() - start) * 1e3
+        print(f"\n   {title} ({elapsed_ms:.2f} ms)")
+        print(f"      Rows: {result['Count']:,}   Avg Sales: ${result['AvgSales']:,.2f}"
+              f"   Avg Customers: {result['AvgCustomers']:,.0f}")
+
+    print("\n" + "="*80)
+    print("BITMAP INDEX READY!")
+    print("="*80)
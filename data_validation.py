@@ -0,0 +1,358 @@
+"""
+Data Validation: Chunked Pre-Load Validation Engine
+====================================================
+This module evaluates declarative data-quality rules (schema / dtype, value
+ranges, allowed categorical values, uniqueness of the (Store, Date) grain and
+foreign-key coverage against store.csv) over a CSV file in streamed chunks.
+Every rule is a vectorized mask over the chunk; the engine keeps per-rule
+violation counts and a few sample offending rows, so a 10M-row input is
+validated in a single pass without building filtered copies of the data.
+"""
+
+import time
+from abc import ABC, abstractmethod
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+CHUNK_SIZE = 500_000
+SAMPLE_SIZE = 5
+REPORT_FILE = 'validation_report.txt'
+
+
+# RULES
+#
+# Each rule returns a boolean violation mask for a chunk. Rules with state
+# (uniqueness) carry it across chunks themselves.
+
+class Rule(ABC):
+    severity = 'error'
+
+    def __init__(self, name, severity=None):
+        self.name = name
+        if severity:
+            self.severity = severity
+
+    def columns(self):
+        return []
+
+    @abstractmethod
+    def violations(self, chunk):
+        """Boolean violation mask over the rows of the chunk."""
+
+
+class RequiredColumnsRule(Rule):
+    """All expected columns are present (checked on the first chunk)."""
+
+    def __init__(self, required, severity=None):
+        super().__init__(f"schema: columns {', '.join(required)}", severity)
+        self.required = list(required)
+        self.missing = None
+
+    def violations(self, chunk):
+        if self.missing is None:
+            self.missing = [c for c in self.required if c not in chunk.columns]
+        # A missing column makes every row invalid
+        return np.full(len(chunk), bool(self.missing))
+
+
+class DtypeRule(Rule):
+    """Non-null values coerce to the expected type ('int', 'number' or 'date')."""
+
+    def __init__(self, column, kind, date_format='%Y-%m-%d', severity=None):
+        super().__init__(f"dtype: {column} is {kind}", severity)
+        self.column = column
+        self.kind = kind
+        self.date_format = date_format
+
+    def columns(self):
+        return [self.column]
+
+    def violations(self, chunk):
+        values = chunk[self.column]
+        present = values.notna().to_numpy()
+        if self.kind == 'date':
+            parsed = pd.to_datetime(values, format=self.date_format, errors='coerce')
+            return present & parsed.isna().to_numpy()
+        numeric = pd.to_numeric(values, errors='coerce')
+        bad = present & numeric.isna().to_numpy()
+        if self.kind == 'int':
+            as_float = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+            bad |= present & ~np.isnan(as_float) & (np.floor(as_float) != as_float)
+        return bad
+
+
+class NotNullRule(Rule):
+    def __init__(self, column, severity=None):
+        super().__init__(f"not null: {column}", severity)
+        self.column = column
+
+    def columns(self):
+        return [self.column]
+
+    def violations(self, chunk):
+        return chunk[self.column].isna().to_numpy()
+
+
+class RangeRule(Rule):
+    """Numeric values within [low, high]; nulls and non-numeric values are left to other rules."""
+
+    def __init__(self, column, low=None, high=None, severity=None):
+        super().__init__(f"range: {low} <= {column} <= {high}", severity)
+        self.column = column
+        self.low = low
+        self.high = high
+
+    def columns(self):
+        return [self.column]
+
+    def violations(self, chunk):
+        values = pd.to_numeric(chunk[self.column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        bad = np.zeros(len(values), dtype=bool)
+        if self.low is not None:
+            bad |= values < self.low
+        if self.high is not None:
+            bad |= values > self.high
+        return bad
+
+
+class AllowedValuesRule(Rule):
+    """Values (compared as strings, so 0 and '0' are the same) belong to an allowed set."""
+
+    def __init__(self, column, allowed, allow_null=False, severity=None):
+        super().__init__(f"allowed: {column} in {sorted(map(str, allowed))}", severity)
+        self.column = column
+        self.allowed = [str(a) for a in allowed]
+        self.allow_null = allow_null
+
+    def columns(self):
+        return [self.column]
+
+    def violations(self, chunk):
+        values = chunk[self.column]
+        null = values.isna().to_numpy()
+        text = values.astype(str).str.replace(r'\.0$', '', regex=True)
+        bad = ~text.isin(self.allowed).to_numpy()
+        return bad & ~null if self.allow_null else bad | null
+
+
+class ConditionalRule(Rule):
+    """Rows matching `when` must satisfy `then` (both callables returning masks)."""
+
+    def __init__(self, name, when, then, cols, severity=None):
+        super().__init__(name, severity)
+        self.when = when
+        self.then = then
+        self.cols = cols
+
+    def columns(self):
+        return self.cols
+
+    def violations(self, chunk):
+        return np.asarray(self.when(chunk)) & ~np.asarray(self.then(chunk))
+
+
+class UniqueRule(Rule):
+    """
+    Key columns are unique across the whole file. Keys are reduced to 64-bit
+    hashes; a sorted array of the hashes seen so far is carried across chunks.
+    Rows with a null key, or rejected by the optional key_filter (e.g. an
+    unparseable date), are left to the other rules.
+    """
+
+    def __init__(self, key_columns, key_filter=None, severity=None):
+        super().__init__(f"unique: ({', '.join(key_columns)})", severity)
+        self.key_columns = list(key_columns)
+        self.key_filter = key_filter
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def columns(self):
+        return self.key_columns
+
+    def violations(self, chunk):
+        eligible = chunk[self.key_columns].notna().all(axis=1).to_numpy().copy()
+        if self.key_filter is not None:
+            eligible &= np.asarray(self.key_filter(chunk))
+        keys = pd.util.hash_pandas_object(chunk[self.key_columns].astype(str), index=False).to_numpy()
+        rows = np.flatnonzero(eligible)
+        keys = keys[rows]
+        # Duplicates of keys from earlier chunks
+        if len(self.seen):
+            pos = np.searchsorted(self.seen, keys).clip(max=len(self.seen) - 1)
+            bad = self.seen[pos] == keys
+        else:
+            bad = np.zeros(len(keys), dtype=bool)
+        # Duplicates within this chunk: every occurrence after the first
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        repeat = np.zeros(len(keys), dtype=bool)
+        repeat[1:] = sorted_keys[1:] == sorted_keys[:-1]
+        bad[order[repeat]] = True
+        self.seen = np.union1d(self.seen, keys)
+        mask = np.zeros(len(chunk), dtype=bool)
+        mask[rows[bad]] = True
+        return mask
+
+
+class ForeignKeyRule(Rule):
+    """Values of `column` exist in a reference set (e.g. Store IDs of store.csv)."""
+
+    def __init__(self, column, reference_values, reference_name, severity=None):
+        super().__init__(f"foreign key: {column} in {reference_name}", severity)
+        self.column = column
+        self.reference = np.unique(pd.to_numeric(pd.Series(reference_values), errors='coerce').dropna())
+
+    def columns(self):
+        return [self.column]
+
+    def violations(self, chunk):
+        values = pd.to_numeric(chunk[self.column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        return ~np.isin(values, self.reference)
+
+
+# RULE SETS FOR THE ROSSMANN INPUTS
+
+TRAIN_COLUMNS = ['Store', 'DayOfWeek', 'Date', 'Sales', 'Customers', 'Open', 'Promo',
+                 'StateHoliday', 'SchoolHoliday']
+STORE_COLUMNS = ['Store', 'StoreType', 'Assortment', 'CompetitionDistance',
+                 'CompetitionOpenSinceMonth', 'CompetitionOpenSinceYear', 'Promo2',
+                 'Promo2SinceWeek', 'Promo2SinceYear', 'PromoInterval']
+
+
+def train_rules(store_ids):
+    return [
+        RequiredColumnsRule(TRAIN_COLUMNS),
+        DtypeRule('Store', 'int'),
+        DtypeRule('Sales', 'number'),
+        DtypeRule('Customers', 'int'),
+        DtypeRule('Date', 'date', severity='warning'),
+        NotNullRule('Date', severity='warning'),
+        RangeRule('DayOfWeek', 1, 7),
+        RangeRule('Sales', 0, 1_000_000),
+        RangeRule('Customers', 0, 100_000),
+        AllowedValuesRule('Open', [0, 1]),
+        AllowedValuesRule('Promo', [0, 1]),
+        AllowedValuesRule('StateHoliday', ['0', 'a', 'b', 'c']),
+        AllowedValuesRule('SchoolHoliday', [0, 1]),
+        ConditionalRule('closed days have no sales',
+                        lambda c: c['Open'].to_numpy() == 0,
+                        lambda c: c['Sales'].fillna(0).to_numpy() == 0,
+                        ['Open', 'Sales']),
+        ConditionalRule('open days have sales',
+                        lambda c: c['Open'].to_numpy() == 1,
+                        lambda c: c['Sales'].fillna(0).to_numpy() > 0,
+                        ['Open', 'Sales'], severity='warning'),
+        UniqueRule(['Store', 'Date'],
+                   key_filter=lambda c: pd.to_datetime(c['Date'], format='%Y-%m-%d',
+                                                       errors='coerce').notna().to_numpy()),
+        ForeignKeyRule('Store', store_ids, 'store.csv'),
+    ]
+
+
+def store_rules():
+    return [
+        RequiredColumnsRule(STORE_COLUMNS),
+        DtypeRule('Store', 'int'),
+        UniqueRule(['Store']),
+        AllowedValuesRule('StoreType', ['a', 'b', 'c', 'd']),
+        AllowedValuesRule('Assortment', ['a', 'b', 'c']),
+        RangeRule('CompetitionDistance', 0, 1_000_000),
+        RangeRule('CompetitionOpenSinceMonth', 1, 12),
+        RangeRule('CompetitionOpenSinceYear', 1900, 2100),
+        AllowedValuesRule('Promo2', [0, 1]),
+        RangeRule('Promo2SinceWeek', 1, 53),
+        AllowedValuesRule('PromoInterval', ['Jan,Apr,Jul,Oct', 'Feb,May,Aug,Nov', 'Mar,Jun,Sept,Dec'],
+                          allow_null=True),
+    ]
+
+
+# ENGINE
+
+class ValidationReport:
+    def __init__(self, source, rules):
+        self.source = source
+        self.rules = rules
+        self.rows = 0
+        self.counts = {rule.name: 0 for rule in rules}
+        self.samples = {rule.name: [] for rule in rules}
+        self.elapsed = 0.0
+
+    @property
+    def passed(self):
+        return all(self.counts[r.name] == 0 for r in self.rules if r.severity == 'error')
+
+    def count(self, rule_name):
+        return self.counts[rule_name]
+
+    def to_text(self):
+        lines = [f"Validation of {self.source}: {self.rows:,} rows in {self.elapsed:.2f}s",
+                 f"{'Rule':<58} {'Severity':>8} {'Violations':>12}", '-' * 80]
+        for rule in self.rules:
+            lines.append(f"{rule.name[:58]:<58} {rule.severity:>8} {self.counts[rule.name]:>12,}")
+        for rule in self.rules:
+            if self.samples[rule.name]:
+                lines.append(f"\n  Sample rows violating '{rule.name}':")
+                for row_number, values in self.samples[rule.name]:
+                    lines.append(f"    row {row_number:,}: {values}")
+        lines.append(f"\nResult: {'PASSED' if self.passed else 'FAILED'}")
+        return '\n'.join(lines)
+
+
+def validate_chunks(chunks, rules, source='<frame>', sample_size=SAMPLE_SIZE):
+    """Run every rule over an iterable of DataFrame chunks in a single pass."""
+    report = ValidationReport(source, rules)
+    start = time.perf_counter()
+    for chunk in chunks:
+        offset = report.rows
+        report.rows += len(chunk)
+        for rule in rules:
+            if any(c not in chunk.columns for c in rule.columns()):
+                continue
+            bad = rule.violations(chunk)
+            n_bad = int(np.count_nonzero(bad))
+            if not n_bad:
+                continue
+            report.counts[rule.name] += n_bad
+            samples = report.samples[rule.name]
+            if len(samples) < sample_size:
+                positions = np.flatnonzero(bad)[:sample_size - len(samples)]
+                cols = rule.columns() or list(chunk.columns)
+                for pos in positions:
+                    # +2: 1-based line numbers plus the header line
+                    samples.append((offset + int(pos) + 2, chunk.iloc[pos][cols].to_dict()))
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def validate_csv(path, rules, chunksize=CHUNK_SIZE, sample_size=SAMPLE_SIZE):
+    # Read as strings where types are mixed so dtype rules see the raw values
+    chunks = pd.read_csv(path, chunksize=chunksize, dtype={'StateHoliday': str, 'Date': str})
+    return validate_chunks(chunks, rules, source=path, sample_size=sample_size)
+
+
+def validate_inputs(train_path='train.csv', store_path='store.csv', chunksize=CHUNK_SIZE):
+    """Validate store.csv, then stream train.csv with FK coverage against it."""
+    store_report = validate_csv(store_path, store_rules(), chunksize=chunksize)
+    store_ids = pd.read_csv(store_path, usecols=['Store'])['Store']
+    train_report = validate_csv(train_path, train_rules(store_ids), chunksize=chunksize)
+    return store_report, train_report
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - PRE-LOAD DATA VALIDATION")
+    print("="*80)
+    print("\n")
+    try:
+        store_report, train_report = validate_inputs()
+    except FileNotFoundError as e:
+        print(f"✗ Error: {e}")
+        print("Please ensure train.csv and store.csv are in the same directory as this script.")
+        exit()
+
+    text = store_report.to_text() + "\n\n" + train_report.to_text()
+    print(text)
+    with open(REPORT_FILE, 'w') as f:
+        f.write(text + "\n")
+    print(f"\n💾 Saved: {REPORT_FILE}")
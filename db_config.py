@@ -0,0 +1,22 @@
+"""
+Database Configuration: Shared MySQL Connection Settings
+=========================================================
+The one place the MySQL credentials live. script_03_mysql.py creates the
+database with SERVER_CONFIG; script_04_analysis.py and micro_batch.py
+connect to it with DB_CONFIG, so every stage talks to the same warehouse.
+
+Edit the defaults below, or override them per run with ROSSMANN_DB_HOST,
+ROSSMANN_DB_USER, ROSSMANN_DB_PASSWORD and ROSSMANN_DB_NAME.
+"""
+
+import os
+
+SERVER_CONFIG = {
+    'host': os.environ.get('ROSSMANN_DB_HOST', 'localhost'),
+    'user': os.environ.get('ROSSMANN_DB_USER', 'root'),
+    'password': os.environ.get('ROSSMANN_DB_PASSWORD', 'Bz!03062003')
+}
+
+DATABASE_NAME = os.environ.get('ROSSMANN_DB_NAME', 'rossmann_analytics')
+
+DB_CONFIG = dict(SERVER_CONFIG, database=DATABASE_NAME)
@@ -0,0 +1,184 @@
+"""
+Event Study: Sales Around Competitor Openings
+==============================================
+This module measures what happened to a store's sales after a competitor
+opened nearby. Every store whose CompetitionOpenSinceMonth/Year falls inside
+the sales history is an event; its daily sales are aligned on event time
+(days since the first day of the opening month) through a single
+event-time index array, so all stores are processed in one pass.
+
+Abnormal sales are measured against control stores of the same StoreType
+that had no competitor opening during the history:
+
+  diff(store, day) = log(Sales) - mean log(Sales) of same-type controls that day
+  abnormal         = diff - mean diff of the store over the pre-event window
+
+Outputs:
+  • event_study_profile.csv - mean abnormal log-sales per event day with
+                              standard errors and the cumulative effect
+  • event_study_stores.csv  - per-store pre/post abnormal sales change
+"""
+
+import time
+import pandas as pd
+import numpy as np
+from olap_cube import load_fact_frame
+import warnings
+warnings.filterwarnings('ignore')
+
+WINDOW_DAYS = 180           # days before and after the opening
+MIN_PRE_DAYS = 30           # open days needed in the pre window for a baseline
+PROFILE_FILE = 'event_study_profile.csv'
+STORES_FILE = 'event_study_stores.csv'
+
+
+def competition_events(store_df, first_day, last_day, window=WINDOW_DAYS):
+    """
+    Opening day per store as a day number (NaN when unknown) and the masks of
+    treated stores (opening inside the history, pre and post window partly
+    observed) and control stores (no opening inside the history +- window).
+    """
+    year = pd.to_numeric(store_df['CompetitionOpenSinceYear'], errors='coerce').fillna(0).to_numpy()
+    month = pd.to_numeric(store_df['CompetitionOpenSinceMonth'], errors='coerce').fillna(0).to_numpy()
+    known = (year > 0) & (month > 0)
+    open_day = np.full(len(store_df), np.nan)
+    months = ((year[known] - 1970) * 12 + month[known] - 1).astype(np.int64)
+    open_day[known] = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    treated = known & (open_day > first_day) & (open_day <= last_day)
+    control = ~known | (open_day < first_day - window) | (open_day > last_day + window)
+    return open_day, treated, control
+
+
+class EventStudy:
+    """Abnormal sales of treated stores around their competitor opening."""
+
+    def __init__(self, fact_df, store_df, window=WINDOW_DAYS):
+        self.window = window
+        fact_df = fact_df.dropna(subset=['StoreID', 'Date', 'Sales'])
+        fact_df = fact_df[fact_df['Sales'] > 0]
+        store_df = store_df.set_index('StoreID')
+        day = pd.to_datetime(fact_df['Date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+        first_day, last_day = day.min(), day.max()
+
+        self.store_df = store_df
+        open_day, treated, control = competition_events(store_df, first_day, last_day, window)
+        n_ids = int(max(store_df.index.max(), fact_df['StoreID'].max())) + 1
+        lookup = lambda values, fill: self._lookup(n_ids, store_df.index.to_numpy(), values, fill)
+        self.open_day = lookup(open_day, np.nan)
+        self.treated = lookup(treated, False)
+        self.control = lookup(control, False)
+        types, type_code = np.unique(store_df['StoreType'].astype(str).to_numpy(), return_inverse=True)
+        self.types = types
+        self.type_code = lookup(type_code, -1)
+
+        store = fact_df['StoreID'].to_numpy(dtype=np.int64)
+        log_sales = np.log(fact_df['Sales'].to_numpy(dtype=np.float64))
+        row_type = self.type_code[store]
+        day_idx = day - first_day
+        n_days = int(day_idx.max()) + 1
+
+        # Control mean log sales per (StoreType, day) via bincount
+        is_control = self.control[store] & (row_type >= 0)
+        cell = row_type * n_days + day_idx
+        n_cells = len(types) * n_days
+        ctrl_sum = np.bincount(cell[is_control], weights=log_sales[is_control], minlength=n_cells)
+        ctrl_n = np.bincount(cell[is_control], minlength=n_cells)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ctrl_mean = ctrl_sum / ctrl_n
+
+        # Event-time index for the rows of treated stores
+        rows = self.treated[store] & (ctrl_n[np.where(row_type >= 0, cell, 0)] > 0)
+        event_day = (day - self.open_day[store])[rows].astype(np.int64)
+        in_window = np.abs(event_day) <= window
+        self.rows_store = store[rows][in_window]
+        self.event_day = event_day[in_window]
+        diff = (log_sales[rows] - ctrl_mean[cell[rows]])[in_window]
+
+        # Baseline: mean diff over the pre-event window, per store
+        pre = self.event_day < 0
+        pre_sum = np.bincount(self.rows_store[pre], weights=diff[pre], minlength=n_ids)
+        self.pre_days = np.bincount(self.rows_store[pre], minlength=n_ids)
+        self.post_days = np.bincount(self.rows_store[~pre], minlength=n_ids)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            baseline = pre_sum / self.pre_days
+        usable = (self.pre_days[self.rows_store] >= MIN_PRE_DAYS) & (self.post_days[self.rows_store] > 0)
+        self.rows_store = self.rows_store[usable]
+        self.event_day = self.event_day[usable]
+        self.abnormal = diff[usable] - baseline[self.rows_store]
+        self.n_ids = n_ids
+
+    @staticmethod
+    def _lookup(n_ids, store_ids, values, fill):
+        values = np.asarray(values)
+        lookup = np.full(n_ids, fill, dtype=values.dtype if fill is not np.nan else np.float64)
+        lookup[store_ids] = values
+        return lookup
+
+    def profile(self):
+        """Mean abnormal log-sales by event day, standard error and cumulative effect."""
+        k = self.event_day + self.window
+        n_bins = 2 * self.window + 1
+        count = np.bincount(k, minlength=n_bins)
+        total = np.bincount(k, weights=self.abnormal, minlength=n_bins)
+        total2 = np.bincount(k, weights=self.abnormal ** 2, minlength=n_bins)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            var = (total2 - count * mean ** 2) / (count - 1)
+            stderr = np.sqrt(np.clip(var, 0, None) / count)
+        post = np.arange(-self.window, self.window + 1) >= 0
+        return pd.DataFrame({
+            'EventDay': np.arange(-self.window, self.window + 1),
+            'Stores': count,
+            'MeanAbnormal': mean,
+            'StdErr': stderr,
+            'CumulativeAbnormal': np.where(post, np.nancumsum(np.where(post, mean, 0)), np.nan),
+        })
+
+    def store_effects(self):
+        """Per-store average abnormal log-sales after the opening (pre window is 0 by construction)."""
+        post = self.event_day >= 0
+        post_sum = np.bincount(self.rows_store[post], weights=self.abnormal[post], minlength=self.n_ids)
+        post_n = np.bincount(self.rows_store[post], minlength=self.n_ids)
+        stores = np.flatnonzero(post_n)
+        effect = post_sum[stores] / post_n[stores]
+        return pd.DataFrame({
+            'StoreID': stores,
+            'StoreType': self.types[self.type_code[stores]],
+            'CompetitionDistance': self.store_df.loc[stores, 'CompetitionDistance'].to_numpy(),
+            'OpenDate': self.open_day[stores].astype('datetime64[D]'),
+            'PreDays': self.pre_days[stores],
+            'PostDays': post_n[stores],
+            'AbnormalLogSales': effect,
+            'SalesChangePct': (np.exp(effect) - 1) * 100,
+        })
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - COMPETITION OPENING EVENT STUDY")
+    print("="*80)
+
+    print("\n[1/3] Aligning store sales on competitor openings...")
+    start = time.perf_counter()
+    fact_df = load_fact_frame(store_columns=[])
+    store_df = pd.read_csv('processed_dim_store.csv')
+    study = EventStudy(fact_df, store_df)
+    print(f"✓ {int(study.treated.sum()):,} treated stores, {int(study.control.sum()):,} control stores, "
+          f"{len(study.abnormal):,} event-window rows in {time.perf_counter() - start:.2f}s")
+
+    print("\n[2/3] Event-time profile...")
+    profile = study.profile()
+    profile.to_csv(PROFILE_FILE, index=False)
+    weekly = profile.assign(Week=profile['EventDay'] // 7).groupby('Week').agg(
+        Stores=('Stores', 'max'), MeanAbnormal=('MeanAbnormal', 'mean'))
+    print(weekly.loc[-4:8].to_string(float_format=lambda v: f"{v:+.4f}"))
+    print(f"   Saved to '{PROFILE_FILE}'")
+
+    print("\n[3/3] Per-store effects...")
+    effects = study.store_effects()
+    effects.to_csv(STORES_FILE, index=False)
+    print(f"✓ {len(effects):,} stores; median sales change after opening: "
+          f"{effects['SalesChangePct'].median():+.2f}%")
+    print(effects.groupby('StoreType')['SalesChangePct'].agg(['count', 'median'])
+          .to_string(float_format=lambda v: f"{v:+.2f}%"))
+    print(f"   Saved to '{STORES_FILE}'")
@@ -0,0 +1,223 @@
+"""
+Fact Store: Memory-Mapped Columnar fact_sales
+==============================================
+This module writes the processed fact data as one fixed-width binary file per
+column plus a small JSON manifest. Readers open the columns with np.memmap,
+so any number of analysis processes share the same OS page cache instead of
+each parsing processed_fact_sales.csv into a private copy.
+"""
+
+import os
+import json
+import time
+import pandas as pd
+import numpy as np
+from multiprocessing import Pool
+import warnings
+from olap_cube import normalize_state_holiday
+warnings.filterwarnings('ignore')
+
+# STORE LAYOUT
+
+STORE_DIR = 'fact_store'
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+COLUMN_DTYPES = {
+    'StoreID': 'int16',
+    'DateID': 'int16',
+    'Sales': 'int32',
+    'Customers': 'int16',
+    'Promo': 'int8',
+    'SchoolHoliday': 'int8',
+    'StateHoliday': 'int8',
+    'IsWeekend': 'int8',
+    'DayOfWeek': 'int8',
+}
+
+# StateHoliday is stored as a code into this list
+STATE_HOLIDAY_CODES = ['0', 'a', 'b', 'c']
+
+
+def _encode(fact_df):
+    """Convert a processed fact frame into the fixed-width column arrays."""
+    columns = {}
+    for col, dtype in COLUMN_DTYPES.items():
+        if col == 'StateHoliday':
+            values = pd.Categorical(normalize_state_holiday(fact_df[col].values),
+                                    categories=STATE_HOLIDAY_CODES).codes
+            if (values < 0).any():
+                raise ValueError("StateHoliday contains values outside "
+                                 f"{STATE_HOLIDAY_CODES}")
+        else:
+            values = np.rint(fact_df[col].to_numpy(dtype=np.float64))
+            info = np.iinfo(dtype)
+            if len(values) and (values.min() < info.min or values.max() > info.max):
+                raise ValueError(f"Column '{col}' does not fit in {dtype}")
+        columns[col] = np.asarray(values).astype(dtype)
+    return columns
+
+
+def _column_path(path, col):
+    return os.path.join(path, f'{col}.bin')
+
+
+def _write_manifest(path, manifest):
+    # Write to a temporary file and rename so readers never see a partial manifest
+    tmp_path = os.path.join(path, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+
+def read_manifest(path=STORE_DIR):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def write_fact_store(fact_df, path=STORE_DIR, date_origin=None):
+    """
+    Create (or overwrite) a fact store from a processed fact frame.
+    date_origin is the calendar date of DateID 1, taken from the frame when
+    not given.
+    """
+    os.makedirs(path, exist_ok=True)
+    if date_origin is None:
+        first = fact_df.loc[fact_df['DateID'].idxmin()]
+        date_origin = pd.Timestamp(first['Date']) - pd.Timedelta(days=int(first['DateID']) - 1)
+
+    columns = _encode(fact_df)
+    for col, values in columns.items():
+        values.tofile(_column_path(path, col))
+
+    manifest = {
+        'version': FORMAT_VERSION,
+        'rows': len(fact_df),
+        'date_origin': str(pd.Timestamp(date_origin).date()),
+        'columns': COLUMN_DTYPES,
+        'state_holiday_codes': STATE_HOLIDAY_CODES,
+        'appends': 0,
+    }
+    _write_manifest(path, manifest)
+    return manifest
+
+
+def append_fact_store(fact_df, path=STORE_DIR):
+    """
+    Append new fact rows (e.g. new days) to an existing store. Column files
+    are extended first and the manifest row count is bumped last, so readers
+    opened before the append keep seeing a consistent prefix. Bytes left past
+    the manifest row count by an earlier append that failed part-way are cut
+    off first, so every column stays aligned.
+    """
+    manifest = read_manifest(path)
+    columns = _encode(fact_df)
+    for col, values in columns.items():
+        column_path = _column_path(path, col)
+        size = manifest['rows'] * np.dtype(manifest['columns'][col]).itemsize
+        if os.path.getsize(column_path) < size:
+            raise ValueError(f"{column_path} is shorter than the manifest's {manifest['rows']:,} rows")
+        os.truncate(column_path, size)
+        with open(column_path, 'ab') as f:
+            values.tofile(f)
+    manifest['rows'] += len(fact_df)
+    manifest['appends'] += 1
+    _write_manifest(path, manifest)
+    return manifest
+
+
+class FactStore:
+    """Read-only, zero-copy view of a fact store directory."""
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        self.manifest = read_manifest(path)
+        self.rows = self.manifest['rows']
+        self.columns = {}
+        for col, dtype in self.manifest['columns'].items():
+            if self.rows:
+                self.columns[col] = np.memmap(_column_path(path, col), dtype=dtype,
+                                              mode='r', shape=(self.rows,))
+            else:
+                self.columns[col] = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, col):
+        return self.columns[col]
+
+    def dates(self):
+        """Calendar dates of each row, reconstructed from DateID."""
+        origin = np.datetime64(self.manifest['date_origin'])
+        return origin + (self.columns['DateID'].astype(np.int64) - 1)
+
+    def to_frame(self, columns=None):
+        """Materialize selected columns as a pandas DataFrame (copies)."""
+        columns = columns or list(self.columns)
+        df = pd.DataFrame({col: np.asarray(self.columns[col]) for col in columns})
+        if 'StateHoliday' in df.columns:
+            df['StateHoliday'] = np.asarray(STATE_HOLIDAY_CODES)[df['StateHoliday']]
+        return df
+
+
+def open_fact_store(path=STORE_DIR):
+    return FactStore(path)
+
+
+# DEMO: BUILD THE STORE AND AGGREGATE FROM PARALLEL WORKERS
+
+def _partial_sales_by_store(args):
+    """Worker: per-store sales totals over one row range of the shared store."""
+    path, start, stop = args
+    store = open_fact_store(path)
+    store_ids = store['StoreID'][start:stop]
+    sales = store['Sales'][start:stop]
+    return np.bincount(store_ids, weights=sales, minlength=int(store_ids.max()) + 1 if len(store_ids) else 0)
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - MEMORY-MAPPED FACT STORE")
+    print("="*80)
+    print("\n")
+
+    print("[1/3] Writing fact store from processed_fact_sales.csv...")
+    try:
+        fact_df = pd.read_csv('processed_fact_sales.csv', low_memory=False)
+    except FileNotFoundError as e:
+        print(f"✗ Error: {e}")
+        print("Please ensure you've run 'script_02_preprocessing.py' first!")
+        exit()
+    start = time.perf_counter()
+    manifest = write_fact_store(fact_df)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(_column_path(STORE_DIR, c)) for c in COLUMN_DTYPES)
+    print(f"✓ Wrote {manifest['rows']:,} rows ({size / 1e6:.1f} MB) to '{STORE_DIR}/' in {elapsed:.2f}s")
+    print("\n")
+
+    print("[2/3] Opening fact store...")
+    start = time.perf_counter()
+    store = open_fact_store()
+    elapsed_ms = (time.perf_counter() - start) * 1e3
+    print(f"✓ Opened {len(store):,} rows in {elapsed_ms:.2f} ms")
+    print("\n")
+
+    print("[3/3] Aggregating with parallel workers over the shared mapping...")
+    n_workers = max(1, min(4, os.cpu_count() or 1))
+    bounds = np.linspace(0, len(store), n_workers + 1).astype(int)
+    tasks = [(STORE_DIR, int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:])]
+    start = time.perf_counter()
+    with Pool(n_workers) as pool:
+        partials = pool.map(_partial_sales_by_store, tasks)
+    width = max(len(p) for p in partials)
+    totals = sum(np.pad(p, (0, width - len(p))) for p in partials)
+    elapsed = time.perf_counter() - start
+    top = np.argsort(totals)[::-1][:5]
+    print(f"✓ {n_workers} workers finished in {elapsed:.2f}s")
+    for store_id in top:
+        print(f"   Store {store_id}: ${totals[store_id]:,.2f}")
+
+    print("\n" + "="*80)
+    print("FACT STORE READY!")
+    print("="*80)
@@ -0,0 +1,160 @@
+"""
+Load Manifest: Load-Time Accumulators and Checksums
+====================================================
+This module accumulates row counts, sums, min/max values and an
+order-independent checksum for each table while its rows are streamed into
+MySQL, and writes them to a load manifest. Verification is then one cheap
+reconciliation query per table against the manifest instead of separate
+COUNT / SUM / AVG / MIN / MAX / orphan-check scans.
+
+The checksum is SUM(CRC32(CONCAT_WS('|', col1, col2, ...))) over all rows,
+computed identically in Python (zlib.crc32) and MySQL, so it does not depend
+on insertion order but does catch missing, duplicated or altered rows.
+Checksum columns must not contain NULLs (CONCAT_WS skips them).
+"""
+
+import json
+import zlib
+import pandas as pd
+import numpy as np
+
+MANIFEST_FILE = 'load_manifest.json'
+
+
+def _format_column(values, kind):
+    """Render values exactly as MySQL's CONCAT_WS renders the column."""
+    if kind == 'round':
+        # ROUND(x) on positive values rounds half away from zero
+        return pd.Series(np.floor(np.asarray(values, dtype=np.float64) + 0.5).astype(np.int64)).astype(str)
+    if kind == 'int':
+        return pd.Series(np.asarray(values, dtype=np.float64).astype(np.int64)).astype(str)
+    if kind == 'date':
+        return pd.Series(pd.to_datetime(values).strftime('%Y-%m-%d'))
+    return pd.Series(values).astype(str).reset_index(drop=True)
+
+
+def row_checksum(frame, checksum_columns):
+    """Sum of CRC32 over the '|'-joined checksum columns of every row."""
+    if len(frame) == 0:
+        return 0
+    parts = [_format_column(frame[col].values, kind) for col, kind in checksum_columns]
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined + '|' + part
+    return sum(zlib.crc32(s.encode('utf-8')) for s in joined)
+
+
+class TableAccumulator:
+    """
+    Running statistics for one table, updated batch by batch during the load.
+
+    checksum_columns: list of (column, kind) with kind in 'int', 'round',
+                      'date' or 'str'
+    sum_columns:      columns whose totals are tracked
+    range_columns:    columns whose min / max are tracked
+    """
+
+    def __init__(self, table, checksum_columns, sum_columns=(), range_columns=()):
+        self.table = table
+        self.checksum_columns = list(checksum_columns)
+        self.sum_columns = list(sum_columns)
+        self.range_columns = list(range_columns)
+        self.rows = 0
+        self.sums = {col: 0.0 for col in self.sum_columns}
+        self.mins = {col: None for col in self.range_columns}
+        self.maxs = {col: None for col in self.range_columns}
+        self.checksum = 0
+
+    def update(self, frame):
+        """Fold one batch of rows (as inserted) into the accumulators."""
+        if len(frame) == 0:
+            return
+        self.rows += len(frame)
+        for col in self.sum_columns:
+            self.sums[col] += float(pd.to_numeric(frame[col]).sum())
+        for col in self.range_columns:
+            lo, hi = frame[col].min(), frame[col].max()
+            lo, hi = (int(lo), int(hi)) if isinstance(lo, (int, np.integer)) else (lo, hi)
+            self.mins[col] = lo if self.mins[col] is None else min(self.mins[col], lo)
+            self.maxs[col] = hi if self.maxs[col] is None else max(self.maxs[col], hi)
+        self.checksum += row_checksum(frame, self.checksum_columns)
+
+    def to_dict(self):
+        return {
+            'table': self.table,
+            'rows': self.rows,
+            'sums': self.sums,
+            'mins': self.mins,
+            'maxs': self.maxs,
+            'checksum': str(self.checksum),
+            'checksum_columns': self.checksum_columns,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        acc = cls(data['table'], [tuple(c) for c in data['checksum_columns']],
+                  list(data['sums']), list(data['mins']))
+        acc.rows = data['rows']
+        acc.sums = data['sums']
+        acc.mins = data['mins']
+        acc.maxs = data['maxs']
+        acc.checksum = int(data['checksum'])
+        return acc
+
+    def reconciliation_sql(self, table=None):
+        """Single query returning the same statistics from the loaded table."""
+        table = table or self.table
+        exprs = ['COUNT(*)']
+        exprs += [f'SUM({col})' for col in self.sum_columns]
+        for col in self.range_columns:
+            exprs += [f'MIN({col})', f'MAX({col})']
+        parts = [f'ROUND({col})' if kind == 'round' else col for col, kind in self.checksum_columns]
+        exprs.append(f"SUM(CRC32(CONCAT_WS('|', {', '.join(parts)})))")
+        return f"SELECT {', '.join(exprs)} FROM {table}"
+
+    def reconcile(self, cursor, table=None):
+        """
+        Run the reconciliation query and compare with the accumulators.
+        Returns a list of human-readable mismatches (empty when the load is intact).
+        """
+        cursor.execute(self.reconciliation_sql(table))
+        values = list(cursor.fetchone())
+        mismatches = []
+
+        def check(label, expected, actual, tolerance=0):
+            if expected is None and actual is None:
+                return
+            if tolerance:
+                ok = actual is not None and abs(float(actual) - float(expected)) <= tolerance
+            else:
+                ok = str(actual) == str(expected)
+            if not ok:
+                mismatches.append(f"{self.table}.{label}: expected {expected}, found {actual}")
+
+        check('rows', self.rows, values.pop(0))
+        for col in self.sum_columns:
+            check(f'SUM({col})', self.sums[col], values.pop(0) or 0, tolerance=0.01 * max(1, self.rows))
+        for col in self.range_columns:
+            check(f'MIN({col})', self.mins[col], values.pop(0))
+            check(f'MAX({col})', self.maxs[col], values.pop(0))
+        check('checksum', self.checksum, int(values.pop(0) or 0))
+        return mismatches
+
+
+def write_manifest(accumulators, path=MANIFEST_FILE, **extra):
+    manifest = {
+        'generated': pd.Timestamp.now().isoformat(timespec='seconds'),
+        'tables': {acc.table: acc.to_dict() for acc in accumulators},
+    }
+    manifest.update(extra)
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def read_manifest(path=MANIFEST_FILE):
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest['tables'] = {name: TableAccumulator.from_dict(data)
+                          for name, data in manifest['tables'].items()}
+    return manifest
@@ -0,0 +1,149 @@
+"""
+Load Test: Concurrent Clients against the Query Service
+========================================================
+This script measures the latency of query_service.py under concurrent
+keep-alive clients on localhost. Every client sends a mix of the script_04
+endpoints with random filters for a fixed duration; the script then reports
+throughput and p50 / p90 / p99 latency overall and per endpoint.
+
+Usage:
+    python load_test_service.py [--clients 32] [--duration 10] [--spawn]
+
+With --spawn the service is started as a subprocess and stopped afterwards.
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import numpy as np
+from query_service import HOST, PORT
+import warnings
+warnings.filterwarnings('ignore')
+
+STORE_TYPES = ['a', 'b', 'c', 'd']
+MONTHS = [f'{y}-{m:02d}' for y in (2013, 2014, 2015) for m in range(1, 13)]
+
+
+def random_request(rng):
+    """(endpoint, path with a random filter combination)."""
+    endpoint = rng.choice(['stats', 'store_type', 'promo', 'monthly', 'day_of_week',
+                           'competition', 'top_stores'])
+    params = []
+    if rng.random() < 0.5:
+        params.append('store_type=' + ','.join(rng.sample(STORE_TYPES, rng.randint(1, 2))))
+    if endpoint != 'top_stores' and rng.random() < 0.3:
+        params.append(f'promo={rng.randint(0, 1)}')
+    if rng.random() < 0.5:
+        start, end = sorted(rng.sample(range(len(MONTHS)), 2))
+        params += [f'start={MONTHS[start]}', f'end={MONTHS[end]}']
+    if endpoint == 'top_stores':
+        params.append(f'k={rng.choice([5, 10, 20])}')
+    return endpoint, f'/{endpoint}' + ('?' + '&'.join(params) if params else '')
+
+
+async def client(host, port, deadline, seed, latencies, errors):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            endpoint, path = random_request(rng)
+            start = time.perf_counter()
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':')[1])
+            await reader.readexactly(length)
+            latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+            if status != 200:
+                errors.append((path, status))
+    finally:
+        writer.close()
+
+
+async def wait_for_service(host, port, timeout, service=None):
+    deadline = time.perf_counter() + timeout
+    while True:
+        if service is not None and service.poll() is not None:
+            raise RuntimeError(f"query_service.py exited with code {service.returncode}")
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run(host, port, clients, duration):
+    latencies, errors = {}, []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(host, port, deadline, seed, latencies, errors)
+                           for seed in range(clients)))
+    return latencies, errors
+
+
+def report(latencies, duration):
+    def row(name, values):
+        ms = np.array(values) * 1000
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        return f"   {name:<14}{len(ms):>9,}{p50:>10.2f}{p90:>10.2f}{p99:>10.2f}{ms.max():>10.2f}"
+
+    everything = [v for values in latencies.values() for v in values]
+    print(f"✓ {len(everything):,} requests in {duration:g}s "
+          f"({len(everything) / duration:,.0f} req/s)")
+    print(f"\n   {'Endpoint':<14}{'Requests':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint in sorted(latencies):
+        print(row(endpoint, latencies[endpoint]))
+    print(row('ALL', everything))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the analytics query service')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent keep-alive clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+    parser.add_argument('--spawn', action='store_true', help='Start query_service.py for the run')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("ROSSMANN STORE SALES - QUERY SERVICE LOAD TEST")
+    print("="*80)
+
+    service = None
+    if args.spawn:
+        print("\n[1/3] Starting query service...")
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'query_service.py')
+        service = subprocess.Popen([sys.executable, script, '--host', args.host,
+                                    '--port', str(args.port)], stdout=subprocess.DEVNULL)
+    else:
+        print(f"\n[1/3] Connecting to http://{args.host}:{args.port}/ ...")
+    try:
+        start = time.perf_counter()
+        asyncio.run(wait_for_service(args.host, args.port, timeout=300, service=service))
+        print(f"✓ Service ready after {time.perf_counter() - start:.1f}s")
+
+        print("\n[2/3] Warm-up (1s, 4 clients)...")
+        asyncio.run(run(args.host, args.port, 4, 1.0))
+        print("✓ Done")
+
+        print(f"\n[3/3] {args.clients} concurrent clients for {args.duration:g}s...")
+        latencies, errors = asyncio.run(run(args.host, args.port, args.clients, args.duration))
+        report(latencies, args.duration)
+        if errors:
+            print(f"\n⚠ {len(errors):,} non-200 responses, e.g. {errors[0]}")
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
@@ -0,0 +1,376 @@
+"""
+Micro-Batch Ingestion: Append a Day or a Week of Sales
+=======================================================
+This module ingests a single sales file in the train.csv format (typically
+yesterday's sales, or one week) into an already processed pipeline instead
+of re-running scripts 1-4 over the whole history:
+
+  1. validate the batch (data_validation.train_rules) and apply the Script 2
+     cleaning rules: invalid dates, duplicate (Store, Date) rows, closed
+     stores and zero-sales days are dropped; dates already in dim_date are
+     skipped, so re-running a batch is a no-op
+  2. derive the fact columns with the same rules as Script 2 (shared with
+     it in preprocessing_rules.py) and extend dim_date with the new days; the
+     days-to / days-since holiday columns are recomputed over the whole
+     calendar because a new holiday changes them for earlier dates
+  3. score the new store-days against the last WINDOW observations of each
+     (store, weekday, promo) group and the store's pooled MAD
+     (anomaly_detection.AnomalyDetector)
+  4. append to the MySQL warehouse in one transaction: dim_date upsert,
+     fact rows and anomalies; load_manifest.json accumulators are updated
+  5. append to the processed files: processed_fact_sales.csv,
+     processed_anomalies.csv, the memory-mapped fact store and the
+     approximate-query sketches, then processed_dim_date.csv last
+     (rewritten atomically)
+
+The warehouse is written before any file, so a failed load leaves the files
+untouched and the batch can simply be retried. If a file fails after the
+warehouse commit, the retry finds the batch's new dates already in dim_date
+and skips their fact and anomaly rows, so it only completes the files.
+processed_dim_date.csv marks which dates are loaded, so it only advances
+once every other file has the batch; until then micro_batch_progress.json
+records the sinks already done and the CSV sizes before the batch, and a
+retry of the same file cuts partial appends off and resumes from there.
+The in-memory rollups (OLAP cube, rankings) live in query_service.py: when
+it sees the new load generation it reads only the rows appended to
+processed_fact_sales.csv and folds them in with SalesCube.add and
+RankingEngine.append, so a batch never triggers a full rebuild.
+
+Usage:
+    python micro_batch.py sales_2015-08-01.csv [more files...] [--no-warehouse]
+
+The MySQL connection is the warehouse's own (db_config.py, shared with
+scripts 3 and 4).
+"""
+
+import os
+import json
+import time
+import argparse
+import pandas as pd
+import numpy as np
+from data_validation import validate_chunks, train_rules
+from anomaly_detection import AnomalyDetector, ANOMALY_FILE, ANOMALY_COLUMNS
+from approx_analytics import ApproxAnalytics, SKETCH_FILE
+from fact_store import STORE_DIR, open_fact_store, append_fact_store, read_manifest as read_fact_store_manifest
+from olap_cube import normalize_state_holiday
+from load_manifest import MANIFEST_FILE, read_manifest, write_manifest
+from db_config import DB_CONFIG
+from preprocessing_rules import clean_batch, derive_fact_rows, date_dimension, add_holiday_distances
+import warnings
+warnings.filterwarnings('ignore')
+
+FACT_FILE = 'processed_fact_sales.csv'
+DATE_FILE = 'processed_dim_date.csv'
+STORE_FILE = 'processed_dim_store.csv'
+PROGRESS_FILE = 'micro_batch_progress.json'
+
+FACT_COLUMNS = ['StoreID', 'Date', 'DayOfWeek', 'Sales', 'Customers', 'Promo',
+                'StateHoliday', 'SchoolHoliday', 'SalesPerCustomer',
+                'Year', 'Month', 'Quarter', 'IsWeekend',
+                'CompetitionActive', 'MonthsSinceCompetitionOpen', 'Promo2Active', 'IsPromo2Month', 'DateID']
+DISTANCE_COLUMNS = ['DaysToStateHoliday', 'DaysSinceStateHoliday', 'NextStateHoliday',
+                    'DaysToSchoolHoliday', 'DaysSinceSchoolHoliday']
+
+
+def _rows(frame):
+    """Python tuples with None for missing values (what the MySQL driver expects)."""
+    return list(frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None))
+
+
+def fact_history(columns=('StoreID', 'DateID', 'DayOfWeek', 'Promo', 'Sales')):
+    """Processed fact rows so far: from the memory-mapped fact store when present, else the CSV."""
+    if os.path.isdir(STORE_DIR):
+        store = open_fact_store()
+        history = pd.DataFrame({c: np.asarray(store[c]) for c in columns})
+        history['Date'] = pd.to_datetime(store.dates())
+        return history
+    history = pd.read_csv(FACT_FILE, usecols=list(columns) + ['Date'])
+    history['Date'] = pd.to_datetime(history['Date'])
+    return history
+
+
+# MICRO-BATCH
+
+class MicroBatch:
+    """One batch file prepared in memory against the current processed files."""
+
+    def __init__(self, batch_df, source='<frame>'):
+        self.source = source
+        self.dim_store = pd.read_csv(STORE_FILE)
+        dim_date = pd.read_csv(DATE_FILE, dtype={'NextStateHoliday': str})
+        dim_date['Date'] = pd.to_datetime(dim_date['Date'])
+        self.report = validate_chunks([batch_df], train_rules(self.dim_store['StoreID']), source=source)
+
+        train_df, holiday_rows, self.dropped = clean_batch(batch_df)
+        last_date = dim_date['Date'].max()
+        loaded = train_df['Date'] <= last_date
+        unknown = ~train_df['Store'].isin(self.dim_store['StoreID'])
+        self.dropped['already loaded'] = int(loaded.sum())
+        self.dropped['unknown store'] = int((unknown & ~loaded).sum())
+        train_df = train_df[~loaded & ~unknown]
+        holiday_rows = holiday_rows[holiday_rows['Date'] > last_date]
+
+        # Extend the calendar through the batch's last date (closed days included)
+        end = holiday_rows['Date'].max() if len(holiday_rows) else last_date
+        new_range = pd.date_range(last_date + pd.Timedelta(days=1), end, freq='D')
+        old_distances = dim_date[DISTANCE_COLUMNS].copy()
+        new_dates = date_dimension(new_range, holiday_rows, first_id=int(dim_date['DateID'].max()) + 1)
+        self.dim_date = add_holiday_distances(pd.concat([dim_date, new_dates], ignore_index=True))
+        recomputed = self.dim_date[DISTANCE_COLUMNS].iloc[:len(dim_date)]
+        changed = ~((recomputed == old_distances) | (recomputed.isna() & old_distances.isna())).all(axis=1)
+        self.new_dates = self.dim_date.iloc[len(dim_date):]
+        self.changed_dates = self.dim_date.iloc[:len(dim_date)][changed.to_numpy()]
+
+        facts = derive_fact_rows(train_df, self.dim_store)
+        facts = facts.merge(self.dim_date[['Date', 'DateID']], on='Date', how='left')[FACT_COLUMNS]
+        self.facts = facts.sort_values(['Date', 'StoreID']).reset_index(drop=True)
+        self.anomalies = None
+
+    def __len__(self):
+        return len(self.facts)
+
+    def score_anomalies(self, history=None):
+        """Anomalies among the new rows; the detector is primed with the rows they depend on."""
+        if not len(self.facts):
+            self.anomalies = pd.DataFrame(columns=ANOMALY_COLUMNS)
+            return self.anomalies
+        history = fact_history() if history is None else history
+        detector = AnomalyDetector()
+        detector.prime(history)
+        self.anomalies = detector.update(self.facts)
+        return self.anomalies
+
+    # WAREHOUSE
+
+    def append_warehouse(self, config=DB_CONFIG, manifest_path=MANIFEST_FILE):
+        """
+        dim_date upsert, fact rows and anomalies in one MySQL transaction,
+        then the load manifest accumulators are advanced by the batch.
+
+        New dates already in dim_date were committed by an earlier attempt
+        whose file append failed; their fact and anomaly rows are skipped so
+        a retry neither duplicates facts nor counts them twice in the
+        manifest. Returns the number of such dates.
+        """
+        import mysql.connector
+
+        manifest = read_manifest(manifest_path)
+        fact_schema = manifest.get('fact_schema', 'wide')
+        fact_table = 'fact_sales_data' if fact_schema == 'compact' else 'fact_sales'
+
+        date_rows = pd.concat([self.new_dates, self.changed_dates])
+        date_rows = date_rows.assign(Date=date_rows['Date'].dt.date)
+        date_columns = list(date_rows.columns)
+        date_sql = f"""
+        INSERT INTO dim_date ({', '.join(date_columns)})
+        VALUES ({', '.join(['%s'] * len(date_columns))})
+        ON DUPLICATE KEY UPDATE {', '.join(f'{c} = VALUES({c})' for c in DISTANCE_COLUMNS)}
+        """
+        activity_columns = ['CompetitionActive', 'MonthsSinceCompetitionOpen', 'Promo2Active', 'IsPromo2Month']
+        if fact_schema == 'compact':
+            fact_columns = ['StoreID', 'DateID', 'Sales', 'Customers', 'Promo', 'StateHoliday',
+                            'SchoolHoliday', 'SalesPerCustomer'] + activity_columns
+            fact_rows = self.facts.assign(Sales=self.facts['Sales'].round().astype(np.int64))
+        else:
+            fact_columns = ['StoreID', 'Date', 'DayOfWeek', 'Sales', 'Customers', 'Promo', 'StateHoliday',
+                            'SchoolHoliday', 'SalesPerCustomer', 'Year', 'Month', 'Quarter', 'IsWeekend',
+                            'DateID'] + activity_columns
+            fact_rows = self.facts.assign(Date=self.facts['Date'].dt.date)
+        fact_rows = fact_rows.assign(StateHoliday=normalize_state_holiday(fact_rows['StateHoliday']))
+        fact_sql = f"""
+        INSERT INTO {fact_table} ({', '.join(fact_columns)})
+        VALUES ({', '.join(['%s'] * len(fact_columns))})
+        """
+        anomaly_columns = ['StoreID', 'DateID', 'Sales', 'ExpectedSales', 'Score', 'Direction']
+        anomaly_sql = f"""
+        INSERT INTO fact_anomalies ({', '.join(anomaly_columns)})
+        VALUES ({', '.join(['%s'] * len(anomaly_columns))})
+        """
+
+        anomalies = self.anomalies if self.anomalies is not None else pd.DataFrame(columns=anomaly_columns)
+
+        connection = mysql.connector.connect(**config)
+        try:
+            cursor = connection.cursor()
+            new_ids = [int(i) for i in self.new_dates['DateID']]
+            loaded = set()
+            if new_ids:
+                cursor.execute(f"SELECT DateID FROM dim_date WHERE DateID IN ({', '.join(['%s'] * len(new_ids))})",
+                               new_ids)
+                loaded = {int(r[0]) for r in cursor.fetchall()}
+            facts = self.facts[~self.facts['DateID'].isin(loaded)]
+            fact_rows = fact_rows[~fact_rows['DateID'].isin(loaded)][fact_columns]
+            anomalies = anomalies[~anomalies['DateID'].isin(loaded)]
+            if len(date_rows):
+                cursor.executemany(date_sql, _rows(date_rows))
+            if len(fact_rows):
+                cursor.executemany(fact_sql, _rows(fact_rows))
+            if len(anomalies):
+                cursor.executemany(anomaly_sql, _rows(anomalies[anomaly_columns]))
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        # Advance the load manifest so reconciliation still matches the tables
+        tables = manifest.pop('tables')
+        manifest.pop('generated', None)
+        new_dates = self.new_dates[~self.new_dates['DateID'].isin(loaded)]
+        if 'dim_date' in tables:
+            tables['dim_date'].update(new_dates.assign(Date=new_dates['Date'].dt.date))
+        if fact_table in tables:
+            tables[fact_table].update(facts)
+        if len(facts) and manifest.get('date_range'):
+            manifest['date_range'] = [manifest['date_range'][0],
+                                      str(facts['Date'].max().date())]
+        if len(new_dates):
+            manifest['micro_batches'] = manifest.get('micro_batches', 0) + 1
+        write_manifest(list(tables.values()), path=manifest_path, **manifest)
+        return len(loaded)
+
+    # PROCESSED FILES
+
+    def _progress(self):
+        """Progress of an interrupted append_files() of this batch (fresh if none)."""
+        key = [int(self.new_dates['DateID'].min()), int(self.new_dates['DateID'].max()), len(self.facts)]
+        if os.path.exists(PROGRESS_FILE):
+            with open(PROGRESS_FILE) as f:
+                progress = json.load(f)
+            if progress['batch'] != key:
+                raise RuntimeError(f"'{PROGRESS_FILE}' holds an unfinished batch (DateID {progress['batch'][0]}-"
+                                   f"{progress['batch'][1]}); re-run that batch first")
+            return progress
+        return {'batch': key, 'done': [], 'before': {}}
+
+    @staticmethod
+    def _save_progress(progress):
+        tmp_path = PROGRESS_FILE + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(progress, f, indent=2)
+        os.replace(tmp_path, PROGRESS_FILE)
+
+    def append_files(self):
+        """
+        Append the batch to the processed CSVs, fact store and sketches, then
+        advance processed_dim_date.csv; returns the files touched. Resumes an
+        interrupted earlier call on the same batch (see PROGRESS_FILE).
+        """
+        touched = []
+        if len(self.facts):
+            progress = self._progress()
+
+            def state(name, current):
+                """This sink's state before the batch, recorded on first use."""
+                if name not in progress['before']:
+                    progress['before'][name] = current
+                    self._save_progress(progress)
+                return progress['before'][name]
+
+            def finish(name, label=None):
+                progress['done'].append(name)
+                self._save_progress(progress)
+                touched.append(label or name)
+
+            def append_csv(path, frame):
+                # Cut off a partial append of an interrupted attempt first
+                size = state(path, os.path.getsize(path) if os.path.exists(path) else 0)
+                if os.path.exists(path):
+                    os.truncate(path, size)
+                frame.to_csv(path, mode='a', header=size == 0, index=False)
+                finish(path)
+
+            if FACT_FILE not in progress['done']:
+                header = pd.read_csv(FACT_FILE, nrows=0).columns
+                append_csv(FACT_FILE, self.facts[header])
+
+            if self.anomalies is not None and len(self.anomalies) and ANOMALY_FILE not in progress['done']:
+                append_csv(ANOMALY_FILE, self.anomalies)
+
+            if os.path.isdir(STORE_DIR) and STORE_DIR not in progress['done']:
+                rows = state(STORE_DIR, read_fact_store_manifest()['rows'])
+                if read_fact_store_manifest()['rows'] == rows:   # not appended by the interrupted attempt
+                    append_fact_store(self.facts)
+                finish(STORE_DIR, f'{STORE_DIR}/')
+
+            if os.path.exists(SKETCH_FILE) and SKETCH_FILE not in progress['done']:
+                mtime = state(SKETCH_FILE, os.stat(SKETCH_FILE).st_mtime_ns)
+                if os.stat(SKETCH_FILE).st_mtime_ns == mtime:  # not saved by the interrupted attempt
+                    sketch_df = self.facts.merge(self.dim_store[['StoreID', 'StoreType']], on='StoreID', how='left')
+                    tmp_path = SKETCH_FILE + '.tmp'
+                    ApproxAnalytics.load().add(sketch_df).save(tmp_path)
+                    os.replace(tmp_path, SKETCH_FILE)
+                finish(SKETCH_FILE)
+
+        # dim_date last: once it has the new dates, a retry treats them as loaded
+        if len(self.new_dates) or len(self.changed_dates):
+            tmp_path = DATE_FILE + '.tmp'
+            self.dim_date.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, DATE_FILE)
+            touched.append(DATE_FILE)
+        if os.path.exists(PROGRESS_FILE):
+            os.remove(PROGRESS_FILE)
+        return touched
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingest daily / weekly sales files in the train.csv format')
+    parser.add_argument('batches', nargs='+', help='Batch files, ingested in the given order')
+    parser.add_argument('--no-warehouse', action='store_true',
+                        help='Only update the processed files (no MySQL append)')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("ROSSMANN STORE SALES - MICRO-BATCH INGESTION")
+    print("="*80)
+
+    for path in args.batches:
+        print(f"\n{path}")
+        total_start = time.perf_counter()
+
+        print("[1/4] Validating, cleaning and deriving columns...")
+        start = time.perf_counter()
+        batch = MicroBatch(pd.read_csv(path), source=path)
+        status = "✓ passed" if batch.report.passed else "⚠ has rule violations"
+        print(f"✓ {len(batch):,} fact rows, {len(batch.new_dates):,} new dates "
+              f"({len(batch.changed_dates):,} earlier dates with new holiday distances) "
+              f"in {time.perf_counter() - start:.2f}s; validation {status}")
+        dropped = ', '.join(f"{n:,} {rule}" for rule, n in batch.dropped.items() if n)
+        if dropped:
+            print(f"   Dropped: {dropped}")
+        if not len(batch) and not len(batch.new_dates):
+            print("✓ Nothing new to ingest")
+            continue
+
+        print("[2/4] Scoring anomalies...")
+        start = time.perf_counter()
+        anomalies = batch.score_anomalies()
+        print(f"✓ {len(anomalies):,} anomalous store-days in {time.perf_counter() - start:.2f}s")
+
+        print("[3/4] Appending to the warehouse...")
+        start = time.perf_counter()
+        if args.no_warehouse:
+            print("   Skipped (--no-warehouse)")
+        elif not os.path.exists(MANIFEST_FILE):
+            print(f"   Skipped: '{MANIFEST_FILE}' not found (run 'script_03_mysql.py' first)")
+        else:
+            try:
+                already_loaded = batch.append_warehouse()
+            except Exception as e:
+                print(f"✗ Warehouse append failed, processed files left unchanged: {e}")
+                exit(1)
+            if already_loaded:
+                print(f"   {already_loaded:,} dates were loaded by an earlier attempt; their rows were skipped")
+            print(f"✓ Loaded in {time.perf_counter() - start:.2f}s")
+
+        print("[4/4] Appending to processed files...")
+        start = time.perf_counter()
+        try:
+            touched = batch.append_files()
+        except Exception as e:
+            print(f"✗ File append failed: {e}")
+            print(f"   Re-run '{path}' to resume; '{DATE_FILE}' was not advanced")
+            exit(1)
+        print(f"✓ Updated {', '.join(touched)} in {time.perf_counter() - start:.2f}s")
+        print(f"\n✓ Batch ingested in {time.perf_counter() - total_start:.2f}s")
@@ -0,0 +1,311 @@
+"""
+OLAP Cube: Dense In-Memory Sales Cube
+======================================
+This module materializes the processed fact data into a dense NumPy cube
+over the low-cardinality dimensions used by the script_04 analyses, so that
+slicing, rolling up and drilling down are answered from memory instead of
+re-scanning fact_sales.
+"""
+
+import time
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+# CUBE DEFINITION
+
+# Dimensions with a fixed domain. Year is the only open-ended dimension; its
+# domain is taken from the data and grows when new days are added.
+FIXED_DIMENSIONS = {
+    'StoreType': ['a', 'b', 'c', 'd'],
+    'Assortment': ['a', 'b', 'c'],
+    'CompetitionCategory': ['No Competition', 'Very Close', 'Close', 'Moderate', 'Far'],
+    'Promo': [0, 1],
+    'SchoolHoliday': [0, 1],
+    'StateHoliday': ['0', 'a', 'b', 'c'],
+    'Month': list(range(1, 13)),
+    'DayOfWeek': list(range(1, 8)),
+}
+
+DIMENSION_ORDER = ['StoreType', 'Assortment', 'CompetitionCategory', 'Promo',
+                   'SchoolHoliday', 'StateHoliday', 'Year', 'Month', 'DayOfWeek']
+
+# Additive measures stored per cell (last axis of the cube)
+MEASURES = ['Sales', 'Customers', 'SalesPerCustomer', 'Count', 'SalesSq']
+
+
+def normalize_state_holiday(values):
+    """StateHoliday arrives as a mix of int 0 and strings '0'/'a'/'b'/'c'."""
+    return pd.Series(values).astype(str).str.strip().replace({'0.0': '0', 'nan': '0'})
+
+
+STORE_ATTRIBUTES = ['StoreType', 'Assortment', 'CompetitionCategory']
+
+
+def load_fact_frame(fact_path='processed_fact_sales.csv',
+                    store_path='processed_dim_store.csv',
+                    store_columns=STORE_ATTRIBUTES):
+    """Load processed fact rows joined with the dim_store attributes."""
+    return join_store_attributes(pd.read_csv(fact_path, low_memory=False),
+                                 pd.read_csv(store_path), store_columns)
+
+
+def join_store_attributes(fact_df, store_df, store_columns=STORE_ATTRIBUTES):
+    """
+    Fact rows joined with dim_store attributes. CompetitionCategory is taken
+    per row, as in script_04: days before the competitor opened
+    (CompetitionActive = 0) count as 'No Competition'.
+    """
+    fact_df = fact_df.merge(
+        store_df[['StoreID'] + list(store_columns)],
+        on='StoreID',
+        how='left'
+    )
+    if 'CompetitionCategory' in fact_df.columns and 'CompetitionActive' in fact_df.columns:
+        fact_df['CompetitionCategory'] = fact_df['CompetitionCategory'].where(
+            fact_df['CompetitionActive'] == 1, 'No Competition')
+    return fact_df
+
+
+class SalesCube:
+    """
+    Dense cube of SUM(Sales), SUM(Customers), SUM(SalesPerCustomer), COUNT
+    and SUM(Sales^2) over DIMENSION_ORDER.
+
+    The cube is a single ndarray with one axis per dimension plus a trailing
+    measure axis. A sub-cube produced by slice() keeps the same layout with
+    fewer coordinates on the filtered axes.
+    """
+
+    def __init__(self, dimensions, data):
+        self.dimensions = dimensions      # dict: name -> list of coordinate values
+        self.data = data                  # ndarray: dims... x len(MEASURES)
+        self._rollups = {}                # cache: dimension tuple -> reduced ndarray
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def empty(cls, years):
+        dimensions = {}
+        for name in DIMENSION_ORDER:
+            if name == 'Year':
+                dimensions[name] = sorted(int(y) for y in years)
+            else:
+                dimensions[name] = list(FIXED_DIMENSIONS[name])
+        shape = [len(dimensions[name]) for name in DIMENSION_ORDER] + [len(MEASURES)]
+        return cls(dimensions, np.zeros(shape, dtype=np.float64))
+
+    @classmethod
+    def from_frame(cls, fact_df):
+        """Build the cube from one pass over a fact frame."""
+        cube = cls.empty(pd.unique(fact_df['Year']))
+        cube.add(fact_df)
+        return cube
+
+    def _codes(self, name, values):
+        """Map raw dimension values to axis positions (-1 if unknown)."""
+        domain = self.dimensions[name]
+        if name == 'StateHoliday':
+            values = normalize_state_holiday(values)
+        codes = pd.Categorical(values, categories=domain).codes
+        return np.asarray(codes, dtype=np.int64)
+
+    def _grow_years(self, years):
+        new_years = sorted(set(int(y) for y in years) - set(self.dimensions['Year']))
+        if not new_years:
+            return
+        all_years = sorted(self.dimensions['Year'] + new_years)
+        axis = DIMENSION_ORDER.index('Year')
+        shape = list(self.data.shape)
+        shape[axis] = len(all_years)
+        grown = np.zeros(shape, dtype=self.data.dtype)
+        positions = [all_years.index(y) for y in self.dimensions['Year']]
+        index = [slice(None)] * grown.ndim
+        index[axis] = positions
+        grown[tuple(index)] = self.data
+        self.dimensions['Year'] = all_years
+        self.data = grown
+
+    def add(self, fact_df):
+        """
+        Incrementally fold new fact rows into the cube (e.g. newly loaded days).
+        Rows with a dimension value outside the cube domain are skipped.
+        """
+        self._grow_years(pd.unique(fact_df['Year']))
+        self._rollups.clear()
+
+        codes = [self._codes(name, fact_df[name].values) for name in DIMENSION_ORDER]
+        valid = np.ones(len(fact_df), dtype=bool)
+        for c in codes:
+            valid &= c >= 0
+        codes = [c[valid] for c in codes]
+
+        cell_shape = self.data.shape[:-1]
+        flat = np.ravel_multi_index(codes, cell_shape)
+        n_cells = int(np.prod(cell_shape))
+
+        sales = fact_df['Sales'].values[valid].astype(np.float64)
+        customers = fact_df['Customers'].values[valid].astype(np.float64)
+        basket = fact_df['SalesPerCustomer'].fillna(0).values[valid].astype(np.float64)
+
+        measures = self.data.reshape(n_cells, len(MEASURES))
+        measures[:, 0] += np.bincount(flat, weights=sales, minlength=n_cells)
+        measures[:, 1] += np.bincount(flat, weights=customers, minlength=n_cells)
+        measures[:, 2] += np.bincount(flat, weights=basket, minlength=n_cells)
+        measures[:, 3] += np.bincount(flat, minlength=n_cells)
+        measures[:, 4] += np.bincount(flat, weights=sales * sales, minlength=n_cells)
+
+        return int(valid.sum())
+
+    # ------------------------------------------------------------------
+    # Query API
+    # ------------------------------------------------------------------
+
+    def slice(self, **filters):
+        """
+        Restrict one or more dimensions to a value or list of values, e.g.
+        cube.slice(StoreType='b', Promo=1, Year=[2014, 2015]).
+        Returns a new SalesCube sharing no state with this one.
+        """
+        unknown = [f for f in filters if f not in DIMENSION_ORDER]
+        if unknown:
+            raise ValueError(f"Unknown cube dimension(s): {unknown}")
+
+        index = []
+        dimensions = {}
+        for name in DIMENSION_ORDER:
+            domain = self.dimensions[name]
+            if name in filters:
+                wanted = filters[name]
+                if not isinstance(wanted, (list, tuple, set, np.ndarray)):
+                    wanted = [wanted]
+                if name == 'StateHoliday':
+                    wanted = [str(v) for v in wanted]
+                positions = [domain.index(v) for v in wanted if v in domain]
+                index.append(positions)
+                dimensions[name] = [domain[p] for p in positions]
+            else:
+                index.append(slice(None))
+                dimensions[name] = list(domain)
+        index.append(slice(None))
+
+        data = self.data
+        # Apply list indexers one axis at a time to avoid NumPy's fancy
+        # indexing broadcasting across axes
+        for axis, idx in enumerate(index):
+            if isinstance(idx, list):
+                data = np.take(data, idx, axis=axis)
+        return SalesCube(dimensions, data.copy())
+
+    def rollup(self, *by):
+        """
+        Aggregate the cube down to the given dimensions and return a DataFrame
+        with totals, averages and standard deviation per group. Calling it
+        with no dimensions returns the grand total.
+        """
+        unknown = [b for b in by if b not in DIMENSION_ORDER]
+        if unknown:
+            raise ValueError(f"Unknown cube dimension(s): {unknown}")
+
+        reduced = self.totals(*by).reshape(-1, len(MEASURES))
+
+        if by:
+            grid = pd.MultiIndex.from_product(
+                [self.dimensions[b] for b in by], names=list(by)
+            ).to_frame(index=False)
+        else:
+            grid = pd.DataFrame(index=[0])
+
+        result = grid.assign(**{m: reduced[:, i] for i, m in enumerate(MEASURES)})
+        result = result[result['Count'] > 0].reset_index(drop=True)
+        return self._derive(result)
+
+    def totals(self, *by):
+        """
+        Raw measure array reduced to the given dimensions (in the given order).
+        Reductions are cached until the next add(), so repeated questions are
+        answered without touching the full cube again.
+        """
+        key = tuple(by)
+        if key not in self._rollups:
+            keep_axes = [DIMENSION_ORDER.index(b) for b in by]
+            drop_axes = tuple(a for a in range(len(DIMENSION_ORDER)) if a not in keep_axes)
+            reduced = self.data.sum(axis=drop_axes)
+
+            # Reorder the remaining axes to the order requested by the caller
+            remaining = sorted(keep_axes)
+            reduced = np.moveaxis(reduced, [remaining.index(a) for a in keep_axes],
+                                  list(range(len(keep_axes))))
+            self._rollups[key] = np.ascontiguousarray(reduced)
+        return self._rollups[key]
+
+    def drilldown(self, current, dimension):
+        """Drill one level down from an existing roll-up."""
+        return self.rollup(*(list(current) + [dimension]))
+
+    @staticmethod
+    def _derive(df):
+        count = df['Count']
+        df['TotalSales'] = df['Sales']
+        df['AvgSales'] = df['Sales'] / count
+        df['AvgCustomers'] = df['Customers'] / count
+        df['AvgBasketSize'] = df['SalesPerCustomer'] / count
+        # Sample standard deviation from the sum of squares
+        variance = (df['SalesSq'] - df['Sales'] ** 2 / count) / (count - 1)
+        df['StdSales'] = np.sqrt(variance.clip(lower=0))
+        df['Count'] = count.astype(np.int64)
+        return df.drop(columns=['Sales', 'SalesSq', 'SalesPerCustomer'])
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+# DEMO: REPRODUCE THE SCRIPT_04 AGGREGATES FROM THE CUBE
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - OLAP CUBE")
+    print("="*80)
+    print("\n")
+
+    print("[1/3] Loading processed fact data...")
+    try:
+        fact_df = load_fact_frame()
+    except FileNotFoundError as e:
+        print(f"✗ Error: {e}")
+        print("Please ensure you've run 'script_02_preprocessing.py' first!")
+        exit()
+    print(f"✓ Loaded {len(fact_df):,} fact records")
+    print("\n")
+
+    print("[2/3] Building cube...")
+    start = time.perf_counter()
+    cube = SalesCube.from_frame(fact_df)
+    elapsed = time.perf_counter() - start
+    shape = ' × '.join(str(s) for s in cube.data.shape)
+    print(f"✓ Built cube {shape} ({cube.nbytes / 1e6:.1f} MB) in {elapsed:.2f}s")
+    print("\n")
+
+    print("[3/3] Answering script_04 analyses from the cube...")
+    analyses = [
+        ('Overall', ()),
+        ('Store type', ('StoreType',)),
+        ('Promotion', ('Promo',)),
+        ('Monthly trend', ('Year', 'Month')),
+        ('Day of week', ('DayOfWeek',)),
+        ('Competition', ('CompetitionCategory',)),
+    ]
+    for title, by in analyses:
+        start = time.perf_counter()
+        result = cube.rollup(*by)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        print(f"\n--- {title} ({elapsed_us:,.0f} µs) ---")
+        print(result.head(12).to_string(index=False))
+
+    print("\n" + "="*80)
+    print("CUBE READY!")
+    print("="*80)
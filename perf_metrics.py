@@ -0,0 +1,236 @@
+"""
+Performance Metrics: Stage-Level Instrumentation
+=================================================
+This module records wall time, CPU time, memory (the process peak RSS and
+how far each stage raised it) and output-row throughput for each numbered
+step of the pipeline scripts and appends them as JSON lines to a metrics
+file, so production runs can be compared over time.
+
+Usage inside a script:
+
+    metrics = PipelineMetrics('script_02_preprocessing')
+    metrics.stage('[1/7] Loading raw datasets')
+    ...
+    metrics.rows(rows_in=len(raw_df), rows_out=len(clean_df))
+    metrics.stage('[2/7] Cleaning TRAIN dataset')
+    ...
+    metrics.finish()
+
+or around any block / function:
+
+    with stage('build cube', rows_in=len(df)) as m:
+        ...
+        m.rows_out = len(result)
+
+    @instrument('forecast fit')
+    def fit(...): ...
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:          # Windows: no getrusage, RSS is reported as None
+    resource = None
+
+# CONFIGURATION
+
+METRICS_FILE = os.environ.get('PIPELINE_METRICS_FILE', 'pipeline_metrics.jsonl')
+
+# tracemalloc gives exact Python-level peaks per stage but slows allocation-heavy
+# code; enable it with PIPELINE_TRACEMALLOC=1 when investigating memory
+TRACE_MALLOC = os.environ.get('PIPELINE_TRACEMALLOC', '0') == '1'
+
+PRINT_SUMMARY = True
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak / 1024 ** 2
+    return peak / 1024
+
+
+class StageMetrics:
+    """Measurements for one stage; rows_in / rows_out may be set while it runs."""
+
+    def __init__(self, script, name, run_id, rows_in=None):
+        self.script = script
+        self.name = name
+        self.run_id = run_id
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._rss_start = peak_rss_mb()
+        self.record = None
+        if TRACE_MALLOC:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.process_time() - self._cpu_start
+        rss = peak_rss_mb()
+        self.record = {
+            'run_id': self.run_id,
+            'script': self.script,
+            'stage': self.name,
+            'started_at': self.started_at,
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            # ru_maxrss is the process-lifetime peak; rss_growth_mb is how far
+            # this stage raised it (0 when it stayed below an earlier peak)
+            'peak_rss_mb': None if rss is None else round(rss, 1),
+            'rss_growth_mb': None if rss is None else round(rss - self._rss_start, 1),
+            'tracemalloc_peak_mb': None,
+            'rows_in': None if self.rows_in is None else int(self.rows_in),
+            'rows_out': None if self.rows_out is None else int(self.rows_out),
+            # Output throughput only: read-only stages (no rows_out) get no rate
+            'rows_per_s': round(self.rows_out / wall, 1) if self.rows_out and wall > 0 else None,
+        }
+        if TRACE_MALLOC and tracemalloc.is_tracing():
+            self.record['tracemalloc_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+        return self.record
+
+
+def _new_run_id():
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{socket.gethostname()}-{os.getpid()}"
+
+
+def write_records(records, path=None):
+    path = path or METRICS_FILE
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+
+def format_summary(records):
+    """Fixed-width summary table of stage records."""
+    lines = [f"{'Stage':<44} {'Wall s':>8} {'CPU s':>8} {'Proc peak MB':>12} {'Stage +MB':>10} "
+             f"{'Rows out':>11} {'Rows out/s':>11}",
+             '-' * 109]
+    for r in records:
+        rss = '' if r['peak_rss_mb'] is None else f"{r['peak_rss_mb']:,.0f}"
+        growth = '' if r.get('rss_growth_mb') is None else f"{r['rss_growth_mb']:,.0f}"
+        rows = '' if r['rows_out'] is None else f"{r['rows_out']:,}"
+        rate = '' if r['rows_per_s'] is None else f"{r['rows_per_s']:,.0f}"
+        lines.append(f"{r['stage'][:44]:<44} {r['wall_s']:>8.2f} {r['cpu_s']:>8.2f} "
+                     f"{rss:>12} {growth:>10} {rows:>11} {rate:>11}")
+    total_wall = sum(r['wall_s'] for r in records)
+    total_cpu = sum(r['cpu_s'] for r in records)
+    lines.append('-' * 109)
+    lines.append(f"{'TOTAL':<44} {total_wall:>8.2f} {total_cpu:>8.2f}")
+    return '\n'.join(lines)
+
+
+class PipelineMetrics:
+    """
+    Sequential stage recorder for the numbered steps of a script. Starting a
+    new stage closes the previous one; finish() closes the last stage, appends
+    every record to the metrics file and optionally prints a summary table.
+    """
+
+    def __init__(self, script, path=None):
+        self.script = script
+        self.path = path
+        self.run_id = _new_run_id()
+        self.records = []
+        self.current = None
+
+    def stage(self, name, rows_in=None):
+        self._close()
+        self.current = StageMetrics(self.script, name, self.run_id, rows_in=rows_in)
+        return self.current
+
+    def rows(self, rows_in=None, rows_out=None):
+        if self.current is None:
+            return
+        if rows_in is not None:
+            self.current.rows_in = rows_in
+        if rows_out is not None:
+            self.current.rows_out = rows_out
+
+    def _close(self):
+        if self.current is not None:
+            self.records.append(self.current.stop())
+            self.current = None
+
+    def finish(self, print_summary=None):
+        self._close()
+        write_records(self.records, self.path)
+        if PRINT_SUMMARY if print_summary is None else print_summary:
+            print(f"\nPerformance metrics ({self.script}, run {self.run_id}):")
+            print(format_summary(self.records))
+            print(f"Metrics appended to '{self.path or METRICS_FILE}'")
+        return self.records
+
+
+@contextmanager
+def stage(name, rows_in=None, script=None, path=None):
+    """Context manager recording a single stage and appending it to the metrics file."""
+    script = script or os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    metrics = StageMetrics(script, name, _new_run_id(), rows_in=rows_in)
+    try:
+        yield metrics
+    finally:
+        write_records([metrics.stop()], path)
+
+
+def instrument(name=None, path=None):
+    """
+    Decorator recording each call of a function as a stage. If the function
+    returns something with a length, it is used as rows_out.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name or func.__qualname__, script=func.__module__, path=path) as m:
+                result = func(*args, **kwargs)
+                try:
+                    m.rows_out = len(result)
+                except TypeError:
+                    pass
+                return result
+        return wrapper
+    return decorator
+
+
+def load_metrics(path=None):
+    """Read every recorded stage from the metrics file."""
+    path = path or METRICS_FILE
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - PIPELINE METRICS")
+    print("="*80)
+    records = load_metrics()
+    if not records:
+        print(f"\nNo metrics recorded yet in '{METRICS_FILE}'. Run the pipeline scripts first.")
+        exit()
+    # Show the most recent run of each script
+    latest = {}
+    for r in records:
+        latest[r['script']] = r['run_id']
+    for script, run_id in sorted(latest.items()):
+        print(f"\n{script} (run {run_id}):")
+        print(format_summary([r for r in records if r['run_id'] == run_id]))
@@ -0,0 +1,177 @@
+"""
+Preprocessing Rules: Shared Script 2 Transformations
+=====================================================
+The cleaning and derivation rules of Script 2 that are applied both to the
+full history (script_02_preprocessing.py) and to single daily / weekly
+batches (micro_batch.py): per-day competition and Promo2 activity flags,
+the dim_date calendar with per-date holiday shares, and the days-to /
+days-since holiday distances. Keeping them here lets either caller import
+them without pulling in the other's dependencies.
+"""
+
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+
+def add_activity_flags(train_df, store_df):
+    """
+    Per-day CompetitionActive, MonthsSinceCompetitionOpen, Promo2Active and
+    IsPromo2Month: store-level arrays indexed by StoreID are broadcast against
+    the date arrays of the train rows (Store, Date, Year, Month columns).
+    """
+    store_ids = store_df['Store'].to_numpy(dtype=np.int64)
+    row_store = train_df['Store'].to_numpy(dtype=np.int64)
+    n_ids = max(store_ids.max(), row_store.max(initial=0)) + 1
+
+    def by_store(values, fill, dtype):
+        lookup = np.full(n_ids, fill, dtype=dtype)
+        lookup[store_ids] = values
+        return lookup
+
+    # Competition opening as a month index (Year * 12 + Month - 1); -1 when unknown
+    comp_year = store_df['CompetitionOpenSinceYear'].fillna(0).to_numpy(dtype=np.int64)
+    comp_month = store_df['CompetitionOpenSinceMonth'].fillna(0).to_numpy(dtype=np.int64)
+    comp_open = by_store(np.where((comp_year > 0) & (comp_month > 0), comp_year * 12 + comp_month - 1, -1), -1, np.int64)
+    has_comp = by_store(store_df['HasCompetition'].to_numpy(dtype=bool), False, bool)
+
+    # Promo2 start: Monday of ISO week Promo2SinceWeek of Promo2SinceYear
+    promo2_year = store_df['Promo2SinceYear'].fillna(0).to_numpy(dtype=np.int64)
+    promo2_week = store_df['Promo2SinceWeek'].fillna(0).to_numpy(dtype=np.int64)
+    jan4 = (np.maximum(promo2_year, 1970) - 1970).astype('datetime64[Y]').astype('datetime64[D]') + 3
+    week1_monday = jan4 - (jan4.astype(np.int64) + 3) % 7          # 1970-01-01 was a Thursday
+    promo2_start = week1_monday + (promo2_week - 1) * 7
+    promo2_known = (store_df['Promo2'].fillna(0).to_numpy() == 1) & (promo2_year > 0) & (promo2_week > 0)
+    promo2_start = by_store(np.where(promo2_known, promo2_start, np.datetime64('NaT')), np.datetime64('NaT'), 'datetime64[D]')
+
+    # PromoInterval ("Jan,Apr,Jul,Oct") parsed once into a 12-bit month mask
+    month_bits = {name: 1 << i for i, name in enumerate(
+        ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sept', 'Oct', 'Nov', 'Dec'])}
+    month_bits['Sep'] = month_bits['Sept']
+    interval_masks = {interval: sum(month_bits.get(m.strip(), 0) for m in str(interval).split(','))
+                      for interval in store_df['PromoInterval'].unique()}
+    promo2_mask = by_store(store_df['PromoInterval'].map(interval_masks).to_numpy(dtype=np.int64), 0, np.int64)
+
+    row_dates = train_df['Date'].to_numpy(dtype='datetime64[D]')
+    row_month = train_df['Year'].to_numpy(dtype=np.int64) * 12 + train_df['Month'].to_numpy(dtype=np.int64) - 1
+    row_comp_open = comp_open[row_store]
+    competition_active = has_comp[row_store] & ((row_comp_open < 0) | (row_month >= row_comp_open))
+    train_df['CompetitionActive'] = competition_active.astype(int)
+    train_df['MonthsSinceCompetitionOpen'] = np.where(competition_active & (row_comp_open >= 0),
+                                                      row_month - row_comp_open, 0)
+    promo2_active = row_dates >= promo2_start[row_store]            # NaT compares False
+    train_df['Promo2Active'] = promo2_active.astype(int)
+    in_interval = (promo2_mask[row_store] >> (train_df['Month'].to_numpy(dtype=np.int64) - 1)) & 1
+    train_df['IsPromo2Month'] = (promo2_active & (in_interval == 1)).astype(int)
+    return train_df
+
+
+def date_dimension(date_range, holiday_rows, first_id=1):
+    """
+    dim_date rows for date_range with calendar and holiday attributes
+    (holiday distances are added over the whole calendar by
+    add_holiday_distances). holiday_rows holds Date / StateHoliday /
+    SchoolHoliday of every dated train record, closed days included.
+    """
+    date_dim = pd.DataFrame({
+        'DateID': range(first_id, first_id + len(date_range)),
+        'Date': date_range,
+        'Year': date_range.year,
+        'Month': date_range.month,
+        'Day': date_range.day,
+        'Quarter': date_range.quarter,
+        'WeekOfYear': date_range.isocalendar().week,
+        'DayOfWeek': date_range.dayofweek + 1,  # 1=Monday, 7=Sunday
+        'DayName': date_range.strftime('%A'),
+        'MonthName': date_range.strftime('%B'),
+        'IsWeekend': (date_range.dayofweek >= 5).astype(int),
+        'IsMonthStart': date_range.is_month_start.astype(int),
+        'IsMonthEnd': date_range.is_month_end.astype(int),
+        'IsQuarterStart': date_range.is_quarter_start.astype(int),
+        'IsQuarterEnd': date_range.is_quarter_end.astype(int),
+        'IsYearStart': date_range.is_year_start.astype(int),
+        'IsYearEnd': date_range.is_year_end.astype(int)
+    })
+
+    # StateHoliday / SchoolHoliday vary by federal state and stay on the fact
+    # rows; a date only records the share of stores observing each. On holiday
+    # days NextStateHoliday starts as the type most stores observe (the
+    # distances below then keep it, as the next holiday is the day itself)
+    holiday_rows = holiday_rows.copy()
+    holiday_rows['StateHoliday'] = holiday_rows['StateHoliday'].astype(str).str.strip().replace({'0.0': '0', 'nan': '0'})
+    holiday_rows['IsStateHoliday'] = (holiday_rows['StateHoliday'] != '0').astype(int)
+    holiday_rows['SchoolHoliday'] = pd.to_numeric(holiday_rows['SchoolHoliday'], errors='coerce').fillna(0)
+    by_date = holiday_rows.groupby('Date')
+    state_share = by_date['IsStateHoliday'].mean().reindex(date_range, fill_value=0)
+    school_share = by_date['SchoolHoliday'].mean().reindex(date_range, fill_value=0)
+    holiday_type = (holiday_rows[holiday_rows['IsStateHoliday'] == 1]
+                    .groupby('Date')['StateHoliday'].agg(lambda v: v.value_counts().index[0])
+                    .reindex(date_range, fill_value='0'))
+
+    date_dim['StateHolidayShare'] = state_share.values.round(3)
+    date_dim['SchoolHolidayShare'] = school_share.values.round(3)
+    date_dim['NextStateHoliday'] = holiday_type.values
+    return date_dim
+
+
+def add_holiday_distances(date_dim):
+    """
+    Days to / since the nearest state and school holidays via searchsorted
+    over holiday days. A date is a state holiday day when any store observes
+    one and a school holiday day when most stores do.
+    """
+    day_numbers = pd.to_datetime(date_dim['Date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+
+    def holiday_distances(is_holiday):
+        holiday_days = day_numbers[is_holiday]
+        if len(holiday_days) == 0:
+            missing = np.full(len(day_numbers), np.nan)
+            return missing, missing, np.full(len(day_numbers), -1)
+        nxt = np.searchsorted(holiday_days, day_numbers, side='left')
+        prev = np.searchsorted(holiday_days, day_numbers, side='right') - 1
+        days_to = np.where(nxt < len(holiday_days), holiday_days[np.minimum(nxt, len(holiday_days) - 1)] - day_numbers, np.nan)
+        days_since = np.where(prev >= 0, day_numbers - holiday_days[np.maximum(prev, 0)], np.nan)
+        return days_to, days_since, np.where(nxt < len(holiday_days), nxt, -1)
+
+    is_state_holiday = date_dim['StateHolidayShare'].to_numpy() > 0
+    days_to, days_since, next_idx = holiday_distances(is_state_holiday)
+    date_dim['DaysToStateHoliday'] = days_to
+    date_dim['DaysSinceStateHoliday'] = days_since
+    holiday_types = date_dim['NextStateHoliday'].astype(str).to_numpy()[is_state_holiday]
+    date_dim['NextStateHoliday'] = np.where(next_idx >= 0, holiday_types[np.maximum(next_idx, 0)] if len(holiday_types) else '0', '0')
+    days_to, days_since, _ = holiday_distances(date_dim['SchoolHolidayShare'].to_numpy() >= 0.5)
+    date_dim['DaysToSchoolHoliday'] = days_to
+    date_dim['DaysSinceSchoolHoliday'] = days_since
+    return date_dim
+
+
+def clean_batch(batch_df):
+    """
+    Script 2 cleaning for one batch. Returns the open, non-zero-sales rows,
+    the holiday rows of every dated record and the number of rows dropped
+    per rule.
+    """
+    batch_df = batch_df.copy()
+    batch_df['Date'] = pd.to_datetime(batch_df['Date'], errors='coerce')
+    dropped = {}
+    duplicated = batch_df.duplicated(subset=['Store', 'Date']) & batch_df['Date'].notna()
+    dropped['duplicate (Store, Date)'] = int(duplicated.sum())
+    dropped['invalid date'] = int(batch_df['Date'].isna().sum())
+    batch_df = batch_df[~duplicated & batch_df['Date'].notna()]
+    holiday_rows = batch_df[['Date', 'StateHoliday', 'SchoolHoliday']].copy()
+    dropped['closed'] = int((batch_df['Open'] != 1).sum())
+    batch_df = batch_df[batch_df['Open'] == 1]
+    dropped['zero sales'] = int((batch_df['Sales'] <= 0).sum())
+    return batch_df[batch_df['Sales'] > 0].copy(), holiday_rows, dropped
+
+
+def derive_fact_rows(train_df, dim_store):
+    """Script 2 derived fact columns for cleaned train rows, keyed by StoreID."""
+    train_df['SalesPerCustomer'] = (train_df['Sales'] / train_df['Customers']).round(2)
+    train_df['Year'] = train_df['Date'].dt.year
+    train_df['Month'] = train_df['Date'].dt.month
+    train_df['Quarter'] = train_df['Date'].dt.quarter
+    train_df['IsWeekend'] = train_df['DayOfWeek'].isin([6, 7]).astype(int)
+    add_activity_flags(train_df, dim_store.rename(columns={'StoreID': 'Store'}))
+    return train_df.rename(columns={'Store': 'StoreID'})
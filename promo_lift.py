@@ -0,0 +1,194 @@
+"""
+Promo Lift: Stratified Promotional Lift with Bootstrap Intervals
+=================================================================
+This module replaces the global AVG(Sales) Promo vs no-Promo comparison of
+script_04 with a lift estimate stratified within store and day of week, so
+store mix and weekday effects do not leak into the promo effect:
+
+  lift = Σ w·mean(Sales | promo) / Σ w·mean(Sales | no promo) - 1
+
+summed over (store, day-of-week) strata that have both promo and non-promo
+days, weighted by the number of promo days w. Lift is reported per store,
+per StoreType, per DayOfWeek and overall.
+
+Confidence intervals come from a stratified bootstrap that resamples days
+within each (store, day-of-week, promo) cell. Replicates are drawn as one
+index matrix per batch and reduced with np.bincount; stores are split
+across a process pool.
+"""
+
+import os
+import time
+import pandas as pd
+import numpy as np
+from multiprocessing import Pool
+from olap_cube import load_fact_frame
+import warnings
+warnings.filterwarnings('ignore')
+
+N_BOOTSTRAP = 1000
+BATCH_SIZE = 50             # replicates drawn per index matrix
+CONFIDENCE = 0.95
+LIFT_FILE = 'promo_lift.csv'
+
+
+def _cell_layout(store_idx, dow, promo, n_stores):
+    """Cell id per row: ((store * 7) + dow - 1) * 2 + promo."""
+    return ((store_idx * 7 + (dow - 1)) * 2 + promo).astype(np.int64), n_stores * 14
+
+
+def _strata_totals(cell_sums, cell_counts, n_stores):
+    """
+    Weighted promo / non-promo totals per (store, dow) stratum.
+    cell_sums may carry a leading replicate axis.
+    """
+    lead = cell_sums.shape[:-1]
+    sums = cell_sums.reshape(lead + (n_stores, 7, 2))
+    counts = cell_counts.reshape(n_stores, 7, 2)
+    valid = (counts[..., 0] > 0) & (counts[..., 1] > 0)
+    weight = np.where(valid, counts[..., 1], 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+    promo_total = np.where(valid, weight * means[..., 1], 0.0)
+    base_total = np.where(valid, weight * means[..., 0], 0.0)
+    return promo_total, base_total, weight
+
+
+def _bootstrap_block(args):
+    """Worker: bootstrap promo / base totals per (store, dow) for a block of stores."""
+    sales, cells, n_stores, n_boot, batch_size, seed = args
+    rng = np.random.default_rng(seed)
+    n_cells = n_stores * 14
+    order = np.argsort(cells, kind='stable')
+    sales, cells = sales[order], cells[order]
+    counts = np.bincount(cells, minlength=n_cells)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    row_offset = offsets[cells].astype(np.int32)
+    row_count = counts[cells].astype(np.float32)
+    row_last = (counts[cells] - 1).astype(np.int32)
+
+    # Buffers reused by every batch
+    uniform = np.empty((batch_size, len(sales)), dtype=np.float32)
+    draws = np.empty((batch_size, len(sales)), dtype=np.int32)
+    resampled = np.empty((batch_size, len(sales)), dtype=np.float64)
+    keys = (np.arange(batch_size)[:, None] * n_cells + cells[None, :]).ravel()
+
+    promo_totals, base_totals = [], []
+    for start in range(0, n_boot, batch_size):
+        b = min(batch_size, n_boot - start)
+        # One draw for the whole batch: each row is replaced by a random row of its cell
+        rng.random(dtype=np.float32, out=uniform)
+        np.multiply(uniform, row_count, out=uniform)
+        np.copyto(draws, uniform, casting='unsafe')
+        np.minimum(draws, row_last, out=draws)
+        np.add(draws, row_offset, out=draws)
+        np.take(sales, draws, out=resampled)
+        cell_sums = np.bincount(keys, weights=resampled.ravel(),
+                                minlength=batch_size * n_cells).reshape(batch_size, n_cells)[:b]
+        promo_total, base_total, _ = _strata_totals(cell_sums, counts, n_stores)
+        promo_totals.append(promo_total)
+        base_totals.append(base_total)
+    return np.concatenate(promo_totals), np.concatenate(base_totals)
+
+
+class PromoLift:
+    """Stratified promo lift with bootstrap confidence intervals."""
+
+    def __init__(self, fact_df):
+        fact_df = fact_df.dropna(subset=['StoreID', 'DayOfWeek', 'Promo', 'Sales'])
+        self.store_ids, store_idx = np.unique(fact_df['StoreID'].to_numpy(dtype=np.int64), return_inverse=True)
+        self.store_idx = store_idx
+        self.sales = fact_df['Sales'].to_numpy(dtype=np.float64)
+        self.cells, self.n_cells = _cell_layout(store_idx, fact_df['DayOfWeek'].to_numpy(dtype=np.int64),
+                                                fact_df['Promo'].to_numpy(dtype=np.int64), len(self.store_ids))
+        store_types = fact_df.groupby('StoreID')['StoreType'].first() if 'StoreType' in fact_df else None
+        self.store_types = (store_types.reindex(self.store_ids).to_numpy()
+                            if store_types is not None else np.full(len(self.store_ids), ''))
+        self.counts = np.bincount(self.cells, minlength=self.n_cells)
+        sums = np.bincount(self.cells, weights=self.sales, minlength=self.n_cells)
+        self.promo_total, self.base_total, self.weight = _strata_totals(sums, self.counts, len(self.store_ids))
+        self.boot_promo = self.boot_base = None
+
+    def bootstrap(self, n_boot=N_BOOTSTRAP, workers=None, batch_size=BATCH_SIZE, seed=0):
+        """Resample within cells; stores are split into one block per worker."""
+        workers = workers or max(1, min(4, os.cpu_count() or 1))
+        blocks = np.array_split(np.arange(len(self.store_ids)), workers)
+        tasks = []
+        for i, block in enumerate(blocks):
+            rows = np.isin(self.store_idx, block)
+            local_cells = self.cells[rows] - block[0] * 14
+            tasks.append((self.sales[rows], local_cells, len(block), n_boot, batch_size, seed + i))
+        if workers == 1:
+            results = [_bootstrap_block(t) for t in tasks]
+        else:
+            with Pool(workers) as pool:
+                results = pool.map(_bootstrap_block, tasks)
+        self.boot_promo = np.concatenate([r[0] for r in results], axis=1)    # (B, stores, 7)
+        self.boot_base = np.concatenate([r[1] for r in results], axis=1)
+        return self
+
+    def _summarize(self, level, keys, promo, base, boot_promo, boot_base, promo_days):
+        promo, base = np.asarray(promo, dtype=np.float64), np.asarray(base, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            lift = promo / base - 1
+            rows = {'Level': level, 'Key': keys, 'Lift': lift, 'PromoDays': promo_days}
+            if boot_promo is not None:
+                boot_lift = boot_promo / boot_base - 1
+                alpha = (1 - CONFIDENCE) / 2
+                rows['CI_Low'] = np.nanquantile(boot_lift, alpha, axis=0)
+                rows['CI_High'] = np.nanquantile(boot_lift, 1 - alpha, axis=0)
+        return pd.DataFrame(rows)
+
+    def results(self):
+        """Lift (and intervals after bootstrap()) per store, StoreType, DayOfWeek and overall."""
+        bp, bb = self.boot_promo, self.boot_base
+        booted = bp is not None
+        frames = [self._summarize('Store', self.store_ids,
+                                  self.promo_total.sum(axis=1), self.base_total.sum(axis=1),
+                                  bp.sum(axis=2) if booted else None, bb.sum(axis=2) if booted else None,
+                                  self.weight.sum(axis=1))]
+        types = np.unique(self.store_types)
+        type_of = np.searchsorted(types, self.store_types)
+
+        def by_type(x):         # (..., stores, 7) -> (..., types)
+            per_store = x.sum(axis=-1)
+            return np.stack([per_store[..., type_of == t].sum(axis=-1) for t in range(len(types))], axis=-1)
+        frames.append(self._summarize('StoreType', types, by_type(self.promo_total), by_type(self.base_total),
+                                      by_type(bp) if booted else None, by_type(bb) if booted else None,
+                                      by_type(self.weight)))
+        frames.append(self._summarize('DayOfWeek', np.arange(1, 8),
+                                      self.promo_total.sum(axis=0), self.base_total.sum(axis=0),
+                                      bp.sum(axis=1) if booted else None, bb.sum(axis=1) if booted else None,
+                                      self.weight.sum(axis=0)))
+        frames.append(self._summarize('Overall', ['All'], [self.promo_total.sum()], [self.base_total.sum()],
+                                      bp.sum(axis=(1, 2))[:, None] if booted else None,
+                                      bb.sum(axis=(1, 2))[:, None] if booted else None,
+                                      [self.weight.sum()]))
+        result = pd.concat(frames, ignore_index=True)
+        return result[result['PromoDays'] > 0].reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - STRATIFIED PROMO LIFT")
+    print("="*80)
+
+    print("\n[1/3] Loading processed fact data...")
+    fact_df = load_fact_frame(store_columns=['StoreType'])
+    naive = fact_df.groupby('Promo')['Sales'].mean()
+    print(f"✓ {len(fact_df):,} rows; naive global lift {naive[1] / naive[0] - 1:.2%}")
+
+    print(f"\n[2/3] Bootstrapping {N_BOOTSTRAP:,} replicates...")
+    start = time.perf_counter()
+    lift = PromoLift(fact_df).bootstrap()
+    print(f"✓ Done in {time.perf_counter() - start:.2f}s")
+
+    print(f"\n[3/3] Saving results to '{LIFT_FILE}'...")
+    results = lift.results()
+    results.to_csv(LIFT_FILE, index=False)
+    summary = results[results['Level'] != 'Store']
+    print(summary.to_string(index=False, formatters={
+        'Lift': '{:.2%}'.format, 'CI_Low': '{:.2%}'.format, 'CI_High': '{:.2%}'.format}))
+    stores = results[results['Level'] == 'Store']
+    print(f"\n   Stores with a significant positive lift: "
+          f"{(stores['CI_Low'] > 0).sum():,} of {len(stores):,}")
@@ -0,0 +1,301 @@
+"""
+Query Profiler: Execution Plans and Index Recommendations
+==========================================================
+This module profiles the analysis queries of script_04 against MySQL. For
+each query it captures EXPLAIN FORMAT=JSON, the server-side execution
+time, rows examined vs. returned, which indexes were used, and whether MySQL
+fell back to a full scan, a temporary table or a filesort. The query itself
+runs once: its result rows are handed back to the caller and its statistics
+are read from performance_schema (EXPLAIN ANALYZE, which executes the query
+again, is opt-in). The results are ranked by cost in a text report together
+with covering / composite index suggestions derived from the GROUP BY and
+JOIN patterns; when the fact table is a view (the compact schema), the
+suggestions target its base table.
+
+Enable it in script_04 with the environment variable
+ROSSMANN_PROFILE_QUERIES=1; add ROSSMANN_PROFILE_ANALYZE=1 to also capture
+EXPLAIN ANALYZE (actual per-step timings, at the cost of a second execution
+of every query).
+"""
+
+import re
+import json
+import time
+from mysql.connector import Error
+
+# Columns of each star-schema table, used to attribute query columns to tables
+TABLE_COLUMNS = {
+    'fact_sales': ['StoreID', 'DateID', 'Date', 'DayOfWeek', 'Sales', 'Customers', 'Promo',
+                   'StateHoliday', 'SchoolHoliday', 'SalesPerCustomer', 'Year', 'Month',
+                   'Quarter', 'IsWeekend', 'CompetitionActive', 'MonthsSinceCompetitionOpen',
+                   'Promo2Active', 'IsPromo2Month'],
+    'dim_store': ['StoreID', 'StoreType', 'Assortment', 'CompetitionDistance',
+                  'CompetitionCategory', 'Promo2', 'PromoInterval', 'Segment'],
+    'dim_date': ['DateID', 'Date', 'Year', 'Month', 'Day', 'Quarter', 'WeekOfYear',
+                 'DayOfWeek', 'DayName', 'MonthName', 'IsWeekend', 'StateHolidayShare',
+                 'SchoolHolidayShare', 'NextStateHoliday', 'DaysToStateHoliday',
+                 'DaysSinceStateHoliday', 'DaysToSchoolHoliday', 'DaysSinceSchoolHoliday'],
+    'fact_anomalies': ['StoreID', 'DateID', 'Sales', 'ExpectedSales', 'Score', 'Direction'],
+}
+
+KNOWN_INDEXES = ['idx_store', 'idx_date', 'idx_year_month', 'idx_date_col', 'PRIMARY']
+
+REPORT_FILE = 'query_profile_report.txt'
+
+
+def _walk_tables(node):
+    """Yield every 'table' entry of an EXPLAIN FORMAT=JSON plan."""
+    if isinstance(node, dict):
+        if 'table' in node and isinstance(node['table'], dict):
+            yield node['table']
+        for value in node.values():
+            yield from _walk_tables(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _walk_tables(item)
+
+
+def _plan_flags(plan):
+    """Temporary table / filesort flags anywhere in the plan."""
+    text = json.dumps(plan)
+    return ('"using_temporary_table": true' in text,
+            '"using_filesort": true' in text)
+
+
+def _aliases(sql):
+    """Map table aliases (and bare table names) to star-schema tables."""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.I):
+        if table in TABLE_COLUMNS:
+            aliases[table] = table
+            if alias and alias.upper() not in ('ON', 'WHERE', 'GROUP', 'ORDER', 'LIMIT', 'JOIN'):
+                aliases[alias] = table
+    return aliases
+
+
+def _columns_for(sql_fragment, table, aliases, single_table):
+    """Columns of `table` referenced in a SQL fragment."""
+    found = []
+    for alias, column in re.findall(r'\b(?:(\w+)\.)?(\w+)\b', sql_fragment):
+        if alias:
+            if aliases.get(alias) != table:
+                continue
+        elif not single_table:
+            continue
+        if column in TABLE_COLUMNS[table] and column not in found:
+            found.append(column)
+    return found
+
+
+def recommend_indexes(sql, fact_table='fact_sales', index_table=None, index_columns=None):
+    """
+    Heuristic index suggestions for the fact table: the GROUP BY / WHERE
+    columns of the fact table as the leading key, the JOIN key next, and the
+    remaining referenced columns appended so the index covers the query.
+
+    When fact_table is a view, index_table / index_columns name its base
+    table and that table's columns; view columns the base table does not
+    have (the dim_date attributes of the compact view) map to DateID.
+    """
+    aliases = _aliases(sql)
+    if fact_table not in aliases.values():
+        return []
+    single_table = len(set(aliases.values())) == 1
+
+    def clause(keyword, stop_words):
+        match = re.search(keyword + r'(.*?)(?:' + '|'.join(stop_words) + r'|$)', sql, re.I | re.S)
+        return match.group(1) if match else ''
+
+    group_cols = _columns_for(clause(r'\bGROUP\s+BY\b', [r'\bORDER\b', r'\bLIMIT\b', r'\bHAVING\b']),
+                              fact_table, aliases, single_table)
+    where_cols = _columns_for(clause(r'\bWHERE\b', [r'\bGROUP\b', r'\bORDER\b', r'\bLIMIT\b']),
+                              fact_table, aliases, single_table)
+    join_cols = _columns_for(' '.join(re.findall(r'\bON\s+(.*?)(?:\bWHERE\b|\bGROUP\b|\bJOIN\b|$)', sql, re.I | re.S)),
+                             fact_table, aliases, single_table)
+    all_cols = _columns_for(sql, fact_table, aliases, single_table)
+
+    key = []
+    for col in where_cols + group_cols + join_cols:
+        if col not in key:
+            key.append(col)
+    if not key:
+        return []
+    covering = key + [c for c in all_cols if c not in key]
+    if index_columns is not None:
+        def on_base(cols):
+            mapped = []
+            for col in cols:
+                col = col if col in index_columns else 'DateID'
+                if col not in mapped:
+                    mapped.append(col)
+            return mapped
+        key, covering = on_base(key), on_base(covering)
+    name = 'idx_cov_' + '_'.join(c.lower() for c in key)[:50]
+    return [f"CREATE INDEX {name} ON {index_table or fact_table} ({', '.join(covering)})"]
+
+
+def view_base_table(view_definition):
+    """First table of a view's FROM clause (information_schema.VIEWS definition)."""
+    match = re.search(r'\bfrom\s+\(*`?(?:\w+`?\.`?)?(\w+)`?', view_definition, re.I)
+    return match.group(1) if match else None
+
+
+class QueryProfiler:
+    """Collects execution profiles of named queries on one MySQL connection."""
+
+    def __init__(self, conn, fact_table='fact_sales', explain_analyze=False):
+        self.conn = conn
+        self.fact_table = fact_table
+        self.explain_analyze = explain_analyze      # executes every query a second time
+        self.profiles = []
+        self.index_table, self.index_columns = self._resolve_view(fact_table)
+
+    def _resolve_view(self, table):
+        """(base table, its columns) when `table` is a view, else (None, None)."""
+        try:
+            rows = self._fetch("""
+                SELECT VIEW_DEFINITION FROM information_schema.VIEWS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            """, (table,))
+            base = view_base_table(rows[0][0]) if rows else None
+            if base is None:
+                return None, None
+            columns = self._fetch("""
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                ORDER BY ORDINAL_POSITION
+            """, (base,))
+        except Error:
+            return None, None
+        return base, [r[0] for r in columns]
+
+    def _fetch(self, sql, params=None):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql, params or ())
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def _statement_stats(self, sql):
+        """Server-side statistics of the last execution of `sql` on this thread."""
+        try:
+            rows = self._fetch("""
+                SELECT TIMER_WAIT, ROWS_EXAMINED, ROWS_SENT, CREATED_TMP_TABLES,
+                       CREATED_TMP_DISK_TABLES, SELECT_SCAN, SORT_ROWS, NO_INDEX_USED
+                FROM performance_schema.events_statements_history
+                WHERE THREAD_ID = PS_CURRENT_THREAD_ID()
+                  AND SQL_TEXT = %s
+                ORDER BY EVENT_ID DESC
+                LIMIT 1
+            """, (sql,))
+        except Error:
+            return None
+        if not rows:
+            return None
+        r = rows[0]
+        return {
+            'server_time_ms': r[0] / 1e9,          # TIMER_WAIT is in picoseconds
+            'rows_examined': int(r[1]),
+            'rows_returned': int(r[2]),
+            'tmp_tables': int(r[3]),
+            'tmp_disk_tables': int(r[4]),
+            'full_scans': int(r[5]),
+            'sort_rows': int(r[6]),
+            'no_index_used': bool(r[7]),
+        }
+
+    def profile(self, name, sql):
+        """
+        Explain, execute and record one query; returns (profile dict, column
+        names, result rows) so the caller does not run the query again.
+        """
+        sql = sql.strip()
+        profile = {'name': name, 'sql': sql}
+
+        try:
+            plan = json.loads(self._fetch('EXPLAIN FORMAT=JSON ' + sql)[0][0])
+        except Error as e:
+            plan = {}
+            profile['explain_error'] = str(e)
+        profile['plan'] = plan
+        profile['query_cost'] = float(plan.get('query_block', {}).get('cost_info', {}).get('query_cost', 0))
+
+        tables = []
+        for t in _walk_tables(plan):
+            tables.append({
+                'table': t.get('table_name'),
+                'access_type': t.get('access_type'),
+                'key': t.get('key'),
+                'rows_examined_per_scan': t.get('rows_examined_per_scan'),
+            })
+        profile['tables'] = tables
+        profile['indexes_used'] = sorted({t['key'] for t in tables if t['key']})
+        profile['full_scan_tables'] = [t['table'] for t in tables if t['access_type'] == 'ALL']
+        profile['using_temporary'], profile['using_filesort'] = _plan_flags(plan)
+
+        profile['explain_analyze'] = None
+        if self.explain_analyze:
+            try:
+                profile['explain_analyze'] = '\n'.join(r[0] for r in self._fetch('EXPLAIN ANALYZE ' + sql))
+            except Error:
+                pass                                # MySQL < 8.0.18
+
+        cursor = self.conn.cursor()
+        try:
+            start = time.perf_counter()
+            cursor.execute(sql)
+            result_rows = cursor.fetchall()
+            profile['client_time_ms'] = (time.perf_counter() - start) * 1e3
+            columns = [d[0] for d in cursor.description]
+        finally:
+            cursor.close()
+        stats = self._statement_stats(sql) or {}
+        profile.update(stats)
+        profile.setdefault('rows_returned', len(result_rows))
+        profile.setdefault('server_time_ms', profile['client_time_ms'])
+
+        profile['recommendations'] = recommend_indexes(sql, self.fact_table,
+                                                       self.index_table, self.index_columns)
+        self.profiles.append(profile)
+        return profile, columns, result_rows
+
+    def ranked(self):
+        return sorted(self.profiles, key=lambda p: (p['server_time_ms'], p['query_cost']), reverse=True)
+
+    def report(self):
+        lines = ["ROSSMANN STORE SALES - QUERY PROFILE REPORT", "=" * 80, "",
+                 "Queries ranked by server execution time (most expensive first)", ""]
+        for rank, p in enumerate(self.ranked(), 1):
+            examined = p.get('rows_examined')
+            lines.append(f"{rank}. {p['name']}")
+            lines.append(f"   Server time: {p['server_time_ms']:,.1f} ms   "
+                         f"Optimizer cost: {p['query_cost']:,.0f}")
+            lines.append(f"   Rows examined: {examined:,}   Rows returned: {p['rows_returned']:,}"
+                         if examined is not None else
+                         f"   Rows returned: {p['rows_returned']:,}")
+            used = ', '.join(p['indexes_used']) or 'none'
+            known = [i for i in p['indexes_used'] if i in KNOWN_INDEXES]
+            lines.append(f"   Indexes used: {used}" + (f" (existing: {', '.join(known)})" if known else ''))
+            problems = []
+            if p['full_scan_tables']:
+                problems.append(f"full scan of {', '.join(p['full_scan_tables'])}")
+            if p['using_temporary']:
+                problems.append('temporary table')
+            if p['using_filesort']:
+                problems.append('filesort')
+            lines.append(f"   Plan issues: {', '.join(problems) if problems else 'none'}")
+            for rec in p['recommendations']:
+                lines.append(f"   Suggested index: {rec};")
+            if p.get('explain_analyze'):
+                lines.append("   EXPLAIN ANALYZE:")
+                lines.extend('      ' + line for line in p['explain_analyze'].splitlines())
+            lines.append("")
+        return '\n'.join(lines)
+
+    def save(self, path=REPORT_FILE):
+        with open(path, 'w') as f:
+            f.write(self.report())
+        with open(path.rsplit('.', 1)[0] + '.json', 'w') as f:
+            json.dump([{k: v for k, v in p.items() if k != 'plan'} for p in self.ranked()], f, indent=2)
+        return path
@@ -0,0 +1,367 @@
+"""
+Query Service: Low-Latency HTTP API over In-Memory Aggregates
+==============================================================
+This module serves the script_04 analyses as JSON over HTTP without
+touching MySQL or re-rendering charts. At startup it loads the processed
+star-schema data into an OLAP cube (olap_cube.SalesCube) and a month ×
+store ranking engine (ranking_engine.RankingEngine); every request is
+answered from those in-memory aggregates.
+
+Endpoints (GET, JSON):
+  /health                 generation, load time, row count
+  /stats                  overall statistics
+  /store_type             by StoreType
+  /promo                  Promo vs no promo
+  /monthly                monthly trend
+  /day_of_week            by DayOfWeek
+  /competition            by CompetitionCategory (per row: 'No Competition'
+                          before the competitor opened, as in script_04)
+  /top_stores?k=10        top stores by total sales
+
+Filters (all endpoints): store_type=a,b  promo=0|1  start=YYYY-MM  end=YYYY-MM
+(month granularity, inclusive). top_stores supports store_type and the
+month range only.
+
+The service is a plain asyncio stream server (HTTP/1.1 with keep-alive).
+A background task polls the load generation - the modification time and
+size of the processed files and load_manifest.json - and refreshes the
+aggregates in a worker thread when it changes. When processed_fact_sales.csv
+only grew (a micro_batch.py append) and dim_store is unchanged, just the new
+rows are read and folded into copies of the cube and the rankings
+(SalesCube.add, RankingEngine.append); otherwise everything is rebuilt. The
+swap is a single reference assignment, so in-flight requests finish on the
+old generation.
+
+Usage:
+    python query_service.py [--host 127.0.0.1] [--port 8765]
+"""
+
+import io
+import os
+import copy
+import json
+import time
+import asyncio
+import argparse
+import itertools
+from urllib.parse import urlsplit, parse_qs
+import pandas as pd
+import numpy as np
+from olap_cube import SalesCube, DIMENSION_ORDER, MEASURES, join_store_attributes
+from ranking_engine import RankingEngine
+import warnings
+warnings.filterwarnings('ignore')
+
+HOST = os.environ.get('ROSSMANN_SERVICE_HOST', '127.0.0.1')
+PORT = int(os.environ.get('ROSSMANN_SERVICE_PORT', 8765))
+RELOAD_INTERVAL = 2.0       # seconds between load generation checks
+CACHE_SIZE = 1024           # cached responses per generation
+FACT_FILE = 'processed_fact_sales.csv'
+STORE_FILE = 'processed_dim_store.csv'
+GENERATION_FILES = [FACT_FILE, STORE_FILE, 'processed_dim_date.csv', 'load_manifest.json']
+PREFIX_CHECK_BYTES = 4096   # fact file bytes compared to tell an append from a rewrite
+
+ANALYSES = {
+    'stats': (),
+    'store_type': ('StoreType',),
+    'promo': ('Promo',),
+    'monthly': ('Year', 'Month'),
+    'day_of_week': ('DayOfWeek',),
+    'competition': ('CompetitionCategory',),
+}
+# Dimensions the endpoints filter or group by; the others are summed out at load
+SERVED_DIMENSIONS = ['StoreType', 'CompetitionCategory', 'Promo', 'Year', 'Month', 'DayOfWeek']
+
+
+class QueryError(ValueError):
+    """Bad request parameters (answered with HTTP 400)."""
+
+
+def load_generation(files=GENERATION_FILES):
+    """Token that changes whenever one of the watched files is rewritten."""
+    token = []
+    for path in files:
+        if os.path.exists(path):
+            stat = os.stat(path)
+            token.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(token)
+
+
+def _read_fact_bytes(start, stop):
+    with open(FACT_FILE, 'rb') as f:
+        f.seek(start)
+        return f.read(stop - start)
+
+
+def _complete_size():
+    """Size of the fact file up to its last complete line (an append may be in flight)."""
+    size = os.path.getsize(FACT_FILE)
+    tail = _read_fact_bytes(max(size - 65536, 0), size)
+    return size - len(tail) + tail.rfind(b'\n') + 1
+
+
+class Aggregates:
+    """One immutable generation of in-memory aggregates."""
+
+    def __init__(self, generation, previous=None):
+        start = time.perf_counter()
+        self.fact_size = _complete_size()
+        self.store_token = load_generation([STORE_FILE])
+        store_df = pd.read_csv(STORE_FILE)
+        if previous is not None and previous._extends_to(self):
+            # Append-only change: fold the new rows into copies of the rollups
+            new_rows = pd.read_csv(io.BytesIO(_read_fact_bytes(previous.fact_size, self.fact_size)),
+                                   names=previous.fact_columns, header=None, low_memory=False)
+            fact_df = join_store_attributes(new_rows, store_df)
+            self.cube = copy.deepcopy(previous.cube)
+            self.cube.add(fact_df.assign(**{d: 'All' for d in DIMENSION_ORDER if d not in SERVED_DIMENSIONS}))
+            self.ranking = copy.deepcopy(previous.ranking).append(fact_df)
+            self.rows = previous.rows + len(fact_df)
+            self.fact_columns = previous.fact_columns
+            self.incremental = True
+        else:
+            fact_df = join_store_attributes(
+                pd.read_csv(io.BytesIO(_read_fact_bytes(0, self.fact_size)), low_memory=False), store_df)
+            self.cube = self._serving_cube(SalesCube.from_frame(fact_df))
+            self.ranking = RankingEngine.from_frame(fact_df, store_df)
+            self.rows = len(fact_df)
+            self.fact_columns = list(pd.read_csv(FACT_FILE, nrows=0).columns)
+            self.incremental = False
+        self.prefix_check = _read_fact_bytes(max(self.fact_size - PREFIX_CHECK_BYTES, 0), self.fact_size)
+        self.generation = generation
+        self.loaded_at = pd.Timestamp.now().isoformat(timespec='seconds')
+        self.load_seconds = time.perf_counter() - start
+        self.cache = {}
+
+    def _extends_to(self, fresh):
+        """True when the fact file only grew since this generation and dim_store is unchanged."""
+        return (fresh.store_token == self.store_token and fresh.fact_size >= self.fact_size
+                and _read_fact_bytes(max(self.fact_size - PREFIX_CHECK_BYTES, 0), self.fact_size)
+                == self.prefix_check)
+
+    @staticmethod
+    def _serving_cube(cube):
+        """Same cube with unserved dimensions collapsed to one 'All' coordinate."""
+        drop = tuple(i for i, d in enumerate(DIMENSION_ORDER) if d not in SERVED_DIMENSIONS)
+        dimensions = {d: (list(cube.dimensions[d]) if d in SERVED_DIMENSIONS else ['All'])
+                      for d in DIMENSION_ORDER}
+        return SalesCube(dimensions, cube.data.sum(axis=drop, keepdims=True))
+
+    # FILTERS
+
+    @staticmethod
+    def _month(value, name):
+        try:
+            ts = pd.Timestamp(value)
+        except (ValueError, TypeError):
+            raise QueryError(f"'{name}' must be YYYY-MM or YYYY-MM-DD")
+        return ts.year, ts.month
+
+    def _filtered_cube(self, params):
+        filters = {}
+        if 'store_type' in params:
+            filters['StoreType'] = params['store_type'].split(',')
+        if 'promo' in params:
+            if params['promo'] not in ('0', '1'):
+                raise QueryError("'promo' must be 0 or 1")
+            filters['Promo'] = int(params['promo'])
+        cube = self.cube.slice(**filters) if filters else self.cube
+        if 'start' in params or 'end' in params:
+            years = np.array(cube.dimensions['Year'])[:, None]
+            months = np.arange(1, 13)[None, :]
+            key = years * 12 + months
+            lo = self._month(params['start'], 'start') if 'start' in params else (0, 1)
+            hi = self._month(params['end'], 'end') if 'end' in params else (9999, 12)
+            mask = (key >= lo[0] * 12 + lo[1]) & (key <= hi[0] * 12 + hi[1])
+            shape = [1] * cube.data.ndim
+            year_axis = DIMENSION_ORDER.index('Year')
+            shape[year_axis], shape[year_axis + 1] = mask.shape
+            cube = SalesCube(cube.dimensions, cube.data * mask.reshape(shape))
+        return cube
+
+    # ANSWERS
+
+    def analysis(self, name, params):
+        """
+        JSON records of one script_04 roll-up: the same columns as
+        SalesCube.rollup(), derived with NumPy instead of a DataFrame so a
+        cache miss costs well under a millisecond.
+        """
+        by = ANALYSES[name]
+        cube = self._filtered_cube(params)
+        totals = cube.totals(*by).reshape(-1, len(MEASURES))
+        m = {measure: totals[:, i] for i, measure in enumerate(MEASURES)}
+        count = m['Count']
+        keep = np.flatnonzero(count > 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            variance = (m['SalesSq'] - m['Sales'] ** 2 / count) / (count - 1)
+            columns = {
+                'Customers': m['Customers'],
+                'Count': count.astype(np.int64),
+                'TotalSales': m['Sales'],
+                'AvgSales': m['Sales'] / count,
+                'AvgCustomers': m['Customers'] / count,
+                'AvgBasketSize': m['SalesPerCustomer'] / count,
+                'StdSales': np.sqrt(np.clip(variance, 0, None)),
+            }
+        if name == 'store_type':
+            keep = keep[np.argsort(-m['Sales'][keep], kind='stable')]
+        labels = list(itertools.product(*(cube.dimensions[b] for b in by)))
+        records = []
+        for i in keep:
+            record = dict(zip(by, labels[i]))
+            for column, values in columns.items():
+                value = values[i].item()
+                record[column] = None if value != value else value    # NaN -> null
+            records.append(record)
+        return records
+
+    def top_stores(self, params):
+        if 'promo' in params:
+            raise QueryError("top_stores does not support the 'promo' filter")
+        try:
+            k = int(params.get('k', 10))
+        except ValueError:
+            raise QueryError("'k' must be an integer")
+        if not 1 <= k <= 1000:
+            raise QueryError("'k' must be between 1 and 1000")
+        start = self._month(params['start'], 'start') if 'start' in params else None
+        end = self._month(params['end'], 'end') if 'end' in params else None
+        if 'store_type' not in params:
+            return self.ranking.top_k(k, start=start, end=end)
+        # Rank within each requested type, then merge to one top k
+        ranked = self.ranking.top_k(k, start=start, end=end, by='StoreType')
+        ranked = ranked[ranked['StoreType'].isin(params['store_type'].split(','))]
+        ranked = ranked.sort_values(['Sales', 'StoreID'], ascending=[False, True]).head(k)
+        return ranked.assign(Rank=np.arange(1, len(ranked) + 1))
+
+    def answer(self, path, params):
+        """(status, payload) for one request; results are cached per generation."""
+        key = (path, tuple(sorted(params.items())))
+        if key in self.cache:
+            return self.cache[key]
+        endpoint = path.strip('/')
+        if endpoint == 'health':
+            return 200, {'generation': self.loaded_at, 'rows': self.rows,
+                         'load_seconds': round(self.load_seconds, 3)}
+        try:
+            if endpoint in ANALYSES:
+                records = self.analysis(endpoint, params)
+            elif endpoint == 'top_stores':
+                records = self.top_stores(params).to_dict(orient='records')
+            else:
+                return 404, {'error': f"Unknown endpoint '{path}'",
+                             'endpoints': ['/health'] + [f'/{a}' for a in ANALYSES] + ['/top_stores']}
+        except QueryError as e:
+            return 400, {'error': str(e)}
+        response = 200, {'generation': self.loaded_at, 'rows': len(records), 'data': records}
+        if len(self.cache) >= CACHE_SIZE:
+            self.cache.clear()
+        self.cache[key] = response
+        return response
+
+
+# HTTP SERVER
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class QueryService:
+    """asyncio HTTP/1.1 server answering from the current Aggregates generation."""
+
+    def __init__(self, host=HOST, port=PORT, reload_interval=RELOAD_INTERVAL):
+        self.host = host
+        self.port = port
+        self.reload_interval = reload_interval
+        self.aggregates = None
+        self.reloads = 0
+
+    async def _reload_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            generation = load_generation()
+            if generation != self.aggregates.generation:
+                try:
+                    fresh = await loop.run_in_executor(None, Aggregates, generation, self.aggregates)
+                except Exception as e:          # keep serving the old generation
+                    print(f"✗ Reload failed: {e}")
+                    continue
+                self.aggregates = fresh
+                self.reloads += 1
+                how = 'appended rows folded in' if fresh.incremental else 'rebuilt'
+                print(f"✓ Reloaded generation {fresh.loaded_at} "
+                      f"({fresh.rows:,} rows, {how} in {fresh.load_seconds:.2f}s)")
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                if method != 'GET':
+                    status, payload = 405, {'error': 'Only GET is supported'}
+                else:
+                    url = urlsplit(target)
+                    params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                    try:
+                        status, payload = self.aggregates.answer(url.path, params)
+                    except Exception as e:
+                        status, payload = 500, {'error': str(e)}
+                body = json.dumps(payload).encode()
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == 'HTTP/1.1')
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self.aggregates = Aggregates(load_generation())
+        print(f"✓ Loaded {self.aggregates.rows:,} fact rows into memory "
+              f"in {self.aggregates.load_seconds:.2f}s")
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        print(f"✓ Listening on http://{self.host}:{self.port}/ "
+              f"(checking for new load generations every {self.reload_interval:g}s)")
+        reloader = asyncio.ensure_future(self._reload_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reloader.cancel()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the script_04 analyses over HTTP')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL)
+    args = parser.parse_args()
+
+    print("="*80)
+    print("ROSSMANN STORE SALES - ANALYTICS QUERY SERVICE")
+    print("="*80)
+    try:
+        asyncio.run(QueryService(args.host, args.port, args.reload_interval).serve())
+    except KeyboardInterrupt:
+        print("\n✓ Service stopped")
@@ -0,0 +1,238 @@
+"""
+Ranking Engine: Incremental Top-k Stores per Period and Dimension
+==================================================================
+This module answers top / bottom-k store rankings on demand - per month,
+per StoreType or any other dim_store attribute, over any month range -
+without re-running a GROUP BY over the fact table. It keeps running totals
+as compact (months × stores) arrays of Sales, Customers and open days,
+indexed directly by StoreID:
+
+  • append()   adds new fact rows with np.add.at; history is never re-read
+  • top_k()    sums the requested months and ranks with np.argpartition
+               (O(stores) per group, only the k winners are sorted)
+  • top_k_per_period()  ranks every month at once along the store axis
+  • merge_top_k()  merges bounded per-partition top-k lists with a heap, for
+               engines that each hold a disjoint set of stores (e.g. shards)
+"""
+
+import time
+import heapq
+import itertools
+import pandas as pd
+import numpy as np
+from olap_cube import load_fact_frame
+import warnings
+warnings.filterwarnings('ignore')
+
+MEASURES = ['Sales', 'Customers']
+RANK_DIMENSIONS = ['StoreType', 'Assortment', 'CompetitionCategory', 'Segment']
+TOP_K = 10
+
+
+def _month_key(year, month):
+    return np.asarray(year, dtype=np.int64) * 12 + np.asarray(month, dtype=np.int64) - 1
+
+
+class RankingEngine:
+    """Running per-(month, store) totals with argpartition top-k queries."""
+
+    def __init__(self, store_df=None, dimensions=RANK_DIMENSIONS):
+        self.first_month = None
+        self.n_months = self.n_ids = 0
+        self.totals = {m: np.zeros((0, 0)) for m in MEASURES + ['Days']}
+        self.attributes = {}
+        if store_df is not None:
+            store_df = store_df.set_index('StoreID')
+            self.attributes = {d: store_df[d] for d in dimensions if d in store_df.columns}
+
+    @classmethod
+    def from_frame(cls, fact_df, store_df=None, dimensions=RANK_DIMENSIONS):
+        return cls(store_df, dimensions).append(fact_df)
+
+    # INCREMENTAL UPDATES
+
+    def _grow(self, n_months, n_ids):
+        """Enlarge the total arrays (capacity doubles so appends stay amortized O(rows))."""
+        rows, cols = self.totals['Days'].shape
+        if n_months <= rows and n_ids <= cols:
+            return
+        new_rows = max(n_months, rows * 2 if n_months > rows else rows)
+        new_cols = max(n_ids, cols * 2 if n_ids > cols else cols)
+        for measure, array in self.totals.items():
+            grown = np.zeros((new_rows, new_cols))
+            grown[:rows, :cols] = array
+            self.totals[measure] = grown
+
+    def append(self, fact_df):
+        """Add fact rows (any dates, e.g. one new day) to the running totals."""
+        fact_df = fact_df.dropna(subset=['StoreID', 'Year', 'Month', 'Sales'])
+        if fact_df.empty:
+            return self
+        month = _month_key(fact_df['Year'].to_numpy(), fact_df['Month'].to_numpy())
+        store = fact_df['StoreID'].to_numpy(dtype=np.int64)
+        if self.first_month is None:
+            self.first_month = int(month.min())
+        if month.min() < self.first_month:
+            shift = self.first_month - int(month.min())
+            for measure, array in self.totals.items():
+                self.totals[measure] = np.vstack([np.zeros((shift, array.shape[1])), array])
+            self.first_month -= shift
+            self.n_months += shift
+        row = month - self.first_month
+        self._grow(int(row.max()) + 1, int(store.max()) + 1)
+        self.n_months = max(self.n_months, int(row.max()) + 1)
+        self.n_ids = max(self.n_ids, int(store.max()) + 1)
+
+        np.add.at(self.totals['Days'], (row, store), 1)
+        for measure in MEASURES:
+            np.add.at(self.totals[measure], (row, store),
+                      fact_df[measure].fillna(0).to_numpy(dtype=np.float64))
+        return self
+
+    # QUERIES
+
+    @property
+    def months(self):
+        """(Year, Month) of every tracked month row."""
+        keys = self.first_month + np.arange(self.n_months)
+        return list(zip(keys // 12, keys % 12 + 1))
+
+    def _rows(self, start=None, end=None):
+        """Month rows for an inclusive (year, month) range."""
+        lo = 0 if start is None else int(_month_key(*start)) - self.first_month
+        hi = self.n_months - 1 if end is None else int(_month_key(*end)) - self.first_month
+        return slice(max(lo, 0), min(hi, self.n_months - 1) + 1)
+
+    def _values(self, measure, rows):
+        """Per-store measure over the month rows; NaN for stores without open days."""
+        days = self.totals['Days'][rows, :self.n_ids].sum(axis=0)
+        if measure == 'AvgDailySales':
+            total = self.totals['Sales'][rows, :self.n_ids].sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = total / days
+        else:
+            values = self.totals[measure][rows, :self.n_ids].sum(axis=0)
+        return np.where(days > 0, values, np.nan)
+
+    def _groups(self, by):
+        """(label, store id array) per group of the dimension `by` (one group if None)."""
+        if by is None:
+            return [('All', np.arange(self.n_ids))]
+        attribute = self.attributes[by].reindex(np.arange(self.n_ids))
+        return [(label, ids.to_numpy()) for label, ids in
+                attribute.dropna().index.to_series().groupby(attribute.dropna()).groups.items()]
+
+    @staticmethod
+    def _select(values, ids, k, bottom):
+        """Top (or bottom) k of values[ids] via argpartition; returns sorted store ids."""
+        candidates = ids[~np.isnan(values[ids])]
+        scores = values[candidates] if bottom else -values[candidates]
+        if len(candidates) > k:
+            part = np.argpartition(scores, k - 1)[:k]
+            candidates, scores = candidates[part], scores[part]
+        order = np.lexsort((candidates, scores))
+        return candidates[order]
+
+    def top_k(self, k=TOP_K, measure='Sales', start=None, end=None, by=None, bottom=False):
+        """Top / bottom-k stores by a measure over a month range, per group of `by`."""
+        values = self._values(measure, self._rows(start, end))
+        frames = []
+        for label, ids in self._groups(by):
+            winners = self._select(values, ids, k, bottom)
+            frames.append(pd.DataFrame({'Group': label, 'Rank': np.arange(1, len(winners) + 1),
+                                        'StoreID': winners, measure: values[winners]}))
+        result = pd.concat(frames, ignore_index=True)
+        return result.rename(columns={'Group': by}) if by else result.drop(columns='Group')
+
+    def top_k_per_period(self, k=TOP_K, measure='Sales', bottom=False):
+        """Top / bottom-k stores of every month at once (argpartition along the store axis)."""
+        days = self.totals['Days'][:self.n_months, :self.n_ids]
+        if measure == 'AvgDailySales':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = self.totals['Sales'][:self.n_months, :self.n_ids] / days
+        else:
+            values = self.totals[measure][:self.n_months, :self.n_ids].copy()
+        values[days == 0] = np.nan
+        scores = np.where(np.isnan(values), np.inf, values if bottom else -values)
+        k = min(k, self.n_ids)
+        part = np.argpartition(scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(scores, part, axis=1), axis=1, kind='stable')
+        winners = np.take_along_axis(part, order, axis=1)
+        top_values = np.take_along_axis(values, winners, axis=1)
+        months = self.months
+        result = pd.DataFrame({
+            'Year': np.repeat([y for y, _ in months], k),
+            'Month': np.repeat([m for _, m in months], k),
+            'Rank': np.tile(np.arange(1, k + 1), len(months)),
+            'StoreID': winners.ravel(),
+            measure: top_values.ravel(),
+        })
+        return result.dropna(subset=[measure]).reset_index(drop=True)
+
+    def top_k_items(self, k=TOP_K, measure='Sales', start=None, end=None, bottom=False):
+        """(value, StoreID) pairs of this engine's top-k, for merge_top_k()."""
+        values = self._values(measure, self._rows(start, end))
+        winners = self._select(values, np.arange(self.n_ids), k, bottom)
+        return [(float(values[s]), int(s)) for s in winners]
+
+
+def merge_top_k(partials, k=TOP_K, bottom=False):
+    """
+    Merge bounded top-k lists of engines over disjoint store sets: a store's
+    global rank can only come from its own partition's top k.
+    """
+    items = itertools.chain.from_iterable(partials)
+    if bottom:
+        return heapq.nsmallest(k, items, key=lambda item: (item[0], item[1]))
+    return heapq.nlargest(k, items, key=lambda item: (item[0], -item[1]))
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - TOP-K RANKING ENGINE")
+    print("="*80)
+
+    print("\n[1/4] Building running totals...")
+    fact_df = load_fact_frame(store_columns=[])
+    store_df = pd.read_csv('processed_dim_store.csv')
+    dates = np.sort(fact_df['Date'].unique())
+    start = time.perf_counter()
+    engine = RankingEngine.from_frame(fact_df[fact_df['Date'] < dates[-7]], store_df)
+    print(f"✓ {engine.n_months} months × {engine.n_ids:,} store slots in {time.perf_counter() - start:.2f}s")
+
+    print("\n[2/4] Appending the last 7 days one day at a time...")
+    new_days = [fact_df[fact_df['Date'] == day] for day in dates[-7:]]
+    start = time.perf_counter()
+    for day_df in new_days:
+        engine.append(day_df)
+    print(f"✓ 7 daily appends in {time.perf_counter() - start:.3f}s")
+    # Earlier months appended after later ones shift the month rows back
+    reordered = RankingEngine(store_df).append(new_days[-1]).append(fact_df[fact_df['Date'] < dates[-1]])
+    same = reordered.months == engine.months and reordered.top_k().equals(engine.top_k())
+    print(f"✓ Out-of-order appends give the same months and rankings: {same}")
+
+    print("\n[3/4] Rankings on demand...")
+    start = time.perf_counter()
+    overall = engine.top_k()
+    reference = fact_df.groupby('StoreID')['Sales'].sum().sort_values(ascending=False, kind='mergesort').head(TOP_K)
+    print(f"✓ All-time top {TOP_K} in {(time.perf_counter() - start) * 1000:.1f}ms "
+          f"(matches groupby: {list(overall['StoreID']) == list(reference.index)})")
+    last_year, last_month = engine.months[-1]
+    by_type = engine.top_k(3, start=(last_year, last_month), end=(last_year, last_month), by='StoreType')
+    print(f"\n   Top 3 stores per StoreType in {last_year}-{last_month:02d}:")
+    print(by_type.to_string(index=False))
+    bottom = engine.top_k(3, measure='AvgDailySales', by='Assortment', bottom=True)
+    print("\n   Bottom 3 stores by average daily sales per Assortment:")
+    print(bottom.to_string(index=False))
+    start = time.perf_counter()
+    monthly = engine.top_k_per_period(TOP_K)
+    print(f"\n✓ Top {TOP_K} of all {engine.n_months} months ({len(monthly):,} rows) "
+          f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    print("\n[4/4] Merging per-partition top-k lists (4 disjoint store partitions)...")
+    partitions = np.array_split(np.sort(fact_df['StoreID'].unique()), 4)
+    partials = [RankingEngine.from_frame(fact_df[fact_df['StoreID'].isin(p)]).top_k_items()
+                for p in partitions]
+    merged = merge_top_k(partials)
+    print(f"✓ Merged top {TOP_K} matches the single engine: "
+          f"{[s for _, s in merged] == list(overall['StoreID'])}")
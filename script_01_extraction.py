@@ -3,13 +3,32 @@ Script 1: Data Extraction and Exploration
 ==========================================
 This script loads the Rossmann dataset and performs initial data exploration
 to understand the structure, identify data quality issues, and prepare for preprocessing.
+
+train.csv is profiled in a single streaming pass (streaming_profiler.py), so
+memory stays flat regardless of file size; quartiles come from mergeable
+sketches and are approximate, while the number of unique stores is exact up
+to streaming_profiler.MAX_EXACT_DISTINCT (100,000) distinct ids.
 """
 
+import os
 import pandas as pd
 import numpy as np
 import warnings
+from perf_metrics import PipelineMetrics
+from streaming_profiler import profile_csv
 warnings.filterwarnings('ignore')
 
+# Worker processes used to profile train.csv (byte ranges merged afterwards)
+PROFILE_WORKERS = int(os.environ.get('ROSSMANN_PROFILE_WORKERS', '1'))
+
+# Row conditions counted during the profiling pass
+TRAIN_CONDITIONS = {
+    'closed': {'Open': 0},
+    'zero_sales_open': {'Open': 1, 'Sales': 0},
+}
+
+metrics = PipelineMetrics('script_01_extraction')
+
 # 1. DATA EXTRACTION
 
 print("="*80)
@@ -19,10 +38,13 @@ print("\n")
 
 # Load the datasets
 print("[1/6] Loading datasets...")
+metrics.stage('[1/6] Loading datasets')
 try:
-    train_df = pd.read_csv('train.csv')
+    train_profile = profile_csv('train.csv', conditions=TRAIN_CONDITIONS, workers=PROFILE_WORKERS)
+    train_head = pd.read_csv('train.csv', nrows=5)
     store_df = pd.read_csv('store.csv')
     print("✓ Datasets loaded successfully!")
+    metrics.rows(rows_out=train_profile.rows)
 except FileNotFoundError as e:
     print(f"✗ Error: {e}")
     print("Please ensure train.csv and store.csv are in the same directory as this script.")
@@ -35,12 +57,13 @@ print("\n")
 # ============================================================================
 
 print("[2/6] Dataset Overview")
+metrics.stage('[2/6] Dataset Overview', rows_in=train_profile.rows)
 print("-" * 80)
-print(f"\nTRAIN Dataset Shape: {train_df.shape[0]:,} rows × {train_df.shape[1]} columns")
+print(f"\nTRAIN Dataset Shape: {train_profile.shape[0]:,} rows × {train_profile.shape[1]} columns")
 print(f"STORE Dataset Shape: {store_df.shape[0]:,} rows × {store_df.shape[1]} columns")
 
 print("\n--- TRAIN Dataset Columns ---")
-print(train_df.dtypes)
+print(train_profile.dtypes())
 
 print("\n--- STORE Dataset Columns ---")
 print(store_df.dtypes)
@@ -50,9 +73,10 @@ print("\n")
 # 3. DATA PREVIEW
 
 print("[3/6] Data Preview")
+metrics.stage('[3/6] Data Preview', rows_in=train_profile.rows)
 print("-" * 80)
 print("\n--- First 5 rows of TRAIN data ---")
-print(train_df.head())
+print(train_head)
 
 print("\n--- First 5 rows of STORE data ---")
 print(store_df.head())
@@ -62,11 +86,12 @@ print("\n")
 # 4. DATA QUALITY ASSESSMENT
 
 print("[4/6] Data Quality Assessment")
+metrics.stage('[4/6] Data Quality Assessment', rows_in=train_profile.rows)
 print("-" * 80)
 
 print("\n--- Missing Values in TRAIN dataset ---")
-train_missing = train_df.isnull().sum()
-train_missing_pct = (train_df.isnull().sum() / len(train_df)) * 100
+train_missing = train_profile.null_counts()
+train_missing_pct = (train_missing / train_profile.rows) * 100
 train_quality = pd.DataFrame({
     'Missing_Count': train_missing,
     'Missing_Percentage': train_missing_pct
@@ -83,7 +108,7 @@ store_quality = pd.DataFrame({
 print(store_quality[store_quality['Missing_Count'] > 0])
 
 print("\n--- Duplicates Check ---")
-print(f"Duplicate rows in TRAIN: {train_df.duplicated().sum()}")
+print(f"Duplicate rows in TRAIN: {train_profile.duplicate_rows()}")
 print(f"Duplicate rows in STORE: {store_df.duplicated().sum()}")
 
 print("\n")
@@ -91,10 +116,11 @@ print("\n")
 # 5. DESCRIPTIVE STATISTICS
 
 print("[5/6] Descriptive Statistics")
+metrics.stage('[5/6] Descriptive Statistics', rows_in=train_profile.rows)
 print("-" * 80)
 
 print("\n--- TRAIN Dataset - Numerical Summary ---")
-print(train_df.describe())
+print(train_profile.describe())
 
 print("\n--- STORE Dataset - Numerical Summary ---")
 print(store_df.describe())
@@ -102,9 +128,9 @@ print(store_df.describe())
 print("\n--- Categorical Variables Distribution (TRAIN) ---")
 categorical_cols_train = ['DayOfWeek', 'Open', 'Promo', 'StateHoliday', 'SchoolHoliday']
 for col in categorical_cols_train:
-    if col in train_df.columns:
+    if col in train_profile.columns:
         print(f"\n{col}:")
-        print(train_df[col].value_counts())
+        print(train_profile.value_counts(col))
 
 print("\n--- Categorical Variables Distribution (STORE) ---")
 categorical_cols_store = ['StoreType', 'Assortment', 'Promo2']
@@ -118,19 +144,20 @@ print("\n")
 # 6. KEY FINDINGS & DATA ISSUES IDENTIFIED
 
 print("[6/6] Key Findings & Data Quality Issues")
+metrics.stage('[6/6] Key Findings & Data Quality Issues', rows_in=train_profile.rows)
 print("-" * 80)
 
 print("\n DATASET SUMMARY:")
-print(f"   • Total training records: {len(train_df):,}")
-print(f"   • Number of unique stores: {train_df['Store'].nunique():,}")
+print(f"   • Total training records: {train_profile.rows:,}")
+print(f"   • Number of unique stores: {train_profile.nunique('Store'):,}")
 print(f"   • Date range: Unable to determine (contains invalid dates)")
 print(f"   • Total stores in metadata: {len(store_df):,}")
 
 print("\n  DATA QUALITY ISSUES IDENTIFIED:")
 
 # Issue 1: Closed stores
-closed_stores = train_df[train_df['Open'] == 0]
-print(f"   1. Closed store records: {len(closed_stores):,} ({len(closed_stores)/len(train_df)*100:.2f}%)")
+closed_stores = train_profile.condition_counts['closed']
+print(f"   1. Closed store records: {closed_stores:,} ({closed_stores/train_profile.rows*100:.2f}%)")
 print(f"      → These records have Sales=0 and need to be removed for analysis")
 
 # Issue 2: Missing competition data
@@ -146,14 +173,14 @@ for col, missing in promo2_missing.items():
         print(f"      → {col}: {missing} missing values")
 
 # Issue 4: Zero sales on open days
-zero_sales_open = train_df[(train_df['Open'] == 1) & (train_df['Sales'] == 0)]
-print(f"\n   4. Zero sales on open days: {len(zero_sales_open):,} records")
+zero_sales_open = train_profile.condition_counts['zero_sales_open']
+print(f"\n   4. Zero sales on open days: {zero_sales_open:,} records")
 print(f"      → Potential data quality issue or special circumstances")
 
 # Issue 5: Date format and null dates
-date_nulls = train_df['Date'].isnull().sum()
+date_nulls = train_profile.null_counts()['Date']
 print(f"\n   5. Date column issues:")
-print(f"      → Data type: {train_df['Date'].dtype}")
+print(f"      → Data type: {train_profile.dtypes()['Date']}")
 print(f"      → Null/Invalid dates: {date_nulls}")
 print(f"      → Needs conversion to datetime format")
 
@@ -173,6 +200,7 @@ print("\n")
 
 # Save summary report
 print(" Saving exploration summary to 'data_exploration_report.txt'...")
+metrics.stage('Saving exploration report')
 
 # Get date range safely
 date_range_str = f"{'N/A'}"
@@ -180,14 +208,16 @@ date_range_str = f"{'N/A'}"
 with open('data_exploration_report.txt', 'w') as f:
     f.write("ROSSMANN STORE SALES - DATA EXPLORATION REPORT\n")
     f.write("="*80 + "\n\n")
-    f.write(f"Train Dataset: {train_df.shape[0]:,} rows × {train_df.shape[1]} columns\n")
+    f.write(f"Train Dataset: {train_profile.shape[0]:,} rows × {train_profile.shape[1]} columns\n")
     f.write(f"Store Dataset: {store_df.shape[0]:,} rows × {store_df.shape[1]} columns\n")
     f.write(f"\nDate Range: {date_range_str}\n")
-    f.write(f"Unique Stores: {train_df['Store'].nunique():,}\n")
+    f.write(f"Unique Stores: {train_profile.nunique('Store'):,}\n")
     f.write(f"\nMissing Values Summary:\n")
     f.write(store_quality[store_quality['Missing_Count'] > 0].to_string())
-    f.write(f"\n\nClosed Store Records: {len(closed_stores):,}\n")
-    f.write(f"Zero Sales on Open Days: {len(zero_sales_open):,}\n")
+    f.write(f"\n\nClosed Store Records: {closed_stores:,}\n")
+    f.write(f"Zero Sales on Open Days: {zero_sales_open:,}\n")
 
 print("✓ Report saved successfully!")
+
+metrics.finish()
 print("\nNext Step: Run '02_data_preprocessing.py' to clean and transform the data.")
\ No newline at end of file
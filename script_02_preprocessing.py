@@ -9,8 +9,15 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import warnings
+from perf_metrics import PipelineMetrics
+from data_validation import validate_csv, train_rules, store_rules, REPORT_FILE
+from store_segmentation import add_segments, N_SEGMENTS
+from anomaly_detection import AnomalyDetector, ANOMALY_FILE
+from preprocessing_rules import add_activity_flags, date_dimension, add_holiday_distances
 warnings.filterwarnings('ignore')
 
+metrics = PipelineMetrics('script_02_preprocessing')
+
 print("="*80)
 print("ROSSMANN STORE SALES - DATA PREPROCESSING")
 print("="*80)
@@ -19,20 +26,44 @@ print("\n")
 # 1. LOAD RAW DATA
 
 print("[1/7] Loading raw datasets...")
+metrics.stage('[1/7] Loading raw datasets')
 train_df = pd.read_csv('train.csv')
 store_df = pd.read_csv('store.csv')
 print(f"✓ Loaded {len(train_df):,} training records")
 print(f"✓ Loaded {len(store_df):,} store records")
+metrics.rows(rows_out=len(train_df))
+
+# Validate the raw inputs before any cleaning (schema, ranges, categories,
+# (Store, Date) uniqueness, Store coverage against store.csv); the files are
+# streamed in chunks of raw values, as by data_validation.py on its own
+print("   → Validating raw datasets...")
+store_report = validate_csv('store.csv', store_rules())
+train_report = validate_csv('train.csv', train_rules(store_df['Store']))
+with open(REPORT_FILE, 'w') as f:
+    f.write(store_report.to_text() + "\n\n" + train_report.to_text() + "\n")
+for report in (store_report, train_report):
+    status = "✓ passed" if report.passed else "⚠ has rule violations"
+    print(f"      {report.source}: {status} (see {REPORT_FILE})")
 print("\n")
 
 # 2. DATA CLEANING - TRAIN DATASET
 
 print("[2/7] Cleaning TRAIN dataset...")
+metrics.stage('[2/7] Cleaning TRAIN dataset', rows_in=len(train_df))
 
 # Convert Date to datetime
 print("   → Converting Date column to datetime...")
 train_df['Date'] = pd.to_datetime(train_df['Date'], errors='coerce')
 
+# Remove duplicate (Store, Date) records (keep the first). Validation counts
+# duplicates of the raw strings; the rows removed are duplicates of the parsed
+# dates, so the count reported is the one actually dropped
+print(f"   → Removing duplicate (Store, Date) records...")
+before = len(train_df)
+train_df = train_df[~(train_df.duplicated(subset=['Store', 'Date']) & train_df['Date'].notna())].copy()
+print(f"      Removed {before - len(train_df):,} duplicate records "
+      f"(validation flagged {train_report.count('unique: (Store, Date)'):,})")
+
 # Remove records with null dates
 print(f"   → Removing records with null/invalid dates...")
 null_dates = train_df['Date'].isnull().sum()
@@ -41,6 +72,10 @@ if null_dates > 0:
     train_df = train_df[train_df['Date'].notna()].copy()
     print(f"      Removed {null_dates:,} records with null dates")
 
+# Holiday flags of every dated record (most holidays are closed days) are
+# kept before closed stores are removed for the dim_date holiday shares in step 5
+holiday_rows = train_df[['Date', 'StateHoliday', 'SchoolHoliday']].copy()
+
 # Remove closed stores (Open = 0)
 print(f"   → Removing closed store records...")
 original_count = len(train_df)
@@ -56,11 +91,13 @@ removed = original_count - len(train_df)
 print(f"      Removed {removed:,} zero-sales records ({removed/original_count*100:.2f}%)")
 
 print(f"✓ Cleaned TRAIN dataset: {len(train_df):,} records remaining")
+metrics.rows(rows_out=len(train_df))
 print("\n")
 
 # 3. DATA CLEANING - STORE DATASET
 
 print("[3/7] Cleaning STORE dataset...")
+metrics.stage('[3/7] Cleaning STORE dataset', rows_in=len(store_df))
 
 # Handle missing CompetitionDistance
 print("   → Handling missing CompetitionDistance...")
@@ -89,6 +126,7 @@ print("\n")
 # 4. CREATE DERIVED COLUMNS
 
 print("[4/7] Creating derived columns...")
+metrics.stage('[4/7] Creating derived columns', rows_in=len(train_df))
 
 # Train dataset derived columns
 print("   → Adding derived columns to TRAIN data...")
@@ -142,12 +180,20 @@ store_df['HasCompetition'] = (store_df['CompetitionDistance'] > 0).astype(int)
 
 print("      Added: CompetitionCategory, HasCompetition")
 
+# Per-day competition and Promo2 activity: store-level arrays indexed by
+# StoreID are broadcast against the date arrays of the train rows
+print("   → Adding competition / Promo2 activity flags to TRAIN data...")
+add_activity_flags(train_df, store_df)
+
+print("      Added: CompetitionActive, MonthsSinceCompetitionOpen, Promo2Active, IsPromo2Month")
+
 print("✓ Derived columns created")
 print("\n")
 
 # 5. CREATE DATE DIMENSION TABLE
 
 print("[5/7] Creating Date Dimension table...")
+metrics.stage('[5/7] Creating Date Dimension table')
 
 # Get min and max dates from training data
 min_date = train_df['Date'].min()
@@ -156,34 +202,22 @@ max_date = train_df['Date'].max()
 # Create date range
 date_range = pd.date_range(start=min_date, end=max_date, freq='D')
 
-# Build date dimension
-date_dim = pd.DataFrame({
-    'DateID': range(1, len(date_range) + 1),
-    'Date': date_range,
-    'Year': date_range.year,
-    'Month': date_range.month,
-    'Day': date_range.day,
-    'Quarter': date_range.quarter,
-    'WeekOfYear': date_range.isocalendar().week,
-    'DayOfWeek': date_range.dayofweek + 1,  # 1=Monday, 7=Sunday
-    'DayName': date_range.strftime('%A'),
-    'MonthName': date_range.strftime('%B'),
-    'IsWeekend': (date_range.dayofweek >= 5).astype(int),
-    'IsMonthStart': date_range.is_month_start.astype(int),
-    'IsMonthEnd': date_range.is_month_end.astype(int),
-    'IsQuarterStart': date_range.is_quarter_start.astype(int),
-    'IsQuarterEnd': date_range.is_quarter_end.astype(int),
-    'IsYearStart': date_range.is_year_start.astype(int),
-    'IsYearEnd': date_range.is_year_end.astype(int)
-})
+# Build date dimension: calendar and holiday attributes (see
+# preprocessing_rules.date_dimension), then distances to the nearest holidays
+print("   → Adding holiday attributes to Date Dimension...")
+date_dim = add_holiday_distances(date_dimension(date_range, holiday_rows))
+print("      Added: StateHolidayShare, SchoolHolidayShare, NextStateHoliday")
+print("      Added: DaysTo/DaysSince StateHoliday and SchoolHoliday")
 
 print(f"✓ Created Date Dimension with {len(date_dim):,} records")
+metrics.rows(rows_out=len(date_dim))
 print(f"   Date range: {min_date.date()} to {max_date.date()}")
 print("\n")
 
 # 6. MERGE DATASETS AND CREATE FACT TABLE
 
 print("[6/7] Creating Fact and Dimension tables...")
+metrics.stage('[6/7] Creating Fact and Dimension tables', rows_in=len(train_df))
 
 # Merge train and store data
 print("   → Merging TRAIN and STORE datasets...")
@@ -205,7 +239,8 @@ dim_date = date_dim.copy()
 # fact_sales (select relevant columns and rename)
 fact_cols = ['Store', 'Date', 'DayOfWeek', 'Sales', 'Customers', 'Promo', 
              'StateHoliday', 'SchoolHoliday', 'SalesPerCustomer',
-             'Year', 'Month', 'Quarter', 'IsWeekend']
+             'Year', 'Month', 'Quarter', 'IsWeekend',
+             'CompetitionActive', 'MonthsSinceCompetitionOpen', 'Promo2Active', 'IsPromo2Month']
 fact_sales_final = fact_sales[fact_cols].copy()
 fact_sales_final.rename(columns={'Store': 'StoreID'}, inplace=True)
 
@@ -216,15 +251,27 @@ fact_sales_final = fact_sales_final.merge(
     how='left'
 )
 
+# Behavioural store segments (mini-batch k-means over per-store sales profiles)
+print("   → Segmenting stores by sales profile...")
+dim_store = add_segments(dim_store, fact_sales_final)
+print(f"      Added: Segment ({N_SEGMENTS} segments)")
+
+# Abnormal-but-nonzero store-days (robust median/MAD per store, weekday and promo)
+print("   → Detecting anomalous store-days...")
+anomalies = AnomalyDetector().fit(fact_sales_final)
+print(f"      Flagged {len(anomalies):,} anomalous store-days")
+
 print("✓ Created tables:")
 print(f"   • dim_store: {len(dim_store):,} records")
 print(f"   • dim_date: {len(dim_date):,} records")
 print(f"   • fact_sales: {len(fact_sales_final):,} records")
+metrics.rows(rows_out=len(fact_sales_final))
 print("\n")
 
 # 7. SAVE PROCESSED DATA
 
 print("[7/7] Saving processed datasets...")
+metrics.stage('[7/7] Saving processed datasets', rows_in=len(fact_sales_final))
 
 # Save to CSV files
 dim_store.to_csv('processed_dim_store.csv', index=False)
@@ -236,6 +283,9 @@ print("✓ Saved: processed_dim_date.csv")
 fact_sales_final.to_csv('processed_fact_sales.csv', index=False)
 print("✓ Saved: processed_fact_sales.csv")
 
+anomalies.to_csv(ANOMALY_FILE, index=False)
+print(f"✓ Saved: {ANOMALY_FILE}")
+
 # Save processing summary
 print("\n💾 Generating preprocessing summary report...")
 summary = f"""
@@ -259,18 +309,22 @@ DERIVED COLUMNS CREATED:
     • Year, Month, Day, Quarter, WeekOfYear
     • IsWeekend flag
     • MonthName, DayName
+    • CompetitionActive, MonthsSinceCompetitionOpen
+    • Promo2Active, IsPromo2Month
     
   Store Data:
     • CompetitionCategory (proximity classification)
     • HasCompetition flag
+    • Segment (k-means cluster of the store's sales profile)
 
 DIMENSION TABLES CREATED:
   1. dim_store ({len(dim_store):,} records)
-     - StoreID, StoreType, Assortment, Competition info, Promo2 info
+     - StoreID, StoreType, Assortment, Competition info, Promo2 info, Segment
      
   2. dim_date ({len(dim_date):,} records)
      - DateID, Date, Year, Month, Day, Quarter, Week
      - Day/Month names, Weekend flags, Period start/end flags
+     - Holiday store shares, days to / since the nearest holidays
      
 FACT TABLE CREATED:
   3. fact_sales ({len(fact_sales_final):,} records)
@@ -294,6 +348,7 @@ FILES SAVED:
   • processed_dim_store.csv
   • processed_dim_date.csv
   • processed_fact_sales.csv
+  • processed_anomalies.csv ({len(anomalies):,} flagged store-days)
   • preprocessing_summary.txt
 
 {'='*80}
@@ -308,4 +363,6 @@ print(summary)
 print("\n" + "="*80)
 print("PREPROCESSING COMPLETE!")
 print("="*80)
-print("\nNext Step: Run '03_mysql_database_setup.py' to load data into MySQL")
\ No newline at end of file
+print("\nNext Step: Run '03_mysql_database_setup.py' to load data into MySQL")
+
+metrics.finish()
\ No newline at end of file
@@ -5,22 +5,28 @@ This script creates the MySQL database, defines the star schema,
 creates tables with relationships, and loads the preprocessed data.
 """
 
+import os
 import pandas as pd
 import numpy as np
 import mysql.connector
 from mysql.connector import Error
 import warnings
+from perf_metrics import PipelineMetrics
+from db_config import SERVER_CONFIG as DB_CONFIG, DATABASE_NAME
+from load_manifest import TableAccumulator, write_manifest
+from approx_analytics import ApproxAnalytics, SKETCH_FILE
+from anomaly_detection import ANOMALY_FILE
 warnings.filterwarnings('ignore')
 
 # DATABASE CONFIGURATION
 
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'Bz!03062003' 
-}
+# Credentials and database name: db_config.py (shared with script_04 and micro_batch.py)
 
-DATABASE_NAME = 'rossmann_analytics'
+# Fact table layout:
+#   'wide'    - fact_sales stores Date/Year/Month/Quarter/IsWeekend/DayOfWeek on every row
+#   'compact' - fact_sales_data keeps only keys, measures and small integer flags;
+#               date attributes come from dim_date through the fact_sales view
+FACT_SCHEMA = 'wide'
 
 print("="*80)
 print("ROSSMANN STORE SALES - MySQL DATABASE SETUP")
@@ -29,7 +35,10 @@ print("\n")
 
 # 1. CONNECT TO MySQL AND CREATE DATABASE
 
+metrics = PipelineMetrics('script_03_mysql')
+
 print("[1/6] Connecting to MySQL server...")
+metrics.stage('[1/6] Connecting to MySQL server')
 
 try:
     # Connect to MySQL server
@@ -39,6 +48,7 @@ try:
     
     # Create database
     print(f"\n[2/6] Creating database '{DATABASE_NAME}'...")
+    metrics.stage('[2/6] Creating database')
     cursor.execute(f"DROP DATABASE IF EXISTS {DATABASE_NAME}")
     cursor.execute(f"CREATE DATABASE {DATABASE_NAME}")
     print(f"✓ Database '{DATABASE_NAME}' created successfully!")
@@ -50,7 +60,7 @@ except Error as e:
     print(f"✗ Error connecting to MySQL: {e}")
     print("\nPlease check:")
     print("  1. MySQL server is running")
-    print("  2. Username and password are correct in DB_CONFIG")
+    print("  2. Username and password are correct in db_config.py (or ROSSMANN_DB_USER / ROSSMANN_DB_PASSWORD)")
     print("  3. mysql-connector-python is installed: pip install mysql-connector-python")
     exit()
 
@@ -59,11 +69,33 @@ print("\n")
 # 2. CREATE DIMENSION TABLES
 
 print("[3/6] Creating dimension tables...")
+metrics.stage('[3/6] Creating dimension tables')
+
+# Key columns must match the fact table's foreign key types. Compact keys:
+# MEDIUMINT store ids (the 100x benchmark has 111,500 stores), SMALLINT date
+# ids (179 years of days)
+STORE_KEY_TYPE = 'MEDIUMINT UNSIGNED' if FACT_SCHEMA == 'compact' else 'INT'
+DATE_KEY_TYPE = 'SMALLINT UNSIGNED' if FACT_SCHEMA == 'compact' else 'INT'
+KEY_LIMITS = {'SMALLINT UNSIGNED': 65_535, 'MEDIUMINT UNSIGNED': 16_777_215, 'INT': 2_147_483_647}
+
+# Fail before creating tables rather than letting MySQL reject or clip keys
+try:
+    max_store_id = pd.read_csv('processed_dim_store.csv', usecols=['StoreID'])['StoreID'].max()
+    max_date_id = pd.read_csv('processed_dim_date.csv', usecols=['DateID'])['DateID'].max()
+except FileNotFoundError as e:
+    print(f"✗ Error: {e}")
+    print("Please ensure you've run 'script_02_preprocessing.py' first!")
+    exit()
+for key, maximum, key_type in [('StoreID', max_store_id, STORE_KEY_TYPE), ('DateID', max_date_id, DATE_KEY_TYPE)]:
+    if maximum > KEY_LIMITS[key_type]:
+        print(f"✗ Max {key} {maximum:,} does not fit {key_type} (limit {KEY_LIMITS[key_type]:,}) "
+              f"in the '{FACT_SCHEMA}' schema")
+        exit()
 
 # Create dim_store table
-create_dim_store = """
+create_dim_store = f"""
 CREATE TABLE dim_store (
-    StoreID INT PRIMARY KEY,
+    StoreID {STORE_KEY_TYPE} PRIMARY KEY,
     StoreType VARCHAR(10),
     Assortment VARCHAR(10),
     CompetitionDistance FLOAT,
@@ -74,7 +106,8 @@ CREATE TABLE dim_store (
     Promo2SinceYear INT,
     PromoInterval VARCHAR(50),
     CompetitionCategory VARCHAR(50),
-    HasCompetition INT
+    HasCompetition INT,
+    Segment INT
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 """
 
@@ -82,9 +115,9 @@ cursor.execute(create_dim_store)
 print("✓ Created table: dim_store")
 
 # Create dim_date table
-create_dim_date = """
+create_dim_date = f"""
 CREATE TABLE dim_date (
-    DateID INT PRIMARY KEY,
+    DateID {DATE_KEY_TYPE} PRIMARY KEY,
     Date DATE NOT NULL,
     Year INT,
     Month INT,
@@ -101,6 +134,13 @@ CREATE TABLE dim_date (
     IsQuarterEnd INT,
     IsYearStart INT,
     IsYearEnd INT,
+    StateHolidayShare DECIMAL(4,3),
+    SchoolHolidayShare DECIMAL(4,3),
+    NextStateHoliday CHAR(1),
+    DaysToStateHoliday INT,
+    DaysSinceStateHoliday INT,
+    DaysToSchoolHoliday INT,
+    DaysSinceSchoolHoliday INT,
     UNIQUE KEY unique_date (Date)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 """
@@ -113,6 +153,7 @@ print("\n")
 # 3. CREATE FACT TABLE
 
 print("[4/6] Creating fact table...")
+metrics.stage('[4/6] Creating fact table')
 
 create_fact_sales = """
 CREATE TABLE fact_sales (
@@ -131,6 +172,10 @@ CREATE TABLE fact_sales (
     Month INT,
     Quarter INT,
     IsWeekend INT,
+    CompetitionActive INT,
+    MonthsSinceCompetitionOpen INT,
+    Promo2Active INT,
+    IsPromo2Month INT,
     FOREIGN KEY (StoreID) REFERENCES dim_store(StoreID),
     FOREIGN KEY (DateID) REFERENCES dim_date(DateID),
     INDEX idx_store (StoreID),
@@ -140,8 +185,68 @@ CREATE TABLE fact_sales (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 """
 
-cursor.execute(create_fact_sales)
-print("✓ Created table: fact_sales")
+create_fact_sales_compact = """
+CREATE TABLE fact_sales_data (
+    SalesID INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    StoreID MEDIUMINT UNSIGNED NOT NULL,
+    DateID SMALLINT UNSIGNED NOT NULL,
+    Sales INT UNSIGNED,
+    Customers SMALLINT UNSIGNED,
+    Promo TINYINT UNSIGNED,
+    StateHoliday CHAR(1),
+    SchoolHoliday TINYINT UNSIGNED,
+    SalesPerCustomer DECIMAL(7,2),
+    CompetitionActive TINYINT UNSIGNED,
+    MonthsSinceCompetitionOpen SMALLINT UNSIGNED,
+    Promo2Active TINYINT UNSIGNED,
+    IsPromo2Month TINYINT UNSIGNED,
+    FOREIGN KEY (StoreID) REFERENCES dim_store(StoreID),
+    FOREIGN KEY (DateID) REFERENCES dim_date(DateID),
+    INDEX idx_store (StoreID),
+    INDEX idx_date (DateID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+# Compatibility view exposing the wide column set so existing queries keep working
+create_fact_sales_view = """
+CREATE VIEW fact_sales AS
+SELECT
+    f.SalesID, f.StoreID, f.DateID, d.Date, d.DayOfWeek,
+    f.Sales, f.Customers, f.Promo, f.StateHoliday, f.SchoolHoliday,
+    f.SalesPerCustomer, d.Year, d.Month, d.Quarter, d.IsWeekend,
+    f.CompetitionActive, f.MonthsSinceCompetitionOpen, f.Promo2Active, f.IsPromo2Month
+FROM fact_sales_data f
+JOIN dim_date d ON f.DateID = d.DateID
+"""
+
+if FACT_SCHEMA == 'compact':
+    FACT_TABLE = 'fact_sales_data'
+    cursor.execute(create_fact_sales_compact)
+    cursor.execute(create_fact_sales_view)
+    print("✓ Created table: fact_sales_data (compact)")
+    print("✓ Created view: fact_sales (wide compatibility columns)")
+else:
+    FACT_TABLE = 'fact_sales'
+    cursor.execute(create_fact_sales)
+    print("✓ Created table: fact_sales")
+
+# Store-days flagged by the anomaly detection stage of preprocessing
+create_fact_anomalies = f"""
+CREATE TABLE fact_anomalies (
+    StoreID {STORE_KEY_TYPE} NOT NULL,
+    DateID {DATE_KEY_TYPE} NOT NULL,
+    Sales DECIMAL(10,2),
+    ExpectedSales DECIMAL(10,2),
+    Score DECIMAL(8,3),
+    Direction VARCHAR(10),
+    PRIMARY KEY (StoreID, DateID),
+    FOREIGN KEY (StoreID) REFERENCES dim_store(StoreID),
+    FOREIGN KEY (DateID) REFERENCES dim_date(DateID),
+    INDEX idx_date (DateID)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+cursor.execute(create_fact_anomalies)
+print("✓ Created table: fact_anomalies")
 print("✓ Created foreign key relationships")
 print("✓ Created indexes for query optimization")
 
@@ -150,11 +255,32 @@ print("\n")
 # 4. LOAD DATA FROM CSV FILES
 
 print("[5/6] Loading data from CSV files...")
+metrics.stage('[5/6] Loading data from CSV files')
+
+# Statistics accumulated while rows are loaded; verified afterwards with one
+# reconciliation query per table instead of separate verification scans
+store_acc = TableAccumulator(
+    'dim_store',
+    [('StoreID', 'int'), ('StoreType', 'str'), ('Assortment', 'str'),
+     ('CompetitionCategory', 'str'), ('Promo2', 'int')],
+    range_columns=['StoreID'])
+date_acc = TableAccumulator(
+    'dim_date',
+    [('DateID', 'int'), ('Date', 'date'), ('Year', 'int'), ('Month', 'int'), ('Day', 'int')],
+    range_columns=['DateID'])
+fact_acc = TableAccumulator(
+    FACT_TABLE,
+    [('StoreID', 'int'), ('DateID', 'int'), ('Sales', 'round'), ('Customers', 'int'),
+     ('Promo', 'int'), ('StateHoliday', 'str'), ('SchoolHoliday', 'int')],
+    sum_columns=['Sales', 'Customers'],
+    range_columns=['DateID'])
 
 try:
     # Load dimension tables
     print("\n   → Loading dim_store...")
     dim_store_df = pd.read_csv('processed_dim_store.csv')
+    if 'Segment' not in dim_store_df.columns:      # produced before store segmentation existed
+        dim_store_df['Segment'] = np.nan
     
     # Replace NaN with None for proper NULL handling in MySQL
     dim_store_df = dim_store_df.replace({np.nan: None})
@@ -165,17 +291,19 @@ try:
         (StoreID, StoreType, Assortment, CompetitionDistance, 
          CompetitionOpenSinceMonth, CompetitionOpenSinceYear,
          Promo2, Promo2SinceWeek, Promo2SinceYear, PromoInterval,
-         CompetitionCategory, HasCompetition)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+         CompetitionCategory, HasCompetition, Segment)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         values = tuple(row)
         cursor.execute(sql, values)
     
     connection.commit()
+    store_acc.update(dim_store_df)
     print(f"      Loaded {len(dim_store_df):,} records into dim_store")
     
     print("\n   → Loading dim_date...")
-    dim_date_df = pd.read_csv('processed_dim_date.csv')
+    dim_date_df = pd.read_csv('processed_dim_date.csv',
+                              dtype={'NextStateHoliday': str})
     
     # Replace NaN with None for proper NULL handling
     dim_date_df = dim_date_df.replace({np.nan: None})
@@ -188,13 +316,18 @@ try:
         INSERT INTO dim_date 
         (DateID, Date, Year, Month, Day, Quarter, WeekOfYear, DayOfWeek,
          DayName, MonthName, IsWeekend, IsMonthStart, IsMonthEnd,
-         IsQuarterStart, IsQuarterEnd, IsYearStart, IsYearEnd)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+         IsQuarterStart, IsQuarterEnd, IsYearStart, IsYearEnd,
+         StateHolidayShare, SchoolHolidayShare, NextStateHoliday,
+         DaysToStateHoliday, DaysSinceStateHoliday,
+         DaysToSchoolHoliday, DaysSinceSchoolHoliday)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                %s, %s, %s, %s, %s, %s, %s)
         """
         values = tuple(row)
         cursor.execute(sql, values)
     
     connection.commit()
+    date_acc.update(dim_date_df)
     print(f"      Loaded {len(dim_date_df):,} records into dim_date")
     
     print("\n   → Loading fact_sales (this may take a few minutes)...")
@@ -206,6 +339,16 @@ try:
     # Convert date to proper format
     fact_sales_df['Date'] = pd.to_datetime(fact_sales_df['Date']).dt.date
     
+    # Foreign key coverage is checked against the dimension frames before loading
+    orphan_stores = int((~fact_sales_df['StoreID'].isin(dim_store_df['StoreID'])).sum())
+    orphan_dates = int((~fact_sales_df['DateID'].isin(dim_date_df['DateID'])).sum())
+    
+    # Per-day competition / Promo2 flags derived in preprocessing
+    activity_columns = ['CompetitionActive', 'MonthsSinceCompetitionOpen', 'Promo2Active', 'IsPromo2Month']
+    
+    def activity_values(row):
+        return tuple(int(row[col]) if pd.notna(row[col]) else None for col in activity_columns)
+    
     # Batch insert for better performance
     batch_size = 1000
     total_rows = len(fact_sales_df)
@@ -213,39 +356,102 @@ try:
     for i in range(0, total_rows, batch_size):
         batch = fact_sales_df.iloc[i:i+batch_size]
         
-        sql = """
-        INSERT INTO fact_sales 
-        (StoreID, Date, DayOfWeek, Sales, Customers, Promo, StateHoliday,
-         SchoolHoliday, SalesPerCustomer, Year, Month, Quarter, IsWeekend, DateID)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
         values = []
-        for _, row in batch.iterrows():
-            values.append((
-                int(row['StoreID']) if pd.notna(row['StoreID']) else None,
-                row['Date'],
-                int(row['DayOfWeek']) if pd.notna(row['DayOfWeek']) else None,
-                float(row['Sales']) if pd.notna(row['Sales']) else None,
-                int(row['Customers']) if pd.notna(row['Customers']) else None,
-                int(row['Promo']) if pd.notna(row['Promo']) else None,
-                str(row['StateHoliday']) if pd.notna(row['StateHoliday']) else None,
-                int(row['SchoolHoliday']) if pd.notna(row['SchoolHoliday']) else None,
-                float(row['SalesPerCustomer']) if pd.notna(row['SalesPerCustomer']) else None,
-                int(row['Year']) if pd.notna(row['Year']) else None,
-                int(row['Month']) if pd.notna(row['Month']) else None,
-                int(row['Quarter']) if pd.notna(row['Quarter']) else None,
-                int(row['IsWeekend']) if pd.notna(row['IsWeekend']) else None,
-                int(row['DateID']) if pd.notna(row['DateID']) else None
-            ))
+        if FACT_SCHEMA == 'compact':
+            sql = """
+            INSERT INTO fact_sales_data
+            (StoreID, DateID, Sales, Customers, Promo, StateHoliday,
+             SchoolHoliday, SalesPerCustomer, CompetitionActive,
+             MonthsSinceCompetitionOpen, Promo2Active, IsPromo2Month)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            for _, row in batch.iterrows():
+                values.append((
+                    int(row['StoreID']) if pd.notna(row['StoreID']) else None,
+                    int(row['DateID']) if pd.notna(row['DateID']) else None,
+                    int(round(row['Sales'])) if pd.notna(row['Sales']) else None,
+                    int(row['Customers']) if pd.notna(row['Customers']) else None,
+                    int(row['Promo']) if pd.notna(row['Promo']) else None,
+                    str(row['StateHoliday']) if pd.notna(row['StateHoliday']) else None,
+                    int(row['SchoolHoliday']) if pd.notna(row['SchoolHoliday']) else None,
+                    float(row['SalesPerCustomer']) if pd.notna(row['SalesPerCustomer']) else None,
+                    *activity_values(row)
+                ))
+        else:
+            sql = """
+            INSERT INTO fact_sales 
+            (StoreID, Date, DayOfWeek, Sales, Customers, Promo, StateHoliday,
+             SchoolHoliday, SalesPerCustomer, Year, Month, Quarter, IsWeekend, DateID,
+             CompetitionActive, MonthsSinceCompetitionOpen, Promo2Active, IsPromo2Month)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """
+            for _, row in batch.iterrows():
+                values.append((
+                    int(row['StoreID']) if pd.notna(row['StoreID']) else None,
+                    row['Date'],
+                    int(row['DayOfWeek']) if pd.notna(row['DayOfWeek']) else None,
+                    float(row['Sales']) if pd.notna(row['Sales']) else None,
+                    int(row['Customers']) if pd.notna(row['Customers']) else None,
+                    int(row['Promo']) if pd.notna(row['Promo']) else None,
+                    str(row['StateHoliday']) if pd.notna(row['StateHoliday']) else None,
+                    int(row['SchoolHoliday']) if pd.notna(row['SchoolHoliday']) else None,
+                    float(row['SalesPerCustomer']) if pd.notna(row['SalesPerCustomer']) else None,
+                    int(row['Year']) if pd.notna(row['Year']) else None,
+                    int(row['Month']) if pd.notna(row['Month']) else None,
+                    int(row['Quarter']) if pd.notna(row['Quarter']) else None,
+                    int(row['IsWeekend']) if pd.notna(row['IsWeekend']) else None,
+                    int(row['DateID']) if pd.notna(row['DateID']) else None,
+                    *activity_values(row)
+                ))
         
         cursor.executemany(sql, values)
         connection.commit()
+        fact_acc.update(batch)
         
         if (i + batch_size) % 10000 == 0:
             print(f"      Loaded {i + batch_size:,} / {total_rows:,} records...")
     
     print(f"      Loaded {len(fact_sales_df):,} records into fact_sales")
+    loaded_rows = len(dim_store_df) + len(dim_date_df) + len(fact_sales_df)
+    metrics.rows(rows_in=loaded_rows, rows_out=loaded_rows)
+    
+    # Fact date range from the DateID bounds seen during the load
+    date_lookup = dim_date_df.set_index('DateID')['Date']
+    date_range = (date_lookup.get(fact_acc.mins['DateID']), date_lookup.get(fact_acc.maxs['DateID']))
+    
+    write_manifest([store_acc, date_acc, fact_acc],
+                   fact_schema=FACT_SCHEMA,
+                   orphan_stores=orphan_stores,
+                   orphan_dates=orphan_dates,
+                   date_range=date_range)
+    print("      Saved load statistics to 'load_manifest.json'")
+    
+    # Partition sketches for approximate queries (see approx_analytics.py)
+    sketch_df = fact_sales_df[['StoreID', 'Year', 'Month', 'Sales', 'Customers']].merge(
+        dim_store_df[['StoreID', 'StoreType']], on='StoreID', how='left')
+    for col in ['StoreID', 'Year', 'Month', 'Sales', 'Customers']:
+        sketch_df[col] = pd.to_numeric(sketch_df[col])
+    ApproxAnalytics.from_frame(sketch_df).save()
+    print(f"      Saved approximate-query sketches to '{SKETCH_FILE}'")
+    
+    # Anomalies flagged in preprocessing (older runs may not have produced the file)
+    anomaly_count = 0
+    if os.path.exists(ANOMALY_FILE):
+        print("\n   → Loading fact_anomalies...")
+        anomalies_df = pd.read_csv(ANOMALY_FILE)
+        sql = """
+        INSERT INTO fact_anomalies
+        (StoreID, DateID, Sales, ExpectedSales, Score, Direction)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        values = [(int(row.StoreID), int(row.DateID), float(row.Sales), float(row.ExpectedSales),
+                   float(row.Score), row.Direction)
+                  for row in anomalies_df.itertuples(index=False)]
+        for i in range(0, len(values), batch_size):
+            cursor.executemany(sql, values[i:i+batch_size])
+        connection.commit()
+        anomaly_count = len(anomalies_df)
+        print(f"      Loaded {anomaly_count:,} records into fact_anomalies")
     
     print("\n✓ All data loaded successfully!")
 
@@ -261,36 +467,26 @@ print("\n")
 # 5. VERIFY DATA INTEGRITY
 
 print("[6/6] Verifying data integrity...")
+metrics.stage('[6/6] Verifying data integrity')
 
-# Check record counts
-cursor.execute("SELECT COUNT(*) FROM dim_store")
-store_count = cursor.fetchone()[0]
-print(f"   dim_store: {store_count:,} records")
+# Reconcile each table against the statistics accumulated during the load
+mismatches = []
+for acc in (store_acc, date_acc, fact_acc):
+    mismatches += acc.reconcile(cursor)
 
-cursor.execute("SELECT COUNT(*) FROM dim_date")
-date_count = cursor.fetchone()[0]
+store_count = store_acc.rows
+date_count = date_acc.rows
+sales_count = fact_acc.rows
+print(f"   dim_store: {store_count:,} records")
 print(f"   dim_date: {date_count:,} records")
+print(f"   {FACT_TABLE}: {sales_count:,} records")
 
-cursor.execute("SELECT COUNT(*) FROM fact_sales")
-sales_count = cursor.fetchone()[0]
-print(f"   fact_sales: {sales_count:,} records")
-
-# Check foreign key integrity
-cursor.execute("""
-    SELECT COUNT(*) 
-    FROM fact_sales f
-    LEFT JOIN dim_store s ON f.StoreID = s.StoreID
-    WHERE s.StoreID IS NULL
-""")
-orphan_stores = cursor.fetchone()[0]
-
-cursor.execute("""
-    SELECT COUNT(*) 
-    FROM fact_sales f
-    LEFT JOIN dim_date d ON f.DateID = d.DateID
-    WHERE d.DateID IS NULL
-""")
-orphan_dates = cursor.fetchone()[0]
+if mismatches:
+    print("\n   ⚠ Warning: loaded tables do not match the load manifest!")
+    for mismatch in mismatches:
+        print(f"      {mismatch}")
+else:
+    print("   ✓ Row counts, totals, key ranges and checksums match the load manifest")
 
 print(f"\n   Foreign key integrity check:")
 print(f"   Orphaned store records: {orphan_stores}")
@@ -317,15 +513,32 @@ print("\n")
 
 # 6. DATABASE SUMMARY
 
-# Get database statistics
-cursor.execute("SELECT SUM(Sales) FROM fact_sales")
-total_revenue = cursor.fetchone()[0]
+# Database statistics come from the load manifest (already reconciled above)
+total_revenue = fact_acc.sums['Sales']
+avg_daily_sales = total_revenue / sales_count if sales_count else 0
 
-cursor.execute("SELECT AVG(Sales) FROM fact_sales")
-avg_daily_sales = cursor.fetchone()[0]
-
-cursor.execute("SELECT MIN(Date), MAX(Date) FROM fact_sales")
-date_range = cursor.fetchone()
+# On-disk footprint of the fact table (data + indexes)
+cursor.execute(f"ANALYZE TABLE {FACT_TABLE}")
+cursor.fetchall()
+cursor.execute("""
+    SELECT DATA_LENGTH, INDEX_LENGTH
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
+""", (DATABASE_NAME, FACT_TABLE))
+data_bytes, index_bytes = cursor.fetchone()
+
+if FACT_SCHEMA == 'compact':
+    fact_description = """fact_sales_data (Fact Table, compact)
+     - Keys, measures and TINYINT/SMALLINT flags only
+     - Date attributes served from dim_date via the fact_sales view"""
+    index_description = """  • idx_store (on StoreID)
+  • idx_date (on DateID)"""
+else:
+    fact_description = "fact_sales (Fact Table)"
+    index_description = """  • idx_store (on StoreID)
+  • idx_date (on DateID)
+  • idx_year_month (on Year, Month)
+  • idx_date_col (on Date)"""
 
 summary = f"""
 {'='*80}
@@ -344,21 +557,22 @@ TABLES CREATED:
      - {date_count:,} dates
      - Attributes: Year, Month, Quarter, Week, Day info, Flags
      
-  3. fact_sales (Fact Table)
+  3. {fact_description}
      - {sales_count:,} sales records
      - Date range: {date_range[0]} to {date_range[1]}
      - Total revenue: ${total_revenue:,.2f}
      - Average daily sales: ${avg_daily_sales:,.2f}
+     - Table size: {data_bytes / 1024**2:,.1f} MB data + {index_bytes / 1024**2:,.1f} MB indexes
+     
+  4. fact_anomalies
+     - {anomaly_count:,} store-days flagged by robust median/MAD sales scores
      
 RELATIONSHIPS:
   • fact_sales.StoreID → dim_store.StoreID (Foreign Key)
   • fact_sales.DateID → dim_date.DateID (Foreign Key)
   
 INDEXES CREATED:
-  • idx_store (on StoreID)
-  • idx_date (on DateID)
-  • idx_year_month (on Year, Month)
-  • idx_date_col (on Date)
+{index_description}
   
 {'='*80}
 
@@ -385,4 +599,6 @@ print(" Saved database info to 'database_setup_info.txt'")
 cursor.close()
 connection.close()
 print("\n✓ MySQL connection closed")
+
+metrics.finish()
 print("\n" + "="*80)
\ No newline at end of file
@@ -11,7 +11,11 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import mysql.connector
 from mysql.connector import Error
+import os
 import warnings
+from perf_metrics import PipelineMetrics
+from db_config import DB_CONFIG
+from analysis_export import export_results, ARROW_AVAILABLE, EXPORT_DIR
 warnings.filterwarnings('ignore')
 
 # Set visualization style
@@ -21,19 +25,23 @@ plt.rcParams['font.size'] = 10
 
 # DATABASE CONNECTION
 
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',              
-    'password': 'Bz!03062003',  
-    'database': 'rossmann_analytics'
-}
+# Credentials: db_config.py (shared with script_03 and micro_batch.py)
+
+# Query profiling mode: EXPLAIN / EXPLAIN ANALYZE every analysis query and write
+# a cost-ranked report with index suggestions to query_profile_report.txt
+PROFILE_QUERIES = os.environ.get('ROSSMANN_PROFILE_QUERIES', '0') == '1'
+# Also capture EXPLAIN ANALYZE (runs every profiled query a second time)
+PROFILE_ANALYZE = os.environ.get('ROSSMANN_PROFILE_ANALYZE', '0') == '1'
 
 print("="*80)
 print("ROSSMANN STORE SALES - DATA ANALYSIS & VISUALIZATION")
 print("="*80)
 print("\n")
 
+metrics = PipelineMetrics('script_04_analysis')
+
 print("[1/8] Connecting to MySQL database...")
+metrics.stage('[1/8] Connecting to MySQL database')
 try:
     conn = mysql.connector.connect(**DB_CONFIG)
     print(f"✓ Connected to database: {DB_CONFIG['database']}")
@@ -42,11 +50,26 @@ except Error as e:
     print("Please ensure '03_mysql_database_setup.py' has been run successfully!")
     exit()
 
+profiler = None
+if PROFILE_QUERIES:
+    from query_profiler import QueryProfiler
+    profiler = QueryProfiler(conn, explain_analyze=PROFILE_ANALYZE)
+    print("✓ Query profiling enabled" + (" (with EXPLAIN ANALYZE)" if PROFILE_ANALYZE else ""))
+
+
+def read_query(name, query):
+    """Run an analysis query; when PROFILE_QUERIES is on, the profiled run supplies the rows."""
+    if profiler is not None:
+        _, columns, rows = profiler.profile(name, query)
+        return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    return pd.read_sql(query, conn)
+
 print("\n")
 
 # 1. DESCRIPTIVE STATISTICS
 
 print("[2/8] Calculating Descriptive Statistics...")
+metrics.stage('[2/8] Calculating Descriptive Statistics')
 print("-" * 80)
 
 # Overall sales statistics
@@ -63,7 +86,7 @@ SELECT
     AVG(SalesPerCustomer) as AvgBasketSize
 FROM fact_sales
 """
-stats_df = pd.read_sql(query, conn)
+stats_df = read_query('Descriptive statistics', query)
 
 print("\n📊 OVERALL STATISTICS:")
 print(f"   Total Records: {stats_df['TotalRecords'].iloc[0]:,}")
@@ -80,6 +103,7 @@ print("\n")
 # 2. SALES BY STORE TYPE
 
 print("[3/8] Analyzing Sales by Store Type...")
+metrics.stage('[3/8] Analyzing Sales by Store Type')
 
 query = """
 SELECT 
@@ -94,7 +118,8 @@ JOIN dim_store s ON f.StoreID = s.StoreID
 GROUP BY s.StoreType
 ORDER BY TotalSales DESC
 """
-store_type_df = pd.read_sql(query, conn)
+store_type_df = read_query('Sales by store type', query)
+metrics.rows(rows_out=len(store_type_df))
 print("\n SALES BY STORE TYPE:")
 print(store_type_df.to_string(index=False))
 
@@ -124,6 +149,7 @@ print("\n")
 # 3. PROMOTIONAL EFFECTIVENESS ANALYSIS
 
 print("[4/8] Analyzing Promotional Effectiveness...")
+metrics.stage('[4/8] Analyzing Promotional Effectiveness')
 
 query = """
 SELECT 
@@ -135,7 +161,8 @@ SELECT
 FROM fact_sales
 GROUP BY Promo
 """
-promo_df = pd.read_sql(query, conn)
+promo_df = read_query('Promotional effectiveness', query)
+metrics.rows(rows_out=len(promo_df))
 promo_df['Promo'] = promo_df['Promo'].map({0: 'No Promo', 1: 'With Promo'})
 
 print("\n PROMOTIONAL IMPACT:")
@@ -173,6 +200,7 @@ print("\n")
 # 4. TEMPORAL TRENDS ANALYSIS
 
 print("[5/8] Analyzing Temporal Trends...")
+metrics.stage('[5/8] Analyzing Temporal Trends')
 
 # Monthly sales trend
 query = """
@@ -186,7 +214,7 @@ FROM fact_sales
 GROUP BY Year, Month
 ORDER BY Year, Month
 """
-monthly_df = pd.read_sql(query, conn)
+monthly_df = read_query('Monthly trend', query)
 monthly_df['YearMonth'] = pd.to_datetime(monthly_df[['Year', 'Month']].assign(DAY=1))
 
 print("\nMONTHLY SALES TREND (Sample):")
@@ -217,7 +245,8 @@ JOIN dim_date d ON f.DateID = d.DateID
 GROUP BY d.DayName, d.DayOfWeek
 ORDER BY d.DayOfWeek
 """
-dow_df = pd.read_sql(query, conn)
+dow_df = read_query('Day of week', query)
+metrics.rows(rows_out=len(dow_df))
 
 print("\n SALES BY DAY OF WEEK:")
 print(dow_df.to_string(index=False))
@@ -239,20 +268,24 @@ print("\n")
 # 5. COMPETITION ANALYSIS
 
 print("[6/8] Analyzing Competition Impact...")
+metrics.stage('[6/8] Analyzing Competition Impact')
 
+# Days before a competitor opened count as 'No Competition'
 query = """
 SELECT 
-    s.CompetitionCategory,
+    CASE WHEN f.CompetitionActive = 1 THEN s.CompetitionCategory
+         ELSE 'No Competition' END as CompetitionCategory,
     COUNT(DISTINCT f.StoreID) as NumStores,
     AVG(f.Sales) as AvgSales,
     AVG(f.Customers) as AvgCustomers,
-    AVG(s.CompetitionDistance) as AvgDistance
+    AVG(CASE WHEN f.CompetitionActive = 1 THEN s.CompetitionDistance ELSE 0 END) as AvgDistance
 FROM fact_sales f
 JOIN dim_store s ON f.StoreID = s.StoreID
-GROUP BY s.CompetitionCategory
+GROUP BY 1
 ORDER BY AvgSales DESC
 """
-comp_df = pd.read_sql(query, conn)
+comp_df = read_query('Competition impact', query)
+metrics.rows(rows_out=len(comp_df))
 
 print("\n SALES BY COMPETITION PROXIMITY:")
 print(comp_df.to_string(index=False))
@@ -274,6 +307,7 @@ print("\n")
 # 6. TOP PERFORMING STORES
 
 print("[7/8] Identifying Top Performing Stores...")
+metrics.stage('[7/8] Identifying Top Performing Stores')
 
 query = """
 SELECT 
@@ -291,7 +325,8 @@ GROUP BY f.StoreID, s.StoreType, s.Assortment, s.CompetitionCategory
 ORDER BY TotalSales DESC
 LIMIT 10
 """
-top_stores_df = pd.read_sql(query, conn)
+top_stores_df = read_query('Top stores', query)
+metrics.rows(rows_out=len(top_stores_df))
 
 print("\nTOP 10 PERFORMING STORES:")
 print(top_stores_df.to_string(index=False))
@@ -313,6 +348,7 @@ print("\n")
 # 7. CORRELATION ANALYSIS
 
 print("[8/8] Performing Correlation Analysis...")
+metrics.stage('[8/8] Performing Correlation Analysis')
 
 query = """
 SELECT 
@@ -325,7 +361,8 @@ SELECT
 FROM fact_sales
 LIMIT 50000
 """
-corr_df = pd.read_sql(query, conn)
+corr_df = read_query('Correlation sample', query)
+metrics.rows(rows_out=len(corr_df))
 
 correlation_matrix = corr_df.corr()
 
@@ -349,6 +386,7 @@ print("\n")
 print("="*80)
 print("GENERATING INSIGHTS REPORT")
 print("="*80)
+metrics.stage('Generating insights report')
 
 # Calculate key metrics for report
 total_revenue = stats_df['TotalRevenue'].iloc[0]
@@ -489,10 +527,33 @@ with open('insights_report.txt', 'w') as f:
 
 print("\n💾 Saved comprehensive report: insights_report.txt")
 
+# Typed Arrow / Parquet exports of every result for BI dashboards
+if ARROW_AVAILABLE:
+    export_version = export_results({
+        'descriptive_statistics': stats_df,
+        'store_type': store_type_df,
+        'promo': promo_df,
+        'monthly_trend': monthly_df,
+        'day_of_week': dow_df,
+        'competition': comp_df,
+        'top_stores': top_stores_df,
+        'correlation_matrix': correlation_matrix,
+    })
+    print(f"💾 Saved columnar exports: {EXPORT_DIR}/{export_version}/")
+else:
+    print("   (pyarrow not installed - skipping Arrow / Parquet exports)")
+
+# Save query profile report
+if profiler is not None:
+    profiler.save()
+    print("💾 Saved query profile report: query_profile_report.txt")
+
 # Close database connection
 conn.close()
 print("\n✓ Database connection closed")
 
+metrics.finish()
+
 print("\n" + "="*80)
 print("ANALYSIS COMPLETE!")
 print("="*80)
@@ -506,4 +567,6 @@ print("  • analysis_competition.png")
 print("  • analysis_top_stores.png")
 print("  • analysis_correlation.png")
 print("  • insights_report.txt")
+if ARROW_AVAILABLE:
+    print(f"  • {EXPORT_DIR}/{export_version}/ (Arrow IPC + Parquet + manifest.json)")
 print("\n" + "="*80)
@@ -0,0 +1,400 @@
+"""
+Sharded Warehouse: Scatter-Gather Aggregation Across Databases
+===============================================================
+This module is an optional sharding layer for the star schema. fact_sales is
+distributed across N database targets by StoreID (hash or range), dim_store
+and dim_date are replicated to every shard, and aggregate queries run as
+parallel per-shard partial aggregates merged in Python:
+
+  SUM, COUNT, MIN, MAX   merged by SUM / SUM / MIN / MAX
+  AVG                    SUM(x) and COUNT(x) per shard, divided after merging
+  STD (population)       SUM(x), SUM(x²), COUNT(x) per shard
+  COUNT(DISTINCT key)    summed - valid only for the shard key, whose values
+                         never span shards
+
+Queries grouped by the shard key are complete on their shard, so ORDER BY /
+LIMIT is pushed down to every shard and only k rows per shard come back.
+
+Targets are SQLite files (local stand-ins) or MySQL databases, on one or
+several servers. The script_04 aggregates are included as query specs.
+"""
+
+import os
+import time
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import numpy as np
+from sketches import hash64
+import warnings
+warnings.filterwarnings('ignore')
+
+SHARD_COUNT = int(os.environ.get('ROSSMANN_SHARD_COUNT', 4))
+SHARD_STRATEGY = os.environ.get('ROSSMANN_SHARD_STRATEGY', 'hash')      # 'hash' or 'range'
+SHARD_DIR = 'shards'
+BATCH_SIZE = 10_000
+
+# Replicated dimensions and the sharded fact table (portable SQLite / MySQL types)
+SHARD_SCHEMA = {
+    'dim_store': [('StoreID', 'INTEGER PRIMARY KEY'), ('StoreType', 'VARCHAR(10)'),
+                  ('Assortment', 'VARCHAR(10)'), ('CompetitionDistance', 'REAL'),
+                  ('CompetitionCategory', 'VARCHAR(50)'), ('Promo2', 'INTEGER'),
+                  ('Segment', 'INTEGER')],
+    'dim_date': [('DateID', 'INTEGER PRIMARY KEY'), ('Date', 'DATE'), ('Year', 'INTEGER'),
+                 ('Month', 'INTEGER'), ('DayOfWeek', 'INTEGER'), ('DayName', 'VARCHAR(20)'),
+                 ('StateHolidayShare', 'REAL'), ('SchoolHolidayShare', 'REAL')],
+    'fact_sales': [('StoreID', 'INTEGER NOT NULL'), ('DateID', 'INTEGER NOT NULL'),
+                   ('Date', 'DATE'), ('DayOfWeek', 'INTEGER'), ('Sales', 'REAL'),
+                   ('Customers', 'INTEGER'), ('Promo', 'INTEGER'), ('StateHoliday', 'CHAR(1)'),
+                   ('SchoolHoliday', 'INTEGER'), ('SalesPerCustomer', 'REAL'),
+                   ('Year', 'INTEGER'), ('Month', 'INTEGER'), ('Quarter', 'INTEGER'),
+                   ('IsWeekend', 'INTEGER'), ('CompetitionActive', 'INTEGER')],
+}
+SHARD_INDEXES = [('idx_store', 'fact_sales', 'StoreID'), ('idx_date', 'fact_sales', 'DateID')]
+
+
+# SHARD ROUTING
+
+class ShardMap:
+    """Maps StoreIDs to shard numbers by hash or by contiguous StoreID range."""
+
+    def __init__(self, n_shards=SHARD_COUNT, strategy=SHARD_STRATEGY, max_store=1115):
+        if strategy not in ('hash', 'range'):
+            raise ValueError(f"Unknown shard strategy '{strategy}' (use 'hash' or 'range')")
+        self.n_shards = n_shards
+        self.strategy = strategy
+        self.max_store = max_store
+
+    def shard_of(self, store_ids):
+        store_ids = np.asarray(store_ids, dtype=np.int64)
+        if self.strategy == 'hash':
+            return (hash64(store_ids) % np.uint64(self.n_shards)).astype(np.int64)
+        # Equal-width StoreID ranges; IDs above max_store go to the last shard
+        width = -(-self.max_store // self.n_shards)
+        return np.minimum((store_ids - 1) // width, self.n_shards - 1).clip(0)
+
+
+class ShardTarget:
+    """One shard database: a SQLite file or a MySQL database."""
+
+    def __init__(self, engine, path=None, config=None):
+        if engine not in ('sqlite', 'mysql'):
+            raise ValueError(f"Unknown engine '{engine}'")
+        self.engine = engine
+        self.path = path
+        self.config = config or {}
+        self.placeholder = '?' if engine == 'sqlite' else '%s'
+
+    def connect(self):
+        if self.engine == 'sqlite':
+            return sqlite3.connect(self.path)
+        import mysql.connector
+        return mysql.connector.connect(**self.config)
+
+    def create_database(self):
+        """MySQL shards need their database created first; SQLite files are created on connect."""
+        if self.engine == 'mysql':
+            import mysql.connector
+            server = {k: v for k, v in self.config.items() if k != 'database'}
+            connection = mysql.connector.connect(**server)
+            connection.cursor().execute(f"CREATE DATABASE IF NOT EXISTS {self.config['database']}")
+            connection.close()
+        elif os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def __repr__(self):
+        return self.path if self.engine == 'sqlite' else f"mysql:{self.config.get('host')}/{self.config.get('database')}"
+
+
+def sqlite_targets(n_shards=SHARD_COUNT, directory=SHARD_DIR):
+    return [ShardTarget('sqlite', path=os.path.join(directory, f'shard_{i}.sqlite')) for i in range(n_shards)]
+
+
+def mysql_targets(configs, database='rossmann_analytics'):
+    """One shard per server config (same server repeated = several databases on it)."""
+    return [ShardTarget('mysql', config={**config, 'database': f'{database}_shard{i}'})
+            for i, config in enumerate(configs)]
+
+
+# QUERY SPECS
+
+class AggregateQuery:
+    """
+    A GROUP BY query over fact_sales f (joined to dim_store s / dim_date d):
+    group_by is a list of (alias, SQL expression), measures a list of
+    (alias, function, SQL expression) with function in sum / count / avg /
+    std / min / max / count_distinct.
+    """
+
+    FUNCTIONS = ('sum', 'count', 'avg', 'std', 'min', 'max', 'count_distinct')
+
+    def __init__(self, group_by, measures, joins=(), where=None, order_by=None,
+                 descending=True, limit=None):
+        for alias, func, expr in measures:
+            if func not in self.FUNCTIONS:
+                raise ValueError(f"Unsupported aggregate '{func}' for {alias}")
+            if func == 'count_distinct' and expr != 'f.StoreID':
+                raise ValueError("COUNT(DISTINCT) only merges across shards for the shard key f.StoreID")
+        self.group_by = list(group_by)
+        self.measures = list(measures)
+        self.joins = list(joins)
+        self.where = where
+        self.order_by = order_by
+        self.descending = descending
+        self.limit = limit
+
+    @property
+    def shard_local(self):
+        """Every group lives on one shard when the shard key is a group column."""
+        return any(expr == 'f.StoreID' for _, expr in self.group_by)
+
+    def _partials(self, alias, func, expr):
+        if func == 'sum':
+            return [(f'{alias}__sum', f'SUM({expr})')]
+        if func == 'count':
+            return [(f'{alias}__n', 'COUNT(*)' if expr == '*' else f'COUNT({expr})')]
+        if func == 'min':
+            return [(f'{alias}__min', f'MIN({expr})')]
+        if func == 'max':
+            return [(f'{alias}__max', f'MAX({expr})')]
+        if func == 'count_distinct':
+            return [(f'{alias}__distinct', f'COUNT(DISTINCT {expr})')]
+        partials = [(f'{alias}__sum', f'SUM({expr})'), (f'{alias}__n', f'COUNT({expr})')]
+        if func == 'std':
+            partials.append((f'{alias}__ss', f'SUM(({expr}) * ({expr}))'))
+        return partials
+
+    def _final_sql(self, alias):
+        """SQL for a measure's final value on one shard (used for LIMIT pushdown)."""
+        for a, func, expr in self.measures:
+            if a == alias and func in ('avg', 'std'):
+                return f'SUM({expr}) * 1.0 / COUNT({expr})' if func == 'avg' else None
+            if a == alias:
+                return self._partials(a, func, expr)[0][1]
+        return None
+
+    def partial_sql(self):
+        select = [f'{expr} AS {alias}' for alias, expr in self.group_by]
+        for alias, func, expr in self.measures:
+            select += [f'{sql} AS {name}' for name, sql in self._partials(alias, func, expr)]
+        sql = "SELECT " + ",\n       ".join(select) + "\nFROM fact_sales f"
+        for join in self.joins:
+            sql += {'s': "\nJOIN dim_store s ON f.StoreID = s.StoreID",
+                    'd': "\nJOIN dim_date d ON f.DateID = d.DateID"}[join]
+        if self.where:
+            sql += f"\nWHERE {self.where}"
+        if self.group_by:
+            sql += "\nGROUP BY " + ", ".join(expr for _, expr in self.group_by)
+        order = self._final_sql(self.order_by) if self.order_by else None
+        if self.shard_local and self.limit and order:
+            sql += f"\nORDER BY {order} {'DESC' if self.descending else 'ASC'}\nLIMIT {self.limit}"
+        return sql
+
+    def merge(self, frames):
+        """Combine per-shard partial rows into the final result."""
+        partials = pd.concat(frames, ignore_index=True)
+        group_cols = [alias for alias, _ in self.group_by]
+        how = {}
+        for col in partials.columns:
+            if col not in group_cols:
+                how[col] = {'min': 'min', 'max': 'max'}.get(col.rsplit('__', 1)[1], 'sum')
+        if group_cols:
+            merged = partials.groupby(group_cols, dropna=False).agg(how).reset_index()
+        else:
+            merged = partials.agg(how).to_frame().T
+
+        result = merged[group_cols].copy()
+        for alias, func, _ in self.measures:
+            if func in ('sum', 'min', 'max'):
+                result[alias] = merged[f'{alias}__{func}']
+            elif func == 'count':
+                result[alias] = merged[f'{alias}__n'].astype(np.int64)
+            elif func == 'count_distinct':
+                result[alias] = merged[f'{alias}__distinct'].astype(np.int64)
+            else:
+                n = merged[f'{alias}__n'].astype(np.float64)
+                mean = merged[f'{alias}__sum'].astype(np.float64) / n
+                result[alias] = mean
+                if func == 'std':
+                    var = merged[f'{alias}__ss'].astype(np.float64) / n - mean ** 2
+                    result[alias] = np.sqrt(var.clip(lower=0))
+        if self.order_by:
+            result = result.sort_values(self.order_by, ascending=not self.descending, kind='mergesort')
+        elif group_cols:
+            result = result.sort_values(group_cols, kind='mergesort')
+        if self.limit:
+            result = result.head(self.limit)
+        return result.reset_index(drop=True)
+
+
+# The aggregate queries of script_04 as scatter-gather specs
+SCRIPT_04_QUERIES = {
+    'Descriptive statistics': AggregateQuery(
+        [], [('TotalRecords', 'count', '*'), ('UniqueStores', 'count_distinct', 'f.StoreID'),
+             ('TotalRevenue', 'sum', 'f.Sales'), ('AvgDailySales', 'avg', 'f.Sales'),
+             ('MinSales', 'min', 'f.Sales'), ('MaxSales', 'max', 'f.Sales'),
+             ('StdDevSales', 'std', 'f.Sales'), ('AvgCustomers', 'avg', 'f.Customers'),
+             ('AvgBasketSize', 'avg', 'f.SalesPerCustomer')]),
+    'Sales by store type': AggregateQuery(
+        [('StoreType', 's.StoreType')],
+        [('NumStores', 'count_distinct', 'f.StoreID'), ('TotalSales', 'sum', 'f.Sales'),
+         ('AvgDailySales', 'avg', 'f.Sales'), ('AvgCustomers', 'avg', 'f.Customers'),
+         ('AvgBasketSize', 'avg', 'f.SalesPerCustomer')],
+        joins=['s'], order_by='TotalSales'),
+    'Promotional effectiveness': AggregateQuery(
+        [('Promo', 'f.Promo')],
+        [('Records', 'count', '*'), ('AvgSales', 'avg', 'f.Sales'),
+         ('AvgCustomers', 'avg', 'f.Customers'), ('AvgBasketSize', 'avg', 'f.SalesPerCustomer')]),
+    'Monthly trend': AggregateQuery(
+        [('Year', 'f.Year'), ('Month', 'f.Month')],
+        [('MonthlySales', 'sum', 'f.Sales'), ('AvgDailySales', 'avg', 'f.Sales'),
+         ('MonthlyCustomers', 'sum', 'f.Customers')]),
+    'Day of week': AggregateQuery(
+        [('DayName', 'd.DayName'), ('DayOfWeek', 'd.DayOfWeek')],
+        [('AvgSales', 'avg', 'f.Sales'), ('AvgCustomers', 'avg', 'f.Customers')],
+        joins=['d'], order_by='DayOfWeek', descending=False),
+    'Competition impact': AggregateQuery(
+        [('CompetitionCategory', "CASE WHEN f.CompetitionActive = 1 THEN s.CompetitionCategory "
+                                 "ELSE 'No Competition' END")],
+        [('NumStores', 'count_distinct', 'f.StoreID'), ('AvgSales', 'avg', 'f.Sales'),
+         ('AvgCustomers', 'avg', 'f.Customers'),
+         ('AvgDistance', 'avg', 'CASE WHEN f.CompetitionActive = 1 THEN s.CompetitionDistance ELSE 0 END')],
+        joins=['s'], order_by='AvgSales'),
+    'Top stores': AggregateQuery(
+        [('StoreID', 'f.StoreID'), ('StoreType', 's.StoreType'), ('Assortment', 's.Assortment'),
+         ('CompetitionCategory', 's.CompetitionCategory')],
+        [('TotalSales', 'sum', 'f.Sales'), ('AvgDailySales', 'avg', 'f.Sales'),
+         ('AvgCustomers', 'avg', 'f.Customers'), ('AvgBasketSize', 'avg', 'f.SalesPerCustomer')],
+        joins=['s'], order_by='TotalSales', limit=10),
+}
+
+
+# WAREHOUSE
+
+def _rows(frame):
+    """Plain Python tuples (None for missing values) for executemany."""
+    frame = frame.astype(object).where(frame.notna(), None)      # object dtype boxes Python scalars
+    return list(frame.itertuples(index=False, name=None))
+
+
+class ShardedWarehouse:
+    """fact_sales split across shard targets, dimensions replicated to each."""
+
+    def __init__(self, targets, shard_map=None):
+        self.targets = list(targets)
+        self.shard_map = shard_map or ShardMap(len(self.targets))
+        if self.shard_map.n_shards != len(self.targets):
+            raise ValueError(f"Shard map has {self.shard_map.n_shards} shards "
+                             f"but {len(self.targets)} targets were given")
+
+    def create_schema(self):
+        for target in self.targets:
+            target.create_database()
+            connection = target.connect()
+            cursor = connection.cursor()
+            for table, columns in SHARD_SCHEMA.items():
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+                cursor.execute(f"CREATE TABLE {table} ("
+                               + ", ".join(f"{name} {sql_type}" for name, sql_type in columns) + ")")
+            for name, table, column in SHARD_INDEXES:
+                cursor.execute(f"CREATE INDEX {name} ON {table} ({column})")
+            connection.commit()
+            connection.close()
+
+    def _insert(self, target, table, frame):
+        columns = [name for name, _ in SHARD_SCHEMA[table]]
+        frame = frame.reindex(columns=columns)
+        sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ("
+               + ", ".join([target.placeholder] * len(columns)) + ")")
+        connection = target.connect()
+        cursor = connection.cursor()
+        for start in range(0, len(frame), BATCH_SIZE):
+            cursor.executemany(sql, _rows(frame.iloc[start:start + BATCH_SIZE]))
+        connection.commit()
+        connection.close()
+
+    def load(self, dim_store_df, dim_date_df, fact_df, workers=None):
+        """Replicate the dimensions and route every fact row to its StoreID's shard."""
+        fact_df = fact_df.copy()
+        for df in (fact_df, dim_date_df):
+            df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
+        shard = self.shard_map.shard_of(fact_df['StoreID'].to_numpy())
+
+        def load_shard(i):
+            target = self.targets[i]
+            self._insert(target, 'dim_store', dim_store_df)
+            self._insert(target, 'dim_date', dim_date_df)
+            self._insert(target, 'fact_sales', fact_df[shard == i])
+            return int((shard == i).sum())
+
+        with ThreadPoolExecutor(workers or len(self.targets)) as pool:
+            return list(pool.map(load_shard, range(len(self.targets))))
+
+    def _run_partial(self, target, sql):
+        connection = target.connect()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(sql)
+            columns = [c[0] for c in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+        finally:
+            connection.close()
+
+    def query(self, spec, workers=None):
+        """Scatter the partial aggregate to every shard in parallel, gather and merge."""
+        sql = spec.partial_sql()
+        workers = workers or len(self.targets)
+        if workers == 1:
+            frames = [self._run_partial(t, sql) for t in self.targets]
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                frames = list(pool.map(lambda t: self._run_partial(t, sql), self.targets))
+        return spec.merge(frames)
+
+
+def compare(result, reference, rtol=1e-9):
+    """Largest relative difference between two results with the same layout."""
+    worst = 0.0
+    for col in result.columns:
+        a, b = result[col].to_numpy(), reference[col].to_numpy()
+        if a.dtype.kind in 'if' and b.dtype.kind in 'if':
+            diff = np.abs(a.astype(float) - b.astype(float)) / np.maximum(np.abs(b.astype(float)), 1e-12)
+            worst = max(worst, float(np.nanmax(diff)) if len(diff) else 0.0)
+        elif not (a.astype(str) == b.astype(str)).all():
+            return np.inf
+    return worst
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - SHARDED WAREHOUSE")
+    print("="*80)
+
+    print(f"\n[1/3] Loading {SHARD_COUNT} SQLite shards ({SHARD_STRATEGY} on StoreID) and a single-database reference...")
+    dim_store_df = pd.read_csv('processed_dim_store.csv')
+    dim_date_df = pd.read_csv('processed_dim_date.csv')
+    fact_df = pd.read_csv('processed_fact_sales.csv', dtype={'StateHoliday': str})
+    shard_map = ShardMap(SHARD_COUNT, SHARD_STRATEGY, max_store=int(dim_store_df['StoreID'].max()))
+    sharded = ShardedWarehouse(sqlite_targets(SHARD_COUNT), shard_map)
+    single = ShardedWarehouse([ShardTarget('sqlite', path=os.path.join(SHARD_DIR, 'single.sqlite'))])
+    for warehouse in (sharded, single):
+        start = time.perf_counter()
+        warehouse.create_schema()
+        rows = warehouse.load(dim_store_df, dim_date_df, fact_df)
+        print(f"✓ {len(rows)} target(s), fact rows per shard {rows} in {time.perf_counter() - start:.2f}s")
+
+    print("\n[2/3] Running the script_04 aggregates scatter-gather...")
+    timings = []
+    for name, spec in SCRIPT_04_QUERIES.items():
+        start = time.perf_counter()
+        result = sharded.query(spec)
+        sharded_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        reference = single.query(spec)
+        single_seconds = time.perf_counter() - start
+        timings.append({'Query': name, 'Rows': len(result), 'ShardedSeconds': sharded_seconds,
+                        'SingleSeconds': single_seconds, 'MaxRelDiff': compare(result, reference)})
+    print(pd.DataFrame(timings).to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+
+    print("\n[3/3] Top stores (merged from per-shard LIMIT 10):")
+    print(sharded.query(SCRIPT_04_QUERIES['Top stores']).to_string(index=False))
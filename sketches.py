@@ -0,0 +1,202 @@
+"""
+Sketches: Mergeable Approximate Summaries
+==========================================
+Small, mergeable data sketches used by the streaming profiler and the
+approximate analytics mode:
+
+  • KLLSketch      - approximate quantiles (rank error ~ 1.7 / k)
+  • HyperLogLog    - approximate distinct counts (std. error ~ 1.04 / sqrt(2^p))
+  • CountMinSketch - approximate per-key totals for heavy hitters
+                     (overestimate <= e / width * total weight, w.p. 1 - e^-depth)
+
+All sketches accept NumPy arrays in batches and can be merged, so partial
+sketches built on separate chunks or processes combine into one summary.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def hash64(values):
+    """Deterministic 64-bit hashes of an array of values (numbers or strings)."""
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub':
+        values = values.astype(np.int64)
+    elif values.dtype.kind == 'f':
+        values = values.astype(np.float64)
+    else:
+        values = values.astype(str).astype(object)
+    return pd.util.hash_array(values)
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Items live in a stack of compactors; level h holds items of weight 2^h.
+    When a level exceeds its capacity it is sorted and every other item
+    (random offset) is promoted to the next level.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.c = 2.0 / 3.0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self.n = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * self.c ** depth)))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                items = np.sort(self.levels[level])
+                # Keep an odd leftover item at this level so weight is preserved
+                if len(items) % 2:
+                    keep, items = items[:1], items[1:]
+                else:
+                    keep = items[:0]
+                offset = int(self._rng.integers(0, 2))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], items[offset::2]])
+                self.levels[level] = keep
+            level += 1
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(l), 2 ** h, dtype=np.float64)
+                                  for h, l in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """Approximate q-quantile(s); q may be a scalar or an array."""
+        if self.n == 0:
+            return np.nan if np.isscalar(q) else np.full(len(q), np.nan)
+        items, cum = self._weighted()
+        targets = np.asarray(q, dtype=np.float64) * cum[-1]
+        idx = np.searchsorted(cum, targets, side='left').clip(0, len(items) - 1)
+        result = items[idx]
+        return float(result) if np.isscalar(q) else result
+
+    def rank(self, value):
+        """Approximate fraction of items <= value."""
+        if self.n == 0:
+            return np.nan
+        items, cum = self._weighted()
+        pos = np.searchsorted(items, value, side='right')
+        return float(cum[pos - 1] / cum[-1]) if pos else 0.0
+
+    @property
+    def size(self):
+        return sum(len(l) for l in self.levels)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2^p one-byte registers."""
+
+    def __init__(self, p=14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values):
+        self.update_hashes(hash64(values))
+
+    def update_hashes(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        # Rank = position of the first 1-bit in the remaining bits; only the low
+        # 50 bits are used so the float conversion below is exact
+        width = min(64 - self.p, 50)
+        rest = (hashes & np.uint64((1 << width) - 1)).astype(np.float64)
+        bit_length = np.frexp(rest)[1]          # 0 for rest == 0
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class CountMinSketch:
+    """Count-min sketch of weighted key frequencies (depth rows x width counters)."""
+
+    def __init__(self, width=2048, depth=5, seed=0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.float64)
+        self.total = 0.0
+        rng = np.random.default_rng(seed)
+        # Odd multipliers for multiply-shift hashing of the 64-bit key hashes
+        self._salts = rng.integers(1, 2 ** 63, size=depth, dtype=np.uint64) | np.uint64(1)
+
+    def _columns(self, keys):
+        hashes = hash64(keys)
+        with np.errstate(over='ignore'):
+            mixed = hashes[None, :] * self._salts[:, None]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, keys, weights=None):
+        keys = np.asarray(keys)
+        if not len(keys):
+            return
+        weights = np.ones(len(keys)) if weights is None else np.asarray(weights, dtype=np.float64)
+        cols = self._columns(keys)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(cols[row], weights=weights, minlength=self.width)
+        self.total += float(weights.sum())
+
+    def estimate(self, keys):
+        """Upper-biased estimate of the total weight of each key."""
+        keys = np.asarray(keys)
+        cols = self._columns(keys)
+        return self.table[np.arange(self.depth)[:, None], cols].min(axis=0)
+
+    @property
+    def error_bound(self):
+        return np.e / self.width * self.total
+
+    def merge(self, other):
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError("Cannot merge count-min sketches with different shape or seed")
+        self.table += other.table
+        self.total += other.total
+        return self
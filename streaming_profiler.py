@@ -0,0 +1,313 @@
+"""
+Streaming Profiler: One-Pass Chunked Dataset Profile
+=====================================================
+This module profiles a CSV file in a single chunked pass with mergeable
+per-column accumulators, so script_01 no longer needs the whole of
+train.csv in memory:
+
+  • null counts and row counts
+  • count / mean / variance via Welford (merged with Chan's formula), min / max
+  • categorical frequency tables (dropped once a column exceeds MAX_CATEGORIES)
+  • approximate quantiles (KLL); distinct counts are exact for integer
+    columns up to MAX_EXACT_DISTINCT values (e.g. Store), HyperLogLog otherwise
+  • duplicate rows via 64-bit row hashes (8 bytes per distinct row are kept,
+    so this memory grows with the file; pass track_duplicates=False to skip)
+  • counts of rows matching simple equality conditions
+
+Profiles of separate chunks (or byte ranges of the file processed in
+separate worker processes) merge into one profile.
+"""
+
+import io
+import os
+import time
+import pandas as pd
+import numpy as np
+from multiprocessing import Pool
+from sketches import KLLSketch, HyperLogLog
+
+CHUNK_SIZE = 250_000
+MAX_CATEGORIES = 1000
+MAX_EXACT_DISTINCT = 100_000
+
+
+class ColumnProfile:
+    """Mergeable accumulator for one column."""
+
+    def __init__(self, name, numeric):
+        self.name = name
+        self.numeric = numeric
+        self.count = 0              # non-null values
+        self.nulls = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.frequencies = {}
+        self.overflow = False       # too many distinct values to keep a frequency table
+        self.quantiles = KLLSketch() if numeric else None
+        self.distinct = HyperLogLog()
+        self.exact = np.empty(0, dtype=np.int64) if numeric else None    # distinct integer keys
+        self.integral = True        # every numeric value seen so far is a whole number
+        self.mixed = False          # numeric column that also holds text values
+
+    def update(self, values):
+        values = pd.Series(values)
+        null = values.isna()
+        self.nulls += int(null.sum())
+        present = values[~null]
+        if not len(present):
+            return
+
+        if self.numeric:
+            x = pd.to_numeric(present, errors='coerce')
+            text = present[x.isna()].astype(str)
+            x = x.dropna().to_numpy(dtype=np.float64)
+            if len(text):
+                self.mixed = True                   # e.g. StateHoliday: 0, '0', 'a'
+            if len(x):
+                # Chan et al. parallel combination of (count, mean, M2)
+                n_b, mean_b = len(x), float(x.mean())
+                m2_b = float(((x - mean_b) ** 2).sum())
+                n = self.count + n_b
+                delta = mean_b - self.mean
+                self.mean += delta * n_b / n
+                self.m2 += m2_b + delta ** 2 * self.count * n_b / n
+                self.count = n
+                self.min = x.min() if self.min is None else min(self.min, x.min())
+                self.max = x.max() if self.max is None else max(self.max, x.max())
+                self.quantiles.update(x)
+                self.integral = self.integral and bool(np.all(x == np.floor(x)))
+            keys = pd.Series(x.astype(np.int64) if self.integral else x)
+            if len(text):
+                keys = pd.concat([keys.astype(str), text.reset_index(drop=True)], ignore_index=True)
+            elif self.mixed:
+                keys = keys.astype(str)
+        else:
+            self.count += len(present)
+            keys = present.astype(str)
+
+        self.distinct.update(keys.to_numpy())
+        if self.exact is not None:
+            if self.integral and not self.mixed:
+                self._add_exact(np.unique(x.astype(np.int64)))
+            else:
+                self.exact = None
+        if not self.overflow:
+            for key, n in keys.value_counts().items():
+                self.frequencies[key] = self.frequencies.get(key, 0) + int(n)
+            if len(self.frequencies) > MAX_CATEGORIES:
+                self.frequencies = {}
+                self.overflow = True
+
+    def merge(self, other):
+        if other.count:
+            n = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / n
+            self.m2 += other.m2 + delta ** 2 * self.count * other.count / n
+            self.count = n
+        self.nulls += other.nulls
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        if self.quantiles is not None and other.quantiles is not None:
+            self.quantiles.merge(other.quantiles)
+        self.distinct.merge(other.distinct)
+        self.integral = self.integral and other.integral
+        self.mixed = self.mixed or other.mixed
+        if self.exact is not None and other.exact is not None and self.integral and not self.mixed:
+            self._add_exact(other.exact)
+        else:
+            self.exact = None
+        self.overflow = self.overflow or other.overflow
+        if self.overflow:
+            self.frequencies = {}
+        else:
+            for key, n in other.frequencies.items():
+                self.frequencies[key] = self.frequencies.get(key, 0) + n
+            if len(self.frequencies) > MAX_CATEGORIES:
+                self.frequencies = {}
+                self.overflow = True
+        return self
+
+    def _add_exact(self, keys):
+        self.exact = np.union1d(self.exact, keys)
+        if len(self.exact) > MAX_EXACT_DISTINCT:
+            self.exact = None
+
+    def value_counts(self):
+        counts = pd.Series(self.frequencies, dtype=np.int64)
+        if self.mixed:
+            # Integer keys from all-numeric chunks and text keys from mixed ones
+            counts = counts.groupby(counts.index.astype(str)).sum()
+        return counts.sort_values(ascending=False)
+
+    @property
+    def dtype(self):
+        if not self.numeric or self.mixed:
+            return 'object'
+        return 'int64' if self.integral and not self.nulls else 'float64'
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+    def nunique(self):
+        """Exact while the frequency table or integer key set is kept, HyperLogLog estimate afterwards."""
+        if not self.overflow:
+            return len(self.frequencies)
+        if self.exact is not None:
+            return len(self.exact)
+        return self.distinct.count()
+
+
+class DatasetProfile:
+    """Mergeable profile of a whole table."""
+
+    def __init__(self, columns, numeric_columns, conditions=None, track_duplicates=True):
+        self.columns = list(columns)
+        self.rows = 0
+        self.profiles = {c: ColumnProfile(c, c in numeric_columns) for c in self.columns}
+        self.conditions = dict(conditions or {})
+        self.condition_counts = {name: 0 for name in self.conditions}
+        self.track_duplicates = track_duplicates
+        self.row_hashes = []        # distinct hashes per chunk, deduplicated in duplicate_rows()
+        self.hashed_rows = 0
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for col in self.columns:
+            self.profiles[col].update(chunk[col] if col in chunk.columns else pd.Series([np.nan] * len(chunk)))
+        for name, predicate in self.conditions.items():
+            mask = np.ones(len(chunk), dtype=bool)
+            for col, value in predicate.items():
+                mask &= (pd.to_numeric(chunk[col], errors='coerce') == value).to_numpy()
+            self.condition_counts[name] += int(mask.sum())
+        if self.track_duplicates:
+            # Hash the rendered row so 0 and '0' (mixed-type columns) hash alike
+            hashes = pd.util.hash_pandas_object(chunk[self.columns].astype(str), index=False).to_numpy()
+            self.hashed_rows += len(hashes)
+            self.row_hashes.append(np.unique(hashes))
+
+    def merge(self, other):
+        self.rows += other.rows
+        for col in self.columns:
+            self.profiles[col].merge(other.profiles[col])
+        for name in self.condition_counts:
+            self.condition_counts[name] += other.condition_counts[name]
+        if self.track_duplicates:
+            self.hashed_rows += other.hashed_rows
+            self.row_hashes.extend(other.row_hashes)
+        return self
+
+    # ------------------------------------------------------------------
+    # Report views mirroring the pandas calls they replace
+    # ------------------------------------------------------------------
+
+    @property
+    def shape(self):
+        return (self.rows, len(self.columns))
+
+    def duplicate_rows(self):
+        if self.row_hashes:
+            self.row_hashes = [np.unique(np.concatenate(self.row_hashes))]
+            return self.hashed_rows - len(self.row_hashes[0])
+        return self.hashed_rows
+
+    def dtypes(self):
+        return pd.Series({c: p.dtype for c, p in self.profiles.items()})
+
+    def null_counts(self):
+        return pd.Series({c: p.nulls for c, p in self.profiles.items()})
+
+    def describe(self):
+        """Equivalent of DataFrame.describe() for the numeric columns (approximate quartiles)."""
+        stats = {}
+        for c, p in self.profiles.items():
+            if p.dtype == 'object':
+                continue
+            q = p.quantiles.quantile([0.25, 0.5, 0.75]) if p.count else [np.nan] * 3
+            stats[c] = [p.count, p.mean, p.std, p.min, q[0], q[1], q[2], p.max]
+        return pd.DataFrame(stats, index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'])
+
+    def value_counts(self, col):
+        return self.profiles[col].value_counts().rename(col)
+
+    def nunique(self, col):
+        return self.profiles[col].nunique()
+
+
+# PROFILING ENTRY POINTS
+
+def _infer_numeric(path, nrows=10_000):
+    sample = pd.read_csv(path, nrows=nrows, low_memory=False)
+    return list(sample.columns), [c for c in sample.columns if pd.api.types.is_numeric_dtype(sample[c])]
+
+
+def _byte_ranges(path, n_parts):
+    """Split a CSV into n_parts byte ranges aligned to line starts (header excluded)."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header_end = len(f.readline())
+        bounds = [header_end]
+        for i in range(1, n_parts):
+            f.seek(max(header_end, size * i // n_parts))
+            f.readline()
+            bounds.append(max(f.tell(), bounds[-1]))
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _profile_range(args):
+    """Worker: profile one byte range of the file in CHUNK_SIZE-ish blocks."""
+    path, start, stop, columns, numeric, conditions, track_duplicates, chunksize = args
+    profile = DatasetProfile(columns, numeric, conditions, track_duplicates)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while f.tell() < stop:
+            lines = []
+            while len(lines) < chunksize and f.tell() < stop:
+                line = f.readline()
+                if not line:
+                    break
+                lines.append(line)
+            if not lines:
+                break
+            chunk = pd.read_csv(io.BytesIO(b''.join(lines)), header=None, names=columns, low_memory=False)
+            profile.update(chunk)
+    return profile
+
+
+def profile_csv(path, conditions=None, chunksize=CHUNK_SIZE, workers=1, track_duplicates=True):
+    """
+    Profile a CSV file in one chunked pass. With workers > 1 the file is split
+    into byte ranges that are profiled in parallel and merged.
+    """
+    columns, numeric = _infer_numeric(path)
+    if workers <= 1:
+        profile = DatasetProfile(columns, numeric, conditions, track_duplicates)
+        for chunk in pd.read_csv(path, chunksize=chunksize, low_memory=False):
+            profile.update(chunk)
+        return profile
+
+    tasks = [(path, start, stop, columns, numeric, conditions, track_duplicates, chunksize)
+             for start, stop in _byte_ranges(path, workers)]
+    with Pool(workers) as pool:
+        partials = pool.map(_profile_range, tasks)
+    profile = partials[0]
+    for partial in partials[1:]:
+        profile.merge(partial)
+    return profile
+
+
+if __name__ == '__main__':
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else 'train.csv'
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    start = time.perf_counter()
+    profile = profile_csv(path, workers=workers)
+    print(f"Profiled {profile.rows:,} rows × {len(profile.columns)} columns "
+          f"in {time.perf_counter() - start:.2f}s with {workers} worker(s)")
+    print(profile.describe())
+    print(f"Duplicate rows: {profile.duplicate_rows():,}")
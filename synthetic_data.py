@@ -0,0 +1,222 @@
+"""
+Synthetic Data: Rossmann-Shaped Dataset Generator
+==================================================
+This module generates deterministic train.csv / store.csv files with the same
+columns, value distributions and data quality quirks as the real Rossmann
+inputs (closed days, zero-sales open days, invalid dates, mixed-type
+StateHoliday, missing competition and Promo2 fields), for any number of
+stores and any date span. It is used to benchmark the pipeline at volumes
+larger than the real dataset.
+
+Usage:
+    python synthetic_data.py --stores 11150 --start 2013-01-01 --end 2015-07-31 --out data_10x
+"""
+
+import os
+import csv
+import argparse
+import pandas as pd
+import numpy as np
+import warnings
+warnings.filterwarnings('ignore')
+
+# DISTRIBUTIONS (fitted to the real store.csv / train.csv)
+
+STORE_TYPE_PROBS = {'a': 0.542, 'b': 0.015, 'c': 0.133, 'd': 0.310}
+
+# Assortment conditional on StoreType
+ASSORTMENT_PROBS = {
+    'a': {'a': 0.63, 'c': 0.37},
+    'b': {'a': 0.41, 'b': 0.53, 'c': 0.06},
+    'c': {'a': 0.52, 'c': 0.48},
+    'd': {'a': 0.37, 'c': 0.63},
+}
+
+PROMO_INTERVALS = ['Jan,Apr,Jul,Oct', 'Feb,May,Aug,Nov', 'Mar,Jun,Sept,Dec']
+PROMO_INTERVAL_PROBS = [0.59, 0.23, 0.18]
+
+# Relative sales level by day of week (1=Monday ... 7=Sunday)
+DAY_OF_WEEK_FACTOR = np.array([1.20, 1.03, 0.98, 0.99, 1.04, 0.88, 0.95])
+
+STORE_TYPE_LEVEL = {'a': 6900, 'b': 10200, 'c': 6900, 'd': 6800}
+
+# Fractions of the real data quirks
+MISSING_COMPETITION_DISTANCE = 0.0027
+MISSING_COMPETITION_OPEN_SINCE = 0.317
+PROMO2_SHARE = 0.512
+RANDOM_CLOSURE_RATE = 0.012
+SUNDAY_OPEN_SHARE_TYPE_B = 0.9
+ZERO_SALES_OPEN_RATE = 0.00005
+INVALID_DATE_RATE = 0.001
+STRING_STATE_HOLIDAY_RATE = 0.2
+
+INVALID_DATE_VALUES = ['', '2015-02-30', '31/13/2014', 'not a date']
+
+
+def _choice(rng, probs, size):
+    keys = list(probs.keys())
+    return np.asarray(keys)[rng.choice(len(keys), size=size, p=list(probs.values()))]
+
+
+def generate_store_frame(n_stores=1115, seed=42):
+    """store.csv-shaped frame with n_stores rows."""
+    rng = np.random.default_rng(seed)
+    store_type = _choice(rng, STORE_TYPE_PROBS, n_stores)
+    assortment = np.empty(n_stores, dtype=object)
+    for st, probs in ASSORTMENT_PROBS.items():
+        mask = store_type == st
+        assortment[mask] = _choice(rng, probs, int(mask.sum()))
+
+    # Competition distance is roughly log-normal around 2.3 km
+    distance = np.round(np.exp(rng.normal(7.75, 1.25, n_stores)) / 10) * 10
+    distance = np.clip(distance, 20, 75860).astype(float)
+    distance[rng.random(n_stores) < MISSING_COMPETITION_DISTANCE] = np.nan
+
+    comp_month = rng.integers(1, 13, n_stores).astype(float)
+    comp_year = np.clip(np.round(rng.normal(2008, 5, n_stores)), 1900, 2015).astype(float)
+    comp_missing = rng.random(n_stores) < MISSING_COMPETITION_OPEN_SINCE
+    comp_month[comp_missing] = np.nan
+    comp_year[comp_missing] = np.nan
+
+    promo2 = (rng.random(n_stores) < PROMO2_SHARE).astype(int)
+    promo2_week = rng.integers(1, 51, n_stores).astype(float)
+    promo2_year = rng.integers(2009, 2016, n_stores).astype(float)
+    promo_interval = np.asarray(PROMO_INTERVALS, dtype=object)[
+        rng.choice(len(PROMO_INTERVALS), size=n_stores, p=PROMO_INTERVAL_PROBS)]
+    promo2_week[promo2 == 0] = np.nan
+    promo2_year[promo2 == 0] = np.nan
+    promo_interval[promo2 == 0] = ''
+
+    return pd.DataFrame({
+        'Store': np.arange(1, n_stores + 1),
+        'StoreType': store_type,
+        'Assortment': assortment,
+        'CompetitionDistance': distance,
+        'CompetitionOpenSinceMonth': comp_month,
+        'CompetitionOpenSinceYear': comp_year,
+        'Promo2': promo2,
+        'Promo2SinceWeek': promo2_week,
+        'Promo2SinceYear': promo2_year,
+        'PromoInterval': promo_interval,
+    })
+
+
+def _calendar(dates, rng):
+    """Date-level Promo, StateHoliday and SchoolHoliday shared by all stores."""
+    n_days = len(dates)
+    dow = dates.dayofweek.values + 1
+
+    # Promo runs in alternating two-week blocks on weekdays, like the real data
+    week_index = (dates - dates[0]).days.values // 7
+    promo = ((week_index % 2 == 0) & (dow <= 5)).astype(int)
+
+    state_holiday = np.full(n_days, '0', dtype=object)
+    month_day = dates.strftime('%m-%d')
+    public = np.isin(month_day, ['01-01', '05-01', '10-03', '12-26'])
+    state_holiday[public] = 'a'
+    state_holiday[np.isin(month_day, ['12-25'])] = 'c'
+    # Easter: Good Friday / Easter Monday approximated by a fixed pair per year
+    for year in np.unique(dates.year):
+        easter = pd.Timestamp(f'{year}-04-01') + pd.Timedelta(days=int(rng.integers(0, 20)))
+        for offset in (-2, 1):
+            state_holiday[dates == easter + pd.Timedelta(days=offset)] = 'b'
+
+    # School holidays in contiguous blocks (summer, autumn, Christmas, Easter)
+    school = np.isin(dates.month, [7, 8]) & (dates.day >= 5)
+    school |= (dates.month == 10) & (dates.day >= 10) & (dates.day <= 24)
+    school |= ((dates.month == 12) & (dates.day >= 22)) | ((dates.month == 1) & (dates.day <= 5))
+    school |= state_holiday == 'b'
+    return promo, state_holiday, school.astype(int), dow
+
+
+def generate_train_frame(store_df, start_date='2013-01-01', end_date='2015-07-31', seed=42):
+    """train.csv-shaped frame: one row per store per day, newest date first."""
+    rng = np.random.default_rng(seed + 1)
+    dates = pd.date_range(start_date, end_date, freq='D')
+    n_days, n_stores = len(dates), len(store_df)
+    promo, state_holiday, school, dow = _calendar(dates, rng)
+
+    # Store x date grid, flattened date-major (newest first) like the Kaggle file
+    day_idx = np.repeat(np.arange(n_days)[::-1], n_stores)
+    store_idx = np.tile(np.arange(n_stores), n_days)
+    n_rows = len(day_idx)
+
+    store_type = store_df['StoreType'].values
+    level = np.array([STORE_TYPE_LEVEL[t] for t in store_type]) * rng.lognormal(0, 0.35, n_stores)
+    basket = rng.normal(9.6, 1.8, n_stores).clip(5, 20)
+    promo_lift = rng.normal(1.38, 0.08, n_stores)
+
+    row_dow = dow[day_idx]
+    row_promo = promo[day_idx]
+    row_state = state_holiday[day_idx]
+
+    # Opening pattern: Sundays and state holidays closed, except most type-b stores
+    always_open = (store_type == 'b') & (rng.random(n_stores) < SUNDAY_OPEN_SHARE_TYPE_B)
+    open_ = np.ones(n_rows, dtype=int)
+    open_[(row_dow == 7) & ~always_open[store_idx]] = 0
+    open_[(row_state != '0') & ~always_open[store_idx]] = 0
+    open_[rng.random(n_rows) < RANDOM_CLOSURE_RATE] = 0
+
+    seasonal = 1 + 0.25 * (dates.month.values[day_idx] == 12) - 0.05 * (dates.month.values[day_idx] == 1)
+    expected = (level[store_idx] * DAY_OF_WEEK_FACTOR[row_dow - 1] * seasonal
+                * np.where(row_promo == 1, promo_lift[store_idx], 1.0))
+    sales = np.round(expected * rng.lognormal(0, 0.18, n_rows)).astype(np.int64)
+    customers = np.round(sales / (basket[store_idx] * rng.normal(1, 0.05, n_rows).clip(0.7, 1.3))).astype(np.int64)
+
+    # Rare zero-sales days on open stores
+    zero_open = (open_ == 1) & (rng.random(n_rows) < ZERO_SALES_OPEN_RATE)
+    sales[open_ == 0] = 0
+    customers[open_ == 0] = 0
+    sales[zero_open] = 0
+    customers[zero_open] = 0
+
+    date_str = np.asarray(dates.strftime('%Y-%m-%d'), dtype=object)[day_idx]
+    invalid = rng.random(n_rows) < INVALID_DATE_RATE
+    date_str[invalid] = np.asarray(INVALID_DATE_VALUES, dtype=object)[
+        rng.integers(0, len(INVALID_DATE_VALUES), int(invalid.sum()))]
+
+    # StateHoliday '0' is a mix of int 0 and string '0', as in the real file
+    row_state = row_state.copy()
+    as_int = (row_state == '0') & (rng.random(n_rows) >= STRING_STATE_HOLIDAY_RATE)
+    row_state[as_int] = 0
+
+    return pd.DataFrame({
+        'Store': store_df['Store'].values[store_idx],
+        'DayOfWeek': row_dow,
+        'Date': date_str,
+        'Sales': sales,
+        'Customers': customers,
+        'Open': open_,
+        'Promo': row_promo,
+        'StateHoliday': row_state,
+        'SchoolHoliday': school[day_idx],
+    })
+
+
+def write_synthetic_dataset(out_dir='.', n_stores=1115, start_date='2013-01-01',
+                            end_date='2015-07-31', seed=42):
+    """Write train.csv and store.csv into out_dir and return their row counts."""
+    os.makedirs(out_dir, exist_ok=True)
+    store_df = generate_store_frame(n_stores, seed)
+    train_df = generate_train_frame(store_df, start_date, end_date, seed)
+    # Strings are quoted and numbers are not, matching the original files
+    store_df.to_csv(os.path.join(out_dir, 'store.csv'), index=False, quoting=csv.QUOTE_NONNUMERIC)
+    train_df.to_csv(os.path.join(out_dir, 'train.csv'), index=False, quoting=csv.QUOTE_NONNUMERIC)
+    return len(train_df), len(store_df)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate Rossmann-shaped train.csv / store.csv')
+    parser.add_argument('--stores', type=int, default=1115)
+    parser.add_argument('--start', default='2013-01-01')
+    parser.add_argument('--end', default='2015-07-31')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default='synthetic_data')
+    args = parser.parse_args()
+
+    print("="*80)
+    print("ROSSMANN STORE SALES - SYNTHETIC DATA GENERATOR")
+    print("="*80)
+    print(f"\nGenerating {args.stores:,} stores from {args.start} to {args.end} (seed {args.seed})...")
+    n_train, n_store = write_synthetic_dataset(args.out, args.stores, args.start, args.end, args.seed)
+    print(f"✓ Wrote {n_train:,} train rows and {n_store:,} store rows to '{args.out}/'")
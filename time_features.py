@@ -0,0 +1,182 @@
+"""
+Time Features: Per-Store Time-Series Feature Engine
+====================================================
+This module adds temporal context to the processed fact data. Fact rows are
+placed on a dense (store × day) grid over the dim_date calendar, so closed
+days become explicit gaps, and every feature is computed for all stores at
+once with shifted slices, cumulative sums and running maxima along the day
+axis - no per-store Python loops:
+
+  • lags of Sales and Customers (in calendar days; NaN when the store was closed)
+  • rolling mean / std / min / max of Sales over the previous N days
+    (open days only, current day excluded)
+  • promo run-length, days since the last and until the next promo day
+  • days since the last and until the next state holiday
+
+The result is a feature table keyed by (StoreID, DateID) with one row per
+fact row, written to processed_features.csv.
+"""
+
+import time
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import warnings
+warnings.filterwarnings('ignore')
+
+LAGS = [1, 7, 14, 28]
+WINDOWS = [7, 28]
+LAG_MEASURES = ['Sales', 'Customers']
+
+FEATURE_FILE = 'processed_features.csv'
+
+
+class StoreGrid:
+    """Fact columns laid out as dense (n_stores, n_days) arrays over the calendar."""
+
+    def __init__(self, fact_df, date_df):
+        self.store_ids = np.sort(fact_df['StoreID'].dropna().unique().astype(np.int64))
+        self.date_ids = np.sort(date_df['DateID'].to_numpy(dtype=np.int64))
+        fact_df = fact_df.dropna(subset=['StoreID', 'DateID'])
+        self.rows = np.searchsorted(self.store_ids, fact_df['StoreID'].to_numpy(dtype=np.int64))
+        self.cols = np.searchsorted(self.date_ids, fact_df['DateID'].to_numpy(dtype=np.int64))
+        self.shape = (len(self.store_ids), len(self.date_ids))
+        self.fact_df = fact_df
+
+    def layout(self, values, fill):
+        """Scatter one value per fact row into a grid, `fill` on closed days."""
+        values = np.asarray(values)
+        grid = np.full(self.shape, fill, dtype=values.dtype if fill is not np.nan else np.float64)
+        grid[self.rows, self.cols] = values
+        return grid
+
+    def gather(self, grid):
+        """Pick the grid cells of the fact rows, in fact row order."""
+        return grid[self.rows, self.cols]
+
+
+# GRID OPERATIONS (along the day axis)
+
+def shift(grid, n, fill=np.nan):
+    """Value n days earlier (n > 0) or later (n < 0)."""
+    out = np.full(grid.shape, fill, dtype=np.float64)
+    if n > 0:
+        out[:, n:] = grid[:, :-n]
+    elif n < 0:
+        out[:, :n] = grid[:, -n:]
+    else:
+        out[:] = grid
+    return out
+
+
+def rolling_stats(grid, window):
+    """
+    Mean / std / min / max of the previous `window` days (current day
+    excluded), ignoring NaN days. Mean and std come from differences of
+    cumulative sums; min and max from a strided window view.
+    """
+    valid = ~np.isnan(grid)
+    values = np.where(valid, grid, 0.0)
+    n_stores = grid.shape[0]
+    zeros = np.zeros((n_stores, 1))
+    cum_n = np.hstack([zeros, np.cumsum(valid, axis=1)])
+    cum_x = np.hstack([zeros, np.cumsum(values, axis=1)])
+    cum_x2 = np.hstack([zeros, np.cumsum(values ** 2, axis=1)])
+
+    # Window for day t covers days [t - window, t - 1] -> cumsum indices [t - window, t]
+    t = np.arange(grid.shape[1])
+    lo = np.maximum(t - window, 0)
+    count = cum_n[:, t] - cum_n[:, lo]
+    total = cum_x[:, t] - cum_x[:, lo]
+    total2 = cum_x2[:, t] - cum_x2[:, lo]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        var = (total2 - count * mean ** 2) / (count - 1)
+    std = np.sqrt(np.clip(var, 0, None))
+    std[count < 2] = np.nan
+
+    padded = np.hstack([np.full((n_stores, window), np.nan), grid])[:, :-1]
+    windows = sliding_window_view(padded, window, axis=1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)     # all-NaN windows
+        rmin = np.nanmin(windows, axis=2)
+        rmax = np.nanmax(windows, axis=2)
+    return mean, std, rmin, rmax
+
+
+def days_since(flags):
+    """Days since the last True at or before each day (NaN if none yet)."""
+    t = np.arange(flags.shape[-1])
+    last = np.maximum.accumulate(np.where(flags, t, -1), axis=-1)
+    return np.where(last >= 0, t - last, np.nan)
+
+
+def days_until(flags):
+    """Days until the next True at or after each day (NaN if none)."""
+    return days_since(flags[..., ::-1])[..., ::-1]
+
+
+def run_length(flags):
+    """Length of the current run of consecutive True days (0 on False days)."""
+    t = np.arange(flags.shape[-1])
+    last_false = np.maximum.accumulate(np.where(~flags, t, -1), axis=-1)
+    return np.where(flags, t - last_false, 0)
+
+
+# FEATURE TABLE
+
+def build_features(fact_df, date_df, lags=LAGS, windows=WINDOWS):
+    """Feature table keyed by (StoreID, DateID), one row per fact row."""
+    grid = StoreGrid(fact_df, date_df)
+    fact_df = grid.fact_df
+    features = {
+        'StoreID': fact_df['StoreID'].to_numpy(dtype=np.int64),
+        'DateID': fact_df['DateID'].to_numpy(dtype=np.int64),
+    }
+
+    sales = grid.layout(fact_df['Sales'].to_numpy(dtype=np.float64), np.nan)
+    measures = {'Sales': sales,
+                'Customers': grid.layout(fact_df['Customers'].to_numpy(dtype=np.float64), np.nan)}
+    for measure in LAG_MEASURES:
+        for lag in lags:
+            features[f'{measure}_Lag{lag}'] = grid.gather(shift(measures[measure], lag))
+
+    for window in windows:
+        mean, std, rmin, rmax = rolling_stats(sales, window)
+        features[f'Sales_Mean{window}'] = grid.gather(mean)
+        features[f'Sales_Std{window}'] = grid.gather(std)
+        features[f'Sales_Min{window}'] = grid.gather(rmin)
+        features[f'Sales_Max{window}'] = grid.gather(rmax)
+
+    # Promo history (closed days count as non-promo days)
+    promo = grid.layout(fact_df['Promo'].fillna(0).to_numpy(dtype=bool), False)
+    features['PromoRunLength'] = grid.gather(run_length(promo))
+    features['DaysSincePromo'] = grid.gather(days_since(promo))
+    features['DaysUntilPromo'] = grid.gather(days_until(promo))
+
+    # A calendar day is a state holiday if any store observes one (dim_date share)
+    date_df = date_df.sort_values('DateID')
+    holiday = date_df['StateHolidayShare'].to_numpy() > 0
+    features['DaysSinceHoliday'] = days_since(holiday)[grid.cols]
+    features['DaysUntilHoliday'] = days_until(holiday)[grid.cols]
+
+    return pd.DataFrame(features).sort_values(['StoreID', 'DateID']).reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    print("="*80)
+    print("ROSSMANN STORE SALES - TIME-SERIES FEATURES")
+    print("="*80)
+
+    print("\n[1/2] Building feature table...")
+    start = time.perf_counter()
+    fact_df = pd.read_csv('processed_fact_sales.csv', low_memory=False)
+    date_df = pd.read_csv('processed_dim_date.csv')
+    features = build_features(fact_df, date_df)
+    print(f"✓ {len(features):,} rows × {features.shape[1] - 2} features "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    print(f"\n[2/2] Saving to '{FEATURE_FILE}'...")
+    features.to_csv(FEATURE_FILE, index=False, float_format='%.2f')
+    print("✓ Feature table saved")
+    print(features[features['StoreID'] == features['StoreID'].iloc[0]].head(10).to_string())